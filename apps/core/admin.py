@@ -2,9 +2,8 @@
 Módulo de configuração do admin para o aplicativo `core`.
 
 Utilize este arquivo para customizar como os modelos do app `core`
-aparecerão no painel administrativo do Django. Por enquanto não há
-modelos para registrar, portanto o arquivo atua como um ponto de
-extensão futuro.
+aparecerão no painel administrativo do Django. A caixa de saída de
+e-mails (`EmailSaida`) é registrada para acompanhar envios e falhas.
 
 Exemplo de uso:
 
@@ -19,4 +18,13 @@ Exemplo de uso:
 
 from django.contrib import admin
 
-# Arquivo mantido para registrar modelos do app `core` quando necessário.
+from .models import EmailSaida
+
+
+@admin.register(EmailSaida)
+class EmailSaidaAdmin(admin.ModelAdmin):
+    list_display = ('assunto', 'remetente', 'situacao', 'tentativas', 'proxima_tentativa', 'enviado_em')
+    list_filter = ('situacao',)
+    search_fields = ('assunto', 'remetente')
+    readonly_fields = ('situacao', 'tentativas', 'ultimo_erro', 'enviado_em')
+
@@ -14,3 +14,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     # Define o nome do aplicativo Django como 'apps.core'
     name = 'apps.core'
+
+    def ready(self):
+        # Registra os receptores de sinais (cache de usuários da autenticação)
+        from . import signals  # noqa: F401
@@ -1,54 +1,59 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+
+from . import versoes
 
 # Obtém o modelo de usuário ativo configurado no projeto Django
 UserModel = get_user_model()
 
-class EmailOrUsernameModelBackend(ModelBackend):
+# Cache por processo de `get_user`: {user_id: (expira_em, token, usuario)}.
+# Cada usuário tem um token 'usuario:<pk>' em `versoes`, trocado pelos sinais
+# de `core/signals.py` quando ele é salvo ou apagado em qualquer processo;
+# conferir o token é uma leitura no cache, sem consulta ao banco. Trocar a
+# senha (que invalida as sessões), desativar ou rebaixar o usuário vale na
+# próxima requisição. Alterações sem sinal (`QuerySet.update`) valem no
+# máximo `AUTH_USUARIO_TTL` segundos, a menos que chamem `invalidar_usuario`.
+_usuarios = {}
+_trava = threading.Lock()
+
+
+def versao_usuario(user_id):
+    """Nome do token de `versoes` do usuário `user_id`."""
+    return f"usuario:{user_id}"
+
+
+def esquecer_usuario(user_id=None):
+    """Remove um usuário (ou todos, sem argumento) do cache de `get_user` deste processo."""
+    with _trava:
+        if user_id is None:
+            _usuarios.clear()
+        else:
+            _usuarios.pop(user_id, None)
+
+
+def invalidar_usuario(user_id):
     """
-    EmailOrUsernameModelBackend é uma classe personalizada que estende o backend padrão de autenticação do Django, 
-    permitindo que os usuários façam login utilizando tanto o nome de usuário (username) quanto o e-mail, 
-    em conjunto com a senha.
-
-    Métodos:
-    ---------
-    1. authenticate(self, request, username=None, password=None, **kwargs):
-        - Este método tenta autenticar um usuário com base no nome de usuário ou e-mail fornecido, 
-          juntamente com a senha.
-        - Ele utiliza uma consulta para verificar se existe um usuário cujo 'username' ou 'email' 
-          corresponde ao valor fornecido.
-        - Caso um usuário seja encontrado, verifica se a senha fornecida corresponde à senha armazenada.
-        - Retorna o objeto do usuário autenticado se a autenticação for bem-sucedida, ou None caso contrário.
-
-    2. get_user(self, user_id):
-        - Este método é responsável por obter um usuário com base no ID fornecido.
-        - Ele retorna o objeto do usuário correspondente ao ID, ou None se o usuário não for encontrado.
-
-    Uso:
-    -----
-    - Este backend é útil em cenários onde se deseja oferecer flexibilidade para os usuários fazerem login 
-      tanto com o nome de usuário quanto com o e-mail.
-    - Deve ser configurado no projeto Django como um backend de autenticação personalizado.
-
-    Exemplo de Configuração:
-    -------------------------
-    No arquivo settings.py do projeto Django, adicione o caminho completo para esta classe na lista `AUTHENTICATION_BACKENDS`:
-        AUTHENTICATION_BACKENDS = [
-            'apps.core.backends.EmailOrUsernameModelBackend',
-            'django.contrib.auth.backends.ModelBackend',  # Backend padrão do Django
-        ]
-
-    Notas:
-    ------
-    - Certifique-se de que o modelo de usuário utilizado no projeto possui os campos 'username' e 'email'.
-    - Este backend não suporta autenticação de usuários inativos ou bloqueados, pois utiliza o comportamento padrão do Django.
+    Descarta o usuário em cache neste processo agora e, nos demais, assim que
+    a transação atual for confirmada.
     """
+    esquecer_usuario(user_id)
+    versoes.invalidar(versao_usuario(user_id))
+
+
+class EmailOrUsernameModelBackend(ModelBackend):
     """
-    Este backend permite que o usuário faça login usando o nome de usuário (username)
-    OU o e-mail, em conjunto com a senha.
-    
-    Ele estende o ModelBackend padrão do Django.
+    Permite o login com o nome de usuário (username) OU o e-mail, em conjunto
+    com a senha, sem diferenciar maiúsculas. Estende o `ModelBackend` padrão
+    e é configurado em `AUTHENTICATION_BACKENDS`.
+
+    `get_user` guarda os usuários neste processo (ver `_usuarios`).
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
         """
@@ -64,13 +69,26 @@ class EmailOrUsernameModelBackend(ModelBackend):
         Returns:
             O objeto do usuário autenticado, ou None se a autenticação falhar.
         """
-        try:
-            # Tenta encontrar um usuário cujo 'username' ou 'email' corresponda ao valor fornecido.
-            user = UserModel.objects.get(Q(username__iexact=username) | Q(email__iexact=username))
-        except UserModel.DoesNotExist:
-            # Retorna None se nenhum usuário for encontrado com o username ou email fornecido.
+        if username is None or password is None:
             return None
-        
+
+        # Caminho rápido: username exato, pelo índice único de `auth_user`
+        user = UserModel.objects.filter(username=username).first()
+        if user is None:
+            # `LOWER(coluna) = LOWER(valor)` usa os índices funcionais criados
+            # em `core/migrations/0003`; `iexact` vira `LIKE`, que não usa índice
+            valor = Lower(Value(username))
+            candidatos = list(
+                UserModel.objects.alias(username_lower=Lower('username'), email_lower=Lower('email'))
+                .filter(Q(username_lower=valor) | Q(email_lower=valor))[:2]
+            )
+            if len(candidatos) != 1:
+                # Nenhum usuário (ou e-mail ambíguo): gasta o mesmo tempo de
+                # um hash para não revelar se a conta existe
+                UserModel().set_password(password)
+                return None
+            user = candidatos[0]
+
         # Verifica se a senha fornecida corresponde à senha do usuário encontrado.
         if user.check_password(password):
             return user
@@ -80,14 +98,36 @@ class EmailOrUsernameModelBackend(ModelBackend):
         """
         Método para obter um usuário com base no ID do usuário.
 
+        O usuário fica em cache neste processo por `AUTH_USUARIO_TTL`
+        segundos; enquanto isso cada requisição só confere o token do
+        usuário no cache e, se ele mudou, recarrega o usuário do banco. Cada
+        chamada devolve uma cópia, para que anotações feitas por uma
+        requisição não vazem para outra.
+
         Args:
             user_id: O ID do usuário.
 
         Returns:
-            O objeto do usuário correspondente ao ID fornecido, ou None se não for encontrado.
+            O objeto do usuário correspondente ao ID fornecido, ou None se não
+            for encontrado ou estiver desativado.
         """
+        agora = time.monotonic()
+        # Lido antes do banco: uma troca durante a leitura invalida a cópia guardada
+        token = versoes.versao(versao_usuario(user_id))[0]
+        with _trava:
+            guardado = _usuarios.get(user_id)
+        if guardado is not None and guardado[0] > agora and guardado[1] == token:
+            user = copy.copy(guardado[2])
+            return user if self.user_can_authenticate(user) else None
+
         try:
-            return UserModel.objects.get(pk=user_id)
+            user = UserModel.objects.get(pk=user_id)
         except UserModel.DoesNotExist:
             # Retorna None se o usuário com o ID fornecido não existir.
-            return None
\ No newline at end of file
+            return None
+        ttl = settings.AUTH_USUARIO_TTL
+        if ttl > 0:
+            with _trava:
+                _usuarios[user_id] = (agora + ttl, token, copy.copy(user))
+        # Como no `ModelBackend`: usuário desativado perde a sessão
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,204 @@
+"""
+Caixa de saída de e-mails.
+
+`FilaEmailBackend` (o `EMAIL_BACKEND` do projeto) não fala com o servidor
+SMTP: grava cada mensagem em `EmailSaida` e retorna na hora. Assim o
+formulário de contato e a redefinição de senha do `django.contrib.auth`
+respondem sem esperar a rede, e uma mensagem gravada dentro de uma transação
+só existe se a transação for confirmada.
+
+O comando `enviar_emails` chama `enviar_pendentes()`, que reserva lotes de
+mensagens prontas e as envia por uma única conexão do backend real
+(`CORREIO_BACKEND_ENVIO`, SMTP por padrão), reaproveitada entre os lotes:
+
+- cada lote é reservado adiando `proxima_tentativa` pelo tempo que ele
+  pode levar no pior caso (`EMAIL_TIMEOUT` por mensagem, no mínimo
+  `RESERVA`) e marcando a linha com um identificador próprio, então dois
+  processos não enviam a mesma mensagem; se o processo morrer no meio, a
+  reserva vence e outro envia (entrega pelo menos uma vez);
+- cada mensagem é marcada como `ENVIADO` logo após o envio, e não no fim do
+  lote: uma queda no meio só reenvia a mensagem que estava em andamento;
+- respostas 5xx do servidor são definitivas (`FALHOU`); erros temporários
+  e de conexão reagendam com espera exponencial (`ESPERA_INICIAL`,
+  dobrando até `ESPERA_MAXIMA`) até `TENTATIVAS_MAXIMAS`.
+
+`situacao()` resume a fila para o comando (`--situacao`) e o admin.
+"""
+
+import smtplib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import EmailSaida
+
+# Mensagens reservadas por lote
+LOTE_ENVIO = 50
+
+# Prazo mínimo de uma reserva; vencido, outro processo pode enviar a mensagem
+RESERVA = timedelta(minutes=5)
+
+ESPERA_INICIAL = timedelta(seconds=30)
+ESPERA_MAXIMA = timedelta(hours=1)
+TENTATIVAS_MAXIMAS = 8
+
+
+class FilaEmailBackend(BaseEmailBackend):
+    """Backend de e-mail que grava as mensagens em `EmailSaida` em vez de enviá-las."""
+
+    def send_messages(self, email_messages):
+        linhas = []
+        for mensagem in email_messages:
+            if mensagem.attachments:
+                raise ValueError("A caixa de saída não aceita anexos.")
+            if not mensagem.recipients():
+                continue
+            linhas.append(EmailSaida(
+                assunto=mensagem.subject,
+                corpo=mensagem.body,
+                # Sem DEFAULT_FROM_EMAIL configurado o remetente vem vazio
+                remetente=mensagem.from_email or '',
+                destinatarios=list(mensagem.to),
+                copia=list(mensagem.cc),
+                copia_oculta=list(mensagem.bcc),
+                responder_para=list(mensagem.reply_to),
+                cabecalhos=dict(mensagem.extra_headers),
+                alternativas=[list(alternativa) for alternativa in getattr(mensagem, 'alternatives', [])],
+            ))
+        EmailSaida.objects.bulk_create(linhas)
+        return len(linhas)
+
+
+def _mensagem(email):
+    return EmailMultiAlternatives(
+        subject=email.assunto,
+        body=email.corpo,
+        from_email=email.remetente or None,
+        to=email.destinatarios,
+        cc=email.copia,
+        bcc=email.copia_oculta,
+        reply_to=email.responder_para,
+        headers=email.cabecalhos,
+        alternatives=[tuple(alternativa) for alternativa in email.alternativas],
+    )
+
+
+def pendentes():
+    return EmailSaida.objects.filter(situacao=EmailSaida.PENDENTE).order_by('proxima_tentativa', 'id')
+
+
+def prazo_reserva(tamanho):
+    """Tempo para enviar `tamanho` mensagens se cada uma esgotar o `EMAIL_TIMEOUT`."""
+    por_mensagem = timedelta(seconds=settings.EMAIL_TIMEOUT or 0)
+    return max(RESERVA, por_mensagem * tamanho)
+
+
+def _reservar(agora, tamanho):
+    lote = uuid.uuid4()
+    with transaction.atomic():
+        prontos = list(pendentes().filter(proxima_tentativa__lte=agora).values_list('pk', flat=True)[:tamanho])
+        if not prontos:
+            return []
+        pendentes().filter(pk__in=prontos, proxima_tentativa__lte=agora).update(
+            lote=lote, proxima_tentativa=agora + prazo_reserva(len(prontos))
+        )
+    return list(EmailSaida.objects.filter(pk__in=prontos, lote=lote).order_by('id'))
+
+
+def _espera(tentativas):
+    return min(ESPERA_MAXIMA, ESPERA_INICIAL * 2 ** (tentativas - 1))
+
+
+def _definitivo(erro):
+    """Recusa permanente do servidor (5xx): tentar de novo não adianta."""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        return all(codigo >= 500 for codigo, _ in erro.recipients.values())
+    return isinstance(erro, smtplib.SMTPResponseException) and erro.smtp_code >= 500
+
+
+def _registrar_falha(email, erro, agora):
+    tentativas = email.tentativas + 1
+    campos = {'tentativas': tentativas, 'ultimo_erro': f"{type(erro).__name__}: {erro}"[:2000], 'lote': None}
+    if _definitivo(erro) or tentativas >= TENTATIVAS_MAXIMAS:
+        campos['situacao'] = 'FALHOU'
+    else:
+        campos['proxima_tentativa'] = agora + _espera(tentativas)
+    EmailSaida.objects.filter(pk=email.pk).update(**campos)
+    return campos.get('situacao', EmailSaida.PENDENTE)
+
+
+def _enviar_lote(conexao, emails, agora):
+    enviados, falhas, adiados = 0, 0, 0
+    for posicao, email in enumerate(emails):
+        try:
+            if conexao.send_messages([_mensagem(email)]) != 1:
+                raise smtplib.SMTPException("O backend não confirmou o envio.")
+        except (smtplib.SMTPException, OSError) as erro:
+            if _registrar_falha(email, erro, agora) == 'FALHOU':
+                falhas += 1
+            else:
+                adiados += 1
+            if not _definitivo(erro):
+                # Conexão perdida ou servidor indisponível: o resto do lote volta para a fila
+                restantes = [outro.pk for outro in emails[posicao + 1:]]
+                EmailSaida.objects.filter(pk__in=restantes).update(lote=None, proxima_tentativa=agora)
+                adiados += len(restantes)
+                break
+        else:
+            EmailSaida.objects.filter(pk=email.pk).update(situacao='ENVIADO', enviado_em=timezone.now(), lote=None)
+            enviados += 1
+    return enviados, falhas, adiados
+
+
+def enviar_pendentes(agora=None, tamanho=LOTE_ENVIO):
+    """
+    Envia as mensagens prontas (`proxima_tentativa <= agora`), em lotes de
+    `tamanho`, por uma única conexão do backend `CORREIO_BACKEND_ENVIO`.
+
+    Returns:
+        dict com as contagens de `enviados`, `falhas` (definitivas) e
+        `adiados` (reagendados para nova tentativa).
+    """
+    agora = agora or timezone.now()
+    resultado = {'enviados': 0, 'falhas': 0, 'adiados': 0}
+    conexao = None
+    try:
+        while True:
+            emails = _reservar(agora, tamanho)
+            if not emails:
+                break
+            if conexao is None:
+                conexao = get_connection(settings.CORREIO_BACKEND_ENVIO, fail_silently=False)
+                try:
+                    conexao.open()
+                except (smtplib.SMTPException, OSError) as erro:
+                    # Servidor fora do ar: conta uma tentativa para cada mensagem do lote
+                    for email in emails:
+                        chave = 'falhas' if _registrar_falha(email, erro, agora) == 'FALHOU' else 'adiados'
+                        resultado[chave] += 1
+                    break
+            enviados, falhas, adiados = _enviar_lote(conexao, emails, agora)
+            resultado['enviados'] += enviados
+            resultado['falhas'] += falhas
+            resultado['adiados'] += adiados
+            if adiados:
+                break
+    finally:
+        if conexao is not None:
+            conexao.close()
+    return resultado
+
+
+def situacao():
+    """Quantidade de mensagens por situação e a pendente mais antiga."""
+    contagens = dict(EmailSaida.objects.order_by().values_list('situacao').annotate(n=Count('id')))
+    return {
+        **{codigo: contagens.get(codigo, 0) for codigo, _ in EmailSaida.SITUACOES},
+        'pendente_desde': pendentes().aggregate(inicio=Min('criado_em'))['inicio'],
+    }
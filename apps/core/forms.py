@@ -124,4 +124,15 @@ class CustomUserCreationForm(UserCreationForm):
             elif name == 'hire_date':
                 field.widget.attrs.update({'class': 'form-control'})
             else:
-                field.widget.attrs.update({'class': 'form-control'})
\ No newline at end of file
+                field.widget.attrs.update({'class': 'form-control'})
+
+class LinhaFuncionarioForm(forms.Form):
+    """Valida uma linha da importação de funcionários em lote (ver `importacao.py`)."""
+
+    username = forms.CharField(max_length=150, validators=[User.username_validator])
+    email = forms.EmailField()
+    password = forms.CharField(strip=False)
+    full_name = forms.CharField(max_length=255)
+    job_title = forms.ChoiceField(choices=Funcionario.CARGOS)
+    salary = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    is_manager = forms.BooleanField(required=False)
@@ -0,0 +1,193 @@
+"""
+Importação de funcionários em lote (CSV ou JSON).
+
+Em vez de um POST de `register_funcionario` por pessoa, a lista inteira é
+validada de uma vez (nada é gravado se alguma linha for inválida) e gravada
+numa única transação:
+
+- as matrículas saem de um único bloco de `SequenciaMatricula.reservar`;
+- `User` e `Funcionario` são criados com `bulk_create`, cada linha escrita
+  uma única vez;
+- os hashes de senha (PBKDF2, a parte cara) são calculados antes da
+  transação por um pool de threads: o `hashlib` libera o GIL durante o
+  PBKDF2, então os hashes rodam em paralelo nos núcleos disponíveis.
+
+Usado pelo comando `importar_funcionarios` e pela view
+`importar_funcionarios_view`.
+"""
+
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .forms import LinhaFuncionarioForm
+from .models import Funcionario, SequenciaMatricula
+
+# Limite de funcionários por importação
+IMPORTACAO_MAXIMA = 1000
+
+# Threads que calculam os hashes de senha
+THREADS_HASH = min(8, os.cpu_count() or 1)
+
+CAMPOS_CSV = ('username', 'email', 'password', 'full_name', 'job_title')
+VERDADEIROS = {'1', 'true', 'sim', 's', 'yes', 'x'}
+
+
+class ImportacaoInvalida(ValueError):
+    """A importação não pôde ser feita; `erros` traz uma mensagem por problema."""
+
+    def __init__(self, erros):
+        self.erros = erros if isinstance(erros, list) else [erros]
+        super().__init__('; '.join(self.erros))
+
+
+def ler_importacao(corpo, content_type):
+    """Converte o corpo (JSON ou CSV) numa lista de dicionários, um por funcionário."""
+    if isinstance(corpo, bytes):
+        try:
+            corpo = corpo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ImportacaoInvalida("A importação deve estar codificada em UTF-8.")
+
+    if 'csv' in (content_type or ''):
+        leitor = csv.DictReader(io.StringIO(corpo))
+        if not leitor.fieldnames or not set(CAMPOS_CSV) <= {c.strip() for c in leitor.fieldnames}:
+            raise ImportacaoInvalida(f"Cabeçalho CSV deve conter: {', '.join(CAMPOS_CSV)}.")
+        linhas = [{(k or '').strip(): (v or '').strip() for k, v in linha.items()} for linha in leitor]
+    else:
+        try:
+            dados = json.loads(corpo or 'null')
+        except json.JSONDecodeError as e:
+            raise ImportacaoInvalida(f"JSON inválido: {e}")
+        linhas = dados.get('funcionarios') if isinstance(dados, dict) else dados
+        if not isinstance(linhas, list):
+            raise ImportacaoInvalida("Envie uma lista de funcionários ou um objeto com a chave 'funcionarios'.")
+
+    if not linhas:
+        raise ImportacaoInvalida("Nenhum funcionário informado.")
+    if len(linhas) > IMPORTACAO_MAXIMA:
+        raise ImportacaoInvalida(f"A importação excede o limite de {IMPORTACAO_MAXIMA} funcionários.")
+    return linhas
+
+
+def _validar_linha(indice, linha):
+    if not isinstance(linha, dict):
+        return None, f"Linha {indice}: deve ser um objeto com {', '.join(CAMPOS_CSV)}."
+
+    dados = dict(linha)
+    if isinstance(dados.get('job_title'), str):
+        dados['job_title'] = dados['job_title'].strip().upper()
+    if isinstance(dados.get('is_manager'), str):
+        # No CSV qualquer texto não vazio seria verdadeiro ('nao' inclusive)
+        dados['is_manager'] = dados['is_manager'].strip().lower() in VERDADEIROS
+
+    form = LinhaFuncionarioForm(dados)
+    if not form.is_valid():
+        detalhes = '; '.join(f"{campo}: {' '.join(msgs)}" for campo, msgs in form.errors.items())
+        return None, f"Linha {indice}: {detalhes}"
+
+    limpos = form.cleaned_data
+    try:
+        validate_password(limpos['password'], User(username=limpos['username'], email=limpos['email']))
+    except ValidationError as e:
+        return None, f"Linha {indice}: password: {' '.join(e.messages)}"
+    return limpos, None
+
+
+def _validar(linhas):
+    validas, erros = [], []
+    usernames, emails = {}, {}
+    for indice, linha in enumerate(linhas, start=1):
+        dados, erro = _validar_linha(indice, linha)
+        if erro:
+            erros.append(erro)
+            continue
+        for vistos, campo in ((usernames, 'username'), (emails, 'email')):
+            chave = dados[campo].lower()
+            if chave in vistos:
+                erros.append(f"Linha {indice}: {campo} '{dados[campo]}' repetido na linha {vistos[chave]}.")
+            vistos.setdefault(chave, indice)
+        validas.append(dados)
+
+    # Uma consulta para todos os conflitos com contas existentes (índices de `core/migrations/0003`)
+    existentes = (
+        User.objects.alias(username_lower=Lower('username'), email_lower=Lower('email'))
+        .filter(Q(username_lower__in=list(usernames)) | Q(email_lower__in=list(emails)))
+        .values_list('username', 'email')
+    )
+    for username, email in existentes:
+        if username.lower() in usernames:
+            erros.append(f"Linha {usernames[username.lower()]}: username '{username}' já está em uso.")
+        if email and email.lower() in emails:
+            erros.append(f"Linha {emails[email.lower()]}: email '{email}' já está em uso.")
+
+    if erros:
+        raise ImportacaoInvalida(erros)
+    return validas
+
+
+def _hashes(senhas):
+    with ThreadPoolExecutor(max_workers=THREADS_HASH) as pool:
+        return list(pool.map(make_password, senhas))
+
+
+def importar(linhas):
+    """
+    Valida e cria os funcionários.
+
+    Args:
+        linhas: lista de dicionários com username, email, password,
+            full_name, job_title e, opcionalmente, salary e is_manager.
+
+    Returns:
+        lista de `{'username', 'matricula'}` na ordem recebida.
+
+    Raises:
+        ImportacaoInvalida: com todos os problemas encontrados.
+    """
+    validas = _validar(linhas)
+    senhas = _hashes([dados['password'] for dados in validas])
+
+    try:
+        with transaction.atomic():
+            numeros = SequenciaMatricula.reservar(len(validas))
+            usuarios = User.objects.bulk_create(
+                [
+                    # Como em `register_funcionario`: staff para acessar o admin se necessário
+                    User(username=dados['username'], email=dados['email'], password=senha, is_staff=True)
+                    for dados, senha in zip(validas, senhas)
+                ],
+                batch_size=500
+            )
+            funcionarios = Funcionario.objects.bulk_create(
+                [
+                    Funcionario(
+                        user=usuario,
+                        employee_id_number=SequenciaMatricula.formatar(numero),
+                        full_name=dados['full_name'],
+                        job_title=dados['job_title'],
+                        salary=dados['salary'],
+                        is_manager=dados['is_manager'],
+                    )
+                    for dados, usuario, numero in zip(validas, usuarios, numeros)
+                ],
+                batch_size=500
+            )
+    except IntegrityError:
+        # Outra requisição criou o mesmo username/e-mail depois da validação
+        raise ImportacaoInvalida("Um username ou e-mail foi cadastrado durante a importação; tente novamente.")
+
+    return [
+        {'username': funcionario.user.username, 'matricula': funcionario.employee_id_number}
+        for funcionario in funcionarios
+    ]
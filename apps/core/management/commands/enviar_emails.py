@@ -0,0 +1,62 @@
+"""
+Entrega os e-mails da caixa de saída (`EmailSaida`).
+
+Uso:
+    python manage.py enviar_emails                     # uma passada (ex.: via cron)
+    python manage.py enviar_emails --continuo          # processo próprio, verificando a cada 5 s
+    python manage.py enviar_emails --situacao          # só mostra o estado da fila
+
+Vários processos podem rodar ao mesmo tempo: cada lote é reservado por um
+único processo (ver `apps.core.correio`).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import correio
+
+
+class Command(BaseCommand):
+    help = "Envia, por uma única conexão SMTP, os e-mails pendentes da caixa de saída."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help="Continua rodando e verifica a fila a cada --intervalo segundos."
+        )
+        parser.add_argument('--intervalo', type=float, default=5.0, help="Segundos entre verificações (padrão: 5).")
+        parser.add_argument(
+            '--lote', type=int, default=correio.LOTE_ENVIO,
+            help=f"Mensagens reservadas por lote (padrão: {correio.LOTE_ENVIO})."
+        )
+        parser.add_argument('--situacao', action='store_true', help="Mostra as contagens da fila e sai.")
+
+    def _passada(self, lote):
+        resultado = correio.enviar_pendentes(tamanho=lote)
+        if any(resultado.values()):
+            self.stdout.write(
+                f"{resultado['enviados']} enviados, {resultado['adiados']} adiados, {resultado['falhas']} falharam."
+            )
+        return resultado
+
+    def handle(self, *args, **options):
+        if options['situacao']:
+            fila = correio.situacao()
+            self.stdout.write(f"Pendentes: {fila['PENDENTE']}  Enviados: {fila['ENVIADO']}  Falharam: {fila['FALHOU']}")
+            if fila['pendente_desde']:
+                self.stdout.write(f"Pendente mais antiga desde {fila['pendente_desde']:%d/%m/%Y %H:%M:%S}.")
+            return
+
+        if not options['continuo']:
+            if not any(self._passada(options['lote']).values()):
+                self.stdout.write("Nenhum e-mail pendente.")
+            return
+
+        self.stdout.write(f"Envio de e-mails ativo (a cada {options['intervalo']:g} s).")
+        try:
+            while True:
+                self._passada(options['lote'])
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Envio de e-mails encerrado.")
@@ -0,0 +1,46 @@
+"""
+Cadastra vários funcionários de uma vez a partir de um arquivo CSV ou JSON.
+
+Uso:
+    python manage.py importar_funcionarios equipe.csv
+    python manage.py importar_funcionarios equipe.json
+
+CSV com cabeçalho `username,email,password,full_name,job_title` e, opcionais,
+`salary,is_manager`; JSON com uma lista de objetos com os mesmos campos (ou
+`{"funcionarios": [...]}`). Se alguma linha for inválida nada é gravado e
+todos os problemas são listados. Ver `apps.core.importacao`.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.importacao import ImportacaoInvalida, importar, ler_importacao
+
+
+class Command(BaseCommand):
+    help = "Importa funcionários (usuário + Funcionario) de um arquivo CSV ou JSON numa única transação."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo .csv ou .json.")
+        parser.add_argument(
+            '--formato', choices=['csv', 'json'],
+            help="Formato do arquivo (padrão: pela extensão)."
+        )
+
+    def handle(self, *args, **options):
+        caminho = Path(options['arquivo'])
+        try:
+            corpo = caminho.read_bytes()
+        except OSError as e:
+            raise CommandError(f"Não foi possível ler {caminho}: {e}")
+        formato = options['formato'] or ('csv' if caminho.suffix.lower() == '.csv' else 'json')
+
+        try:
+            criados = importar(ler_importacao(corpo, f'text/{formato}'))
+        except ImportacaoInvalida as e:
+            raise CommandError("Importação cancelada:\n" + '\n'.join(e.erros))
+
+        for funcionario in criados:
+            self.stdout.write(f"{funcionario['matricula']}  {funcionario['username']}")
+        self.stdout.write(self.style.SUCCESS(f"{len(criados)} funcionários importados."))
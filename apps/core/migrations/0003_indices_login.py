@@ -0,0 +1,24 @@
+from django.db import migrations
+
+# Índices funcionais em `auth_user` para o login por username ou e-mail sem
+# diferenciar maiúsculas (ver `EmailOrUsernameModelBackend.authenticate`).
+# A tabela pertence ao `django.contrib.auth`, por isso SQL direto.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0002_alter_funcionario_employee_id_number_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_username_lower_idx ON auth_user (LOWER(username));',
+            reverse_sql='DROP INDEX auth_user_username_lower_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX auth_user_email_lower_idx;',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:09
+
+import re
+
+from django.db import migrations, models
+
+
+def iniciar_sequencia(apps, schema_editor):
+    """Começa depois da maior matrícula 'EMPnnnn' gerada pelo esquema antigo (EMP + pk)."""
+    Funcionario = apps.get_model('core', 'Funcionario')
+    SequenciaMatricula = apps.get_model('core', 'SequenciaMatricula')
+    maior = 0
+    for matricula in Funcionario.objects.filter(employee_id_number__startswith='EMP').values_list('employee_id_number', flat=True):
+        numero = re.fullmatch(r'EMP(\d+)', matricula)
+        if numero:
+            maior = max(maior, int(numero.group(1)))
+    SequenciaMatricula.objects.create(pk=1, proximo=maior + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_indices_login'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaMatricula',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proximo', models.PositiveBigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Sequência de Matrículas',
+            },
+        ),
+        migrations.RunPython(iniciar_sequencia, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_sequenciamatricula'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailSaida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assunto', models.CharField(max_length=998, verbose_name='Assunto')),
+                ('corpo', models.TextField(verbose_name='Corpo')),
+                ('remetente', models.CharField(blank=True, max_length=254, verbose_name='Remetente')),
+                ('destinatarios', models.JSONField(default=list, verbose_name='Destinatários')),
+                ('copia', models.JSONField(blank=True, default=list, verbose_name='Cc')),
+                ('copia_oculta', models.JSONField(blank=True, default=list, verbose_name='Cco')),
+                ('responder_para', models.JSONField(blank=True, default=list, verbose_name='Responder para')),
+                ('cabecalhos', models.JSONField(blank=True, default=dict, verbose_name='Cabeçalhos')),
+                ('alternativas', models.JSONField(blank=True, default=list, verbose_name='Alternativas')),
+                ('situacao', models.CharField(choices=[('PENDENTE', 'Pendente'), ('ENVIADO', 'Enviado'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=10, verbose_name='Situação')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa')),
+                ('lote', models.UUIDField(blank=True, editable=False, null=True)),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último erro')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True, verbose_name='Enviado em')),
+            ],
+            options={
+                'verbose_name': 'E-mail na Caixa de Saída',
+                'verbose_name_plural': 'E-mails na Caixa de Saída',
+                'indexes': [models.Index(condition=models.Q(('situacao', 'PENDENTE')), fields=['proxima_tentativa', 'id'], name='email_pendente_idx')],
+            },
+        ),
+    ]
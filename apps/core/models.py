@@ -1,5 +1,7 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 
 class Cliente(models.Model):
     user = models.OneToOneField(
@@ -44,12 +46,92 @@ class Funcionario(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.employee_id_number:
-            # Generate matricula as EMP + pk, but since pk not set yet, use a counter or something
-            # For simplicity, use a random or timestamp, but better to use pk after save
-            super().save(*args, **kwargs)
-            self.employee_id_number = f"EMP{self.pk:04d}"
-            # Note: this will cause a second save, but it's fine
+            # Matrícula reservada antes do INSERT: uma única escrita por funcionário
+            self.employee_id_number = SequenciaMatricula.formatar(SequenciaMatricula.reservar(1)[0])
         super().save(*args, **kwargs)
     
     def __str__(self):
-        return f"{self.full_name} ({self.get_job_title_display()})"
\ No newline at end of file
+        return f"{self.full_name} ({self.get_job_title_display()})"
+
+
+class SequenciaMatricula(models.Model):
+    """
+    Próximo número de matrícula ('EMP0001', 'EMP0002'...), numa única linha.
+
+    `reservar(n)` separa um bloco de `n` números com um UPDATE; importações em
+    lote reservam o bloco inteiro de uma vez e cada funcionário é gravado já
+    com a sua matrícula. Números de transações desfeitas não são reaproveitados.
+    """
+    PREFIXO = 'EMP'
+
+    proximo = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        verbose_name = 'Sequência de Matrículas'
+
+    @classmethod
+    def reservar(cls, quantidade):
+        """Reserva `quantidade` números consecutivos e retorna o `range` reservado."""
+        with transaction.atomic():
+            # O UPDATE trava a linha (no SQLite, o banco) até o fim da transação
+            if not cls.objects.filter(pk=1).update(proximo=F('proximo') + quantidade):
+                cls.objects.create(pk=1, proximo=1 + quantidade)
+                return range(1, 1 + quantidade)
+            fim = cls.objects.values_list('proximo', flat=True).get(pk=1)
+        return range(fim - quantidade, fim)
+
+    @classmethod
+    def formatar(cls, numero):
+        return f"{cls.PREFIXO}{numero:04d}"
+
+
+class EmailSaida(models.Model):
+    """
+    E-mail na caixa de saída local.
+
+    Gravado por `correio.FilaEmailBackend` no lugar do envio direto e enviado
+    depois pelo comando `enviar_emails` (ver `correio.enviar_pendentes`). O
+    índice parcial sobre as pendentes mantém a busca pelas prontas para envio
+    proporcional a elas, e não ao histórico de enviadas.
+    """
+    PENDENTE = 'PENDENTE'
+    SITUACOES = [
+        (PENDENTE, 'Pendente'),
+        ('ENVIADO', 'Enviado'),
+        ('FALHOU', 'Falhou'),
+    ]
+
+    assunto = models.CharField(max_length=998, verbose_name='Assunto')
+    corpo = models.TextField(verbose_name='Corpo')
+    remetente = models.CharField(max_length=254, blank=True, verbose_name='Remetente')
+    destinatarios = models.JSONField(default=list, verbose_name='Destinatários')
+    copia = models.JSONField(default=list, blank=True, verbose_name='Cc')
+    copia_oculta = models.JSONField(default=list, blank=True, verbose_name='Cco')
+    responder_para = models.JSONField(default=list, blank=True, verbose_name='Responder para')
+    cabecalhos = models.JSONField(default=dict, blank=True, verbose_name='Cabeçalhos')
+    # Versões alternativas do corpo, como `[conteudo, mimetype]` (ex.: HTML)
+    alternativas = models.JSONField(default=list, blank=True, verbose_name='Alternativas')
+
+    situacao = models.CharField(max_length=10, choices=SITUACOES, default=PENDENTE, verbose_name='Situação')
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')
+    # Enquanto um envio está em andamento, é adiada pelo prazo da reserva
+    proxima_tentativa = models.DateTimeField(default=timezone.now, verbose_name='Próxima tentativa')
+    # Identifica o lote do processo que reservou a linha
+    lote = models.UUIDField(null=True, blank=True, editable=False)
+    ultimo_erro = models.TextField(blank=True, verbose_name='Último erro')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True, verbose_name='Enviado em')
+
+    class Meta:
+        verbose_name = 'E-mail na Caixa de Saída'
+        verbose_name_plural = 'E-mails na Caixa de Saída'
+        indexes = [
+            models.Index(
+                fields=['proxima_tentativa', 'id'],
+                name='email_pendente_idx',
+                condition=models.Q(situacao='PENDENTE')
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.assunto} -> {', '.join(self.destinatarios)} ({self.get_situacao_display()})"
@@ -0,0 +1,92 @@
+"""
+Papéis do usuário (funcionário / gerente) resolvidos uma vez por requisição.
+
+`PapeisMiddleware` coloca em `request.papeis` um `Papeis` preguiçoso: só é
+calculado se alguma view, decorador ou template o consultar. O resultado de
+funcionários e gerentes fica na sessão junto com o token 'papeis' de
+`versoes`; salvar ou apagar um `Funcionario` troca o token (ver
+`core/signals.py`), e a próxima requisição de cada sessão refaz a consulta.
+Como o token só é compartilhado entre processos com um cache compartilhado
+(ver `versoes`), os papéis guardados também expiram após `VALIDADE`
+segundos. Superusuários têm todos os papéis sem consulta alguma.
+
+Use `@papel_exigido('funcionario')` / `@papel_exigido('gerente')` nas views
+e `papeis.funcionario` / `papeis.gerente` nos templates (context processor
+`contexto`).
+"""
+
+import functools
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from . import versoes
+from .models import Funcionario
+
+CHAVE_SESSAO = 'papeis'
+# Segundos até os papéis guardados na sessão serem conferidos de novo no banco
+VALIDADE = 300
+
+Papeis = namedtuple('Papeis', 'funcionario gerente')
+
+NENHUM = Papeis(False, False)
+TODOS = Papeis(True, True)
+
+
+def _consultar(user):
+    linha = Funcionario.objects.filter(user_id=user.pk).values_list('is_manager', flat=True).first()
+    return NENHUM if linha is None else Papeis(True, bool(linha))
+
+
+def resolver(request):
+    """Papéis de `request.user`, da sessão quando o token 'papeis' não mudou."""
+    user = request.user
+    if not user.is_authenticated:
+        return NENHUM
+    if user.is_superuser:
+        return TODOS
+
+    sessao = getattr(request, 'session', None)
+    token = versoes.versao(CHAVE_SESSAO)[0]
+    agora = int(time.time())
+    if sessao is not None:
+        guardado = sessao.get(CHAVE_SESSAO)
+        # O user_id evita reaproveitar os papéis de outro login na mesma sessão
+        if guardado and guardado[:2] == [token, user.pk] and agora - guardado[2] < VALIDADE:
+            return Papeis(*guardado[3:])
+
+    papeis = _consultar(user)
+    if sessao is not None:
+        sessao[CHAVE_SESSAO] = [token, user.pk, agora, *papeis]
+    return papeis
+
+
+class PapeisMiddleware(MiddlewareMixin):
+    """Disponibiliza `request.papeis`; deve vir depois de `AuthenticationMiddleware`."""
+
+    def process_request(self, request):
+        request.papeis = SimpleLazyObject(lambda: resolver(request))
+
+
+def papel_exigido(papel, login_url=None):
+    """
+    Permite a view apenas a quem tem `papel` ('funcionario' ou 'gerente');
+    os demais são levados ao login, como `user_passes_test`.
+    """
+    def decorador(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if getattr(request.papeis, papel):
+                return view(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path(), login_url or settings.LOGIN_URL)
+        return wrapper
+    return decorador
+
+
+def contexto(request):
+    """Context processor: `papeis` nos templates."""
+    return {'papeis': getattr(request, 'papeis', NENHUM)}
@@ -0,0 +1,29 @@
+"""
+Sinais do app `core`.
+
+Mantêm o cache de usuários de `EmailOrUsernameModelBackend.get_user` e os
+papéis guardados nas sessões (`papeis`) em dia com alterações feitas via
+`save()`/`delete()` (login, troca de senha, admin, cadastro de funcionário).
+`QuerySet.update` não dispara sinais; quem atualizar usuários ou
+funcionários em massa deve chamar `backends.invalidar_usuario()` /
+`versoes.invalidar('papeis')`.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import versoes
+from .backends import invalidar_usuario
+from .models import Funcionario
+from .papeis import CHAVE_SESSAO
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidar_usuario_alterado(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Funcionario)
+def invalidar_papeis(sender, **kwargs):
+    versoes.invalidar(CHAVE_SESSAO)
@@ -13,16 +13,3 @@ def replace(value, arg):
     except Exception:
         return value
 
-
-@register.filter
-def is_employee(user):
-    """Retorna True se o usuário for superuser ou possuir um registro Funcionario relacionado."""
-    try:
-        if user is None:
-            return False
-        if getattr(user, 'is_superuser', False):
-            return True
-        # Verifica relação one-to-one com Funcionario de forma segura
-        return hasattr(user, 'funcionario')
-    except Exception:
-        return False
\ No newline at end of file
@@ -15,6 +15,260 @@ Exemplo:
 
 """
 
-from django.test import TestCase
+import smtplib
+import unittest
+from datetime import timedelta
 
-# Arquivo preparado para receber testes do app `core`.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail import EmailMessage, send_mail
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import correio
+from . import versoes
+from .backends import EmailOrUsernameModelBackend, esquecer_usuario, invalidar_usuario, versao_usuario
+from .models import EmailSaida, Funcionario
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # dependência só de testes (requirements-dev.txt)
+    Controller = None
+
+# Cache em memória para os testes que dependem dos tokens de `versoes`: o
+# cache em arquivos do projeto é compartilhado com o servidor e entre execuções
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'testes'}}
+
+
+@override_settings(AUTH_USUARIO_TTL=30, CACHES=CACHE_LOCAL)
+class EmailOrUsernameBackendTests(TestCase):
+    def setUp(self):
+        esquecer_usuario()
+        self.backend = EmailOrUsernameModelBackend()
+        self.user = User.objects.create_user('Maria', 'Maria@Posto.com', 'senha-forte-123')
+
+    def test_login_por_username_ou_email_sem_diferenciar_maiusculas(self):
+        for login in ('Maria', 'maria', 'maria@posto.com', 'MARIA@POSTO.COM'):
+            self.assertEqual(self.backend.authenticate(None, login, 'senha-forte-123'), self.user)
+        self.assertIsNone(self.backend.authenticate(None, 'maria', 'errada'))
+        self.assertIsNone(self.backend.authenticate(None, 'joana', 'senha-forte-123'))
+
+    def test_busca_sem_diferenciar_maiusculas_usa_indice(self):
+        plano = User.objects.alias(email_lower=Lower('email')).filter(email_lower=Lower(Value('x'))).explain()
+        self.assertIn('auth_user_email_lower_idx', plano)
+
+    def test_get_user_usa_cache_ate_o_usuario_ser_salvo(self):
+        self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+        # Só o token no cache, nenhuma consulta
+        with self.assertNumQueries(0):
+            copia = self.backend.get_user(self.user.pk)
+        copia.first_name = 'Alterado'
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, '')
+
+        self.user.first_name = 'Maria'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.backend.get_user(self.user.pk).first_name, 'Maria')
+
+    def test_senha_trocada_ou_usuario_desativado_em_outro_processo_vale_na_hora(self):
+        self.backend.get_user(self.user.pk)
+
+        # Alteração feita por outro processo: a linha muda e, no commit, o
+        # sinal de lá troca o token no cache compartilhado
+        User.objects.filter(pk=self.user.pk).update(password='outro-hash')
+        versoes.trocar(versao_usuario(self.user.pk))
+        self.assertEqual(self.backend.get_user(self.user.pk).password, 'outro-hash')
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        versoes.trocar(versao_usuario(self.user.pk))
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+        User.objects.filter(pk=self.user.pk).delete()
+        versoes.trocar(versao_usuario(self.user.pk))
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_update_sem_sinal_vale_apos_invalidar_usuario(self):
+        self.backend.get_user(self.user.pk)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertFalse(self.backend.get_user(self.user.pk).is_staff)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_usuario(self.user.pk)
+        self.assertTrue(self.backend.get_user(self.user.pk).is_staff)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PapeisTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('joao', 'joao@posto.com', 'senha-forte-123')
+        self.funcionario = Funcionario.objects.create(
+            user=self.user, employee_id_number='EMP0001', full_name='João', job_title='FRENTISTA', is_manager=False
+        )
+        self.client.force_login(self.user)
+
+    def test_papeis_ficam_na_sessao_ate_o_funcionario_mudar(self):
+        self.assertEqual(self.client.get(reverse('register_funcionario')).status_code, 302)
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('home'))
+        self.assertFalse(any('core_funcionario' in c['sql'] for c in consultas.captured_queries))
+
+        self.funcionario.is_manager = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.funcionario.save()
+        self.assertEqual(self.client.get(reverse('register_funcionario')).status_code, 200)
+
+
+class ImportacaoFuncionariosTests(TestCase):
+    def setUp(self):
+        gerente = User.objects.create_superuser('gerente', 'gerente@posto.com', 'senha-forte-123')
+        self.client.force_login(gerente)
+
+    def _csv(self, *linhas):
+        cabecalho = 'username,email,password,full_name,job_title,is_manager'
+        return self.client.post(reverse('importar_funcionarios'), '\n'.join((cabecalho,) + linhas), content_type='text/csv')
+
+    def test_importa_todos_com_matriculas_em_sequencia(self):
+        Funcionario.objects.create(
+            user=User.objects.create_user('antigo', 'antigo@posto.com'), full_name='Antigo', job_title='CAIXA'
+        )
+        resposta = self._csv(
+            'ana,ana@posto.com,Bomba-Diesel-42,Ana,frentista,nao',
+            'bia,bia@posto.com,Caixa-Forte-77,Bia,CAIXA,sim',
+        )
+        self.assertEqual(resposta.status_code, 201)
+
+        antigo = Funcionario.objects.get(user__username='antigo').employee_id_number
+        numero = int(antigo[3:])
+        self.assertEqual(
+            [f['matricula'] for f in resposta.json()['funcionarios']],
+            [f'EMP{numero + 1:04d}', f'EMP{numero + 2:04d}']
+        )
+        bia = Funcionario.objects.select_related('user').get(user__username='bia')
+        self.assertTrue(bia.is_manager)
+        self.assertTrue(bia.user.check_password('Caixa-Forte-77'))
+        self.assertFalse(Funcionario.objects.get(user__username='ana').is_manager)
+
+    def test_linha_invalida_cancela_a_importacao_inteira(self):
+        resposta = self._csv(
+            'ana,ana@posto.com,Bomba-Diesel-42,Ana,FRENTISTA,',
+            'Gerente,outro@posto.com,Caixa-Forte-77,Outro,CAIXA,',
+            'ana2,ANA@posto.com,Frentista-99x,Ana 2,CAIXA,',
+            'ze,ze@posto.com,123,Zé,PILOTO,',
+        )
+        self.assertEqual(resposta.status_code, 400)
+        erros = ' '.join(resposta.json()['erros'])
+        for trecho in ("Linha 4: job_title", "Linha 2: username 'gerente' já está em uso", "repetido na linha 1"):
+            self.assertIn(trecho, erros)
+        self.assertFalse(User.objects.filter(username='ana').exists())
+
+
+class BackendInstavel(LocMemEmailBackend):
+    """Backend de envio dos testes: cai na primeira mensagem e recusa endereços '@recusa'."""
+
+    falhas = []
+
+    def send_messages(self, messages):
+        if BackendInstavel.falhas:
+            raise BackendInstavel.falhas.pop(0)
+        if any(d.endswith('@recusa.com') for m in messages for d in m.recipients()):
+            raise smtplib.SMTPRecipientsRefused({'x@recusa.com': (550, b'No such user')})
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='apps.core.correio.FilaEmailBackend',
+    CORREIO_BACKEND_ENVIO='apps.core.tests.BackendInstavel',
+)
+class CaixaSaidaTests(TestCase):
+    def test_redefinicao_de_senha_vai_para_a_fila_e_depois_e_enviada(self):
+        User.objects.create_user('maria', 'maria@posto.com', 'senha-forte-123')
+        resposta = self.client.post(reverse('password_reset'), {'email': 'maria@posto.com'})
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailSaida.objects.get().destinatarios, ['maria@posto.com'])
+
+        self.assertEqual(correio.enviar_pendentes(), {'enviados': 1, 'falhas': 0, 'adiados': 0})
+        self.assertEqual(mail.outbox[0].to, ['maria@posto.com'])
+        self.assertEqual(correio.situacao()['ENVIADO'], 1)
+
+    def test_erro_temporario_reagenda_com_espera_e_recusa_definitiva_falha(self):
+        for destino in ('a@posto.com', 'x@recusa.com', 'b@posto.com'):
+            send_mail('Assunto', 'Corpo', 'posto@posto.com', [destino])
+        BackendInstavel.falhas = [smtplib.SMTPServerDisconnected('caiu')]
+        agora = timezone.now()
+
+        self.assertEqual(correio.enviar_pendentes(agora), {'enviados': 0, 'falhas': 0, 'adiados': 3})
+        primeira = EmailSaida.objects.order_by('id').first()
+        self.assertEqual(primeira.tentativas, 1)
+        self.assertEqual(primeira.proxima_tentativa, agora + correio.ESPERA_INICIAL)
+
+        # As outras duas voltaram para a fila sem contar tentativa
+        self.assertEqual(correio.enviar_pendentes(agora), {'enviados': 1, 'falhas': 1, 'adiados': 0})
+        self.assertEqual(correio.enviar_pendentes(agora + timedelta(seconds=31))['enviados'], 1)
+        self.assertEqual(
+            sorted(EmailSaida.objects.values_list('situacao', flat=True)), ['ENVIADO', 'ENVIADO', 'FALHOU']
+        )
+
+    @override_settings(EMAIL_TIMEOUT=30)
+    def test_reserva_cobre_o_lote_e_cada_envio_e_marcado_na_hora(self):
+        for indice in range(3):
+            send_mail(f'Assunto {indice}', 'Corpo', 'posto@posto.com', [f'{indice}@posto.com'])
+        # Dez mensagens a 30 s cada passam da reserva mínima de 5 minutos
+        self.assertEqual(correio.prazo_reserva(10), timedelta(seconds=300))
+        self.assertEqual(correio.prazo_reserva(50), timedelta(seconds=1500))
+        agora = timezone.now()
+
+        emails = correio._reservar(agora, 50)
+        self.assertEqual(EmailSaida.objects.get(pk=emails[0].pk).proxima_tentativa, agora + correio.RESERVA)
+
+        situacoes = []
+
+        class Observador(BackendInstavel):
+            def send_messages(self, messages):
+                # Situação gravada das mensagens do lote antes de cada envio
+                situacoes.append(sorted(EmailSaida.objects.values_list('situacao', flat=True)))
+                return super().send_messages(messages)
+
+        self.assertEqual(correio._enviar_lote(Observador(), emails, agora), (3, 0, 0))
+        self.assertEqual(situacoes, [
+            ['PENDENTE', 'PENDENTE', 'PENDENTE'],
+            ['ENVIADO', 'PENDENTE', 'PENDENTE'],
+            ['ENVIADO', 'ENVIADO', 'PENDENTE'],
+        ])
+
+    @unittest.skipIf(Controller is None, "aiosmtpd não instalado")
+    def test_envia_o_lote_por_uma_unica_conexao_smtp(self):
+        class Servidor:
+            def __init__(self):
+                self.sessoes, self.mensagens = set(), []
+
+            async def handle_DATA(self, server, session, envelope):
+                self.sessoes.add(id(session))
+                self.mensagens.append(envelope.rcpt_tos)
+                return '250 OK'
+
+        servidor = Servidor()
+        controlador = Controller(servidor, hostname='127.0.0.1', port=0)
+        controlador.start()
+        self.addCleanup(controlador.stop)
+        porta = controlador.server.sockets[0].getsockname()[1]
+
+        EmailMessage('Um', 'Corpo', 'posto@posto.com', ['a@posto.com']).send()
+        EmailMessage('Dois', 'Corpo', 'posto@posto.com', ['b@posto.com']).send()
+        with self.settings(
+            CORREIO_BACKEND_ENVIO='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=porta, EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+        ):
+            self.assertEqual(correio.enviar_pendentes()['enviados'], 2)
+        self.assertEqual(servidor.mensagens, [['a@posto.com'], ['b@posto.com']])
+        self.assertEqual(len(servidor.sessoes), 1)
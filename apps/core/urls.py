@@ -9,4 +9,5 @@ urlpatterns = [
     path('contato/', views.contato, name='contato'),
     path('funcionarios/adicionar/', views.adicionar_funcionario, name='adicionar_funcionario'),
     path('funcionarios/register/', views.register_funcionario, name='register_funcionario'),
+    path('funcionarios/importar/', views.importar_funcionarios_view, name='importar_funcionarios'),
 ]
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Tokens de versão guardados no cache.
+
+Cada nome tem no cache um token aleatório e o instante da última mudança.
+Caches, sessões e ETags derivados guardam o token junto com o dado; quando
+a origem muda, `invalidar()` troca o token e tudo que dependia da versão
+anterior deixa de ser usado, sem precisar apagar chave por chave.
+
+No `core`: 'papeis' (papéis guardados nas sessões, ver `papeis`) e
+'usuario:<pk>' (usuários em cache em `backends.get_user`). Os dados
+públicos do posto ('estoque', 'servicos', 'arquivo') ficam em
+`apps.gerenciamento.versoes`, que usa estas mesmas funções.
+
+Como as chaves ficam no cache configurado em `CACHES`, processos diferentes
+só enxergam as mesmas versões se o backend for compartilhado; o padrão do
+projeto é o cache em arquivos (memcached/redis também servem). Com um
+`LocMemCache` a versão valeria por processo.
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+PREFIXO = 'versao:'
+
+
+def versao(nome):
+    """Retorna `(token, atualizado_em)` da versão atual de `nome`."""
+    chave = PREFIXO + nome
+    atual = cache.get(chave)
+    if atual is None:
+        atual = (uuid.uuid4().hex, timezone.now().replace(microsecond=0))
+        # `add` não sobrescreve um token criado por outra requisição ao mesmo tempo
+        if not cache.add(chave, atual, timeout=None):
+            atual = cache.get(chave, atual)
+    return atual
+
+
+def trocar(nome):
+    """Gera imediatamente uma nova versão para `nome` e retorna o token."""
+    token = uuid.uuid4().hex
+    cache.set(PREFIXO + nome, (token, timezone.now().replace(microsecond=0)), timeout=None)
+    return token
+
+
+def invalidar(nome):
+    """Gera uma nova versão para `nome` assim que a transação atual for confirmada."""
+    transaction.on_commit(lambda: trocar(nome))
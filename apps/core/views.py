@@ -2,23 +2,18 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from .forms import CustomUserCreationForm, ContatoForm, FuncionarioForm
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import Funcionario
-
-
-def is_manager_or_superuser(user):
-    if user.is_superuser:
-        return True
-    try:
-        funcionario = Funcionario.objects.get(user=user)
-        return funcionario.is_manager
-    except Funcionario.DoesNotExist:
-        return False
+from .importacao import ImportacaoInvalida, importar, ler_importacao
+from .papeis import papel_exigido
+from apps.gerenciamento.roteamento import ler_da_replica
 
 
+@ler_da_replica
 def home(request):
     return render(request, 'core/home.html', {
         'titulo': 'Posto Lucas - Seu Combustível com Qualidade'
@@ -80,7 +75,7 @@ def contato(request):
 
 
 @login_required
-@user_passes_test(is_manager_or_superuser)
+@papel_exigido('gerente')
 def adicionar_funcionario(request):
     if request.method == 'POST':
         form = FuncionarioForm(request.POST)
@@ -95,7 +90,7 @@ def adicionar_funcionario(request):
 
 
 @login_required
-@user_passes_test(is_manager_or_superuser)
+@papel_exigido('gerente')
 def register_funcionario(request):
     """Permite que um superusuário registre um novo usuário e seu `Funcionario` associado."""
     if request.method == 'POST':
@@ -103,7 +98,7 @@ def register_funcionario(request):
         func_form = FuncionarioForm(request.POST)
 
         if user_form.is_valid() and func_form.is_valid():
-            user = user_form.save()
+            user = user_form.save(commit=False)
             # por padrão, tornar o usuário criado como staff para poder acessar o admin se necessário
             user.is_staff = True
             user.save()
@@ -122,4 +117,21 @@ def register_funcionario(request):
         'user_form': user_form,
         'func_form': func_form,
         'titulo': 'Registrar Funcionário'
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+@papel_exigido('gerente')
+@require_POST
+def importar_funcionarios_view(request):
+    """
+    Recebe vários funcionários em JSON ou CSV e cria todos numa única
+    transação; se alguma linha for inválida, nenhum é criado.
+    """
+    try:
+        linhas = ler_importacao(request.body, request.content_type)
+        criados = importar(linhas)
+    except ImportacaoInvalida as e:
+        return JsonResponse({'erros': e.erros}, status=400)
+    return JsonResponse({'criados': len(criados), 'funcionarios': criados}, status=201)
+
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EstoqueGasolina, Servico, RegistroServico
+from .models import EstoqueGasolina, Servico, RegistroServico, Movimento, ReajusteAgendado
 
 
 @admin.register(EstoqueGasolina)
@@ -11,7 +11,8 @@ class EstoqueGasolinaAdmin(admin.ModelAdmin):
 
 @admin.register(Servico)
 class ServicoAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'preco_unitario', 'criado_em')
+    list_display = ('nome', 'categoria', 'preco_unitario', 'criado_em')
+    list_filter = ('categoria',)
     search_fields = ('nome',)
 
 
@@ -20,3 +21,18 @@ class RegistroServicoAdmin(admin.ModelAdmin):
     list_display = ('servico', 'tipo', 'quantidade', 'preco_unitario', 'total', 'data')
     list_filter = ('tipo',)
     search_fields = ('servico__nome',)
+
+
+@admin.register(Movimento)
+class MovimentoAdmin(admin.ModelAdmin):
+    list_display = ('data', 'origem', 'tipo', 'item_label', 'quantidade', 'preco_unitario', 'total')
+    list_filter = ('origem', 'tipo')
+    search_fields = ('item_label',)
+
+
+@admin.register(ReajusteAgendado)
+class ReajusteAgendadoAdmin(admin.ModelAdmin):
+    list_display = ('item', 'preco', 'vigente_em', 'situacao', 'aplicado_em')
+    list_filter = ('situacao',)
+    search_fields = ('item',)
+    readonly_fields = ('situacao', 'aplicado_em')
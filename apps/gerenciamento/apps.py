@@ -6,6 +6,7 @@ Usado pelo framework para detectar configurações específicas do app.
 """
 
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class GerenciamentoConfig(AppConfig):
@@ -13,3 +14,11 @@ class GerenciamentoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     # Nome usado pelo Django para referenciar o pacote do app
     name = 'apps.gerenciamento'
+
+    def ready(self):
+        # Registra os receptores de sinais (invalidação de caches)
+        from . import signals  # noqa: F401
+        from .servicos_padrao import semear_apos_migrate
+
+        # Serviços padrão criados uma vez após as migrações, não a cada acesso
+        post_migrate.connect(semear_apos_migrate, sender=self)
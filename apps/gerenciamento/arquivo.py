@@ -0,0 +1,253 @@
+"""
+Arquivo mensal dos ledgers (compras, vendas e serviços).
+
+As tabelas principais guardam só os meses recentes. `arquivar()` move, em
+bloco (`INSERT ... SELECT` + `DELETE` numa transação por mês), cada mês
+fechado mais antigo que `RETENCAO_DIAS` para uma tabela própria,
+`<tabela do ledger>_AAAAMM`, com as mesmas colunas, as mesmas pks e índices
+`(data, id)` / `(item, data)`. Assim a tabela principal, seus índices e o
+custo das consultas do dia a dia ficam limitados ao período de retenção.
+
+Os `Movimento` gerados pelas linhas movidas vão, na mesma transação, para
+`<tabela de Movimento>_AAAAMM` (partição 'movimentos'). `ResumoMovimento`
+não muda: os totais por dia/hora continuam valendo para o período inteiro e
+`resumos.calcular_dos_ledgers()` já lê as partições arquivadas.
+
+Cada tabela de arquivo é lida por um modelo não gerenciado criado em tempo
+de execução com os mesmos campos do ledger, então filtros, `select_related`
+e `values_list` funcionam como na tabela principal. `consultar()` devolve,
+da mais nova para a mais antiga, a tabela principal e apenas os meses
+arquivados que o intervalo de datas pedido alcança; relatórios sem
+intervalo (reprocessamento de custos e resumos) recebem todas.
+
+As partições existentes (`ParticaoArquivo`) ficam em memória enquanto o
+token 'arquivo' de `versoes` não muda.
+"""
+
+import threading
+from collections import defaultdict, namedtuple
+from datetime import datetime, time, timedelta
+
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import versoes
+from .ledgers import LEDGERS, filtrar, intervalo_local
+from .models import Movimento, ParticaoArquivo
+from .roteamento import primario
+
+# Dias mantidos na tabela principal; meses que terminam antes disso são arquivados
+RETENCAO_DIAS = 90
+
+# Uma partição de consulta; `fim` é None na tabela principal (sem limite superior)
+Particao = namedtuple('Particao', 'queryset inicio fim')
+
+# Tabelas com arquivo mensal -> (modelo, campo de data)
+ARQUIVAVEIS = {
+    **{ledger: (modelo, campo_data) for ledger, (modelo, campo_data, _) in LEDGERS.items()},
+    'movimentos': (Movimento, 'data'),
+}
+
+# Origem, em `Movimento`, das linhas de cada ledger
+ORIGENS = {'compras': 'COMPRA', 'vendas': 'VENDA', 'servicos': 'SERVICO'}
+
+_memo = {}
+_trava = threading.Lock()
+
+
+class ArquivamentoInconsistente(Exception):
+    """O número de linhas copiadas para o arquivo difere do número de linhas apagadas."""
+
+
+def inicio_do_mes(instante):
+    """Primeiro dia do mês local de `instante` (date ou datetime)."""
+    if isinstance(instante, datetime):
+        instante = timezone.localtime(instante).date()
+    return instante.replace(day=1)
+
+
+def proximo_mes(mes):
+    return (mes + timedelta(days=32)).replace(day=1)
+
+
+def limites(mes):
+    """`[inicio, fim)` do mês `mes` no fuso local."""
+    fuso = timezone.get_current_timezone()
+    return (
+        datetime.combine(mes, time.min, tzinfo=fuso),
+        datetime.combine(proximo_mes(mes), time.min, tzinfo=fuso),
+    )
+
+
+def nome_tabela(ledger, mes):
+    modelo = ARQUIVAVEIS[ledger][0]
+    return f"{modelo._meta.db_table}_{mes:%Y%m}"
+
+
+def modelo_arquivo(ledger, mes):
+    """Modelo não gerenciado, com os campos do ledger, sobre a tabela de arquivo de `mes`."""
+    modelo, campo_data = ARQUIVAVEIS[ledger]
+    nome = f"{modelo.__name__}Arquivo{mes:%Y%m}"
+    with _trava:
+        try:
+            return apps.get_model(modelo._meta.app_label, nome)
+        except LookupError:
+            pass
+
+        campos = {}
+        for campo in modelo._meta.local_fields:
+            nome_campo, _, args, kwargs = campo.deconstruct()
+            if campo.is_relation:
+                # Sem acessor reverso no combustível/serviço
+                kwargs['related_name'] = '+'
+            campos[nome_campo] = campo.__class__(*args, **kwargs)
+        # Combustível/serviço nos ledgers; `item` em `Movimento`
+        relacionado = next((campo.name for campo in modelo._meta.local_fields if campo.is_relation), 'item')
+        sufixo = f"{ledger[:4]}_{mes:%Y%m}"
+
+        meta = type('Meta', (), {
+            'app_label': modelo._meta.app_label,
+            'db_table': nome_tabela(ledger, mes),
+            'managed': False,
+            'verbose_name': f"{modelo._meta.verbose_name} ({mes:%m/%Y})",
+            'indexes': [
+                models.Index(fields=[campo_data, 'id'], name=f"arq_{sufixo}_data"),
+                models.Index(fields=[relacionado, campo_data], name=f"arq_{sufixo}_item"),
+            ],
+        })
+        return type(nome, (models.Model,), {'__module__': __name__, 'Meta': meta, **campos})
+
+
+def _carregar_particoes():
+    por_ledger = defaultdict(list)
+    with primario():
+        linhas = list(ParticaoArquivo.objects.order_by('ledger', '-mes').values_list('ledger', 'mes'))
+    for ledger, mes in linhas:
+        inicio, fim = limites(mes)
+        por_ledger[ledger].append((mes, inicio, fim, modelo_arquivo(ledger, mes)))
+    return dict(por_ledger)
+
+
+def particoes(ledger):
+    """Meses arquivados de `ledger` como `(mes, inicio, fim, modelo)`, do mais novo ao mais antigo."""
+    token = versoes.versao('arquivo')[0]
+    with _trava:
+        atual = _memo.get('particoes')
+    if atual is None or atual[0] != token:
+        atual = (token, _carregar_particoes())
+        with _trava:
+            _memo['particoes'] = atual
+    return atual[1].get(ledger, [])
+
+
+def no_intervalo(ledger, inicio=None, fim=None):
+    """
+    Partições de `ledger` que se sobrepõem a `[inicio, fim)` (datetimes, None
+    sem limite): a tabela principal e os meses arquivados, do mais novo para
+    o mais antigo.
+    """
+    candidatas = [Particao(ARQUIVAVEIS[ledger][0].objects.all(), None, None)]
+    candidatas += [
+        Particao(modelo_mes.objects.all(), inicio_mes, fim_mes)
+        for _, inicio_mes, fim_mes, modelo_mes in particoes(ledger)
+        if (fim is None or inicio_mes < fim) and (inicio is None or fim_mes > inicio)
+    ]
+    return candidatas
+
+
+def consultar(ledger, filtros=None, relacionado=None):
+    """
+    Querysets filtrados (ver `ledgers.filtrar`) das partições que o intervalo
+    de `filtros` alcança (ver `no_intervalo`).
+    """
+    filtros = filtros or {}
+    inicio, fim = intervalo_local(filtros.get('data_inicio'), filtros.get('data_fim'))
+    resultado = []
+    for particao in no_intervalo(ledger, inicio, fim):
+        queryset = particao.queryset
+        if relacionado:
+            queryset = queryset.select_related(relacionado)
+        resultado.append(particao._replace(queryset=filtrar(ledger, filtros, queryset)))
+    return resultado
+
+
+def _criar_tabela(modelo):
+    # DDL fora da transação: o editor de esquema do SQLite não roda dentro de `atomic`
+    if modelo._meta.db_table not in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.create_model(modelo)
+
+
+def _copiar(origem, ledger, mes):
+    """
+    Copia as linhas de `origem` para a tabela de arquivo de `ledger` em `mes`
+    e as apaga da tabela principal. Roda dentro da transação de `_mover`.
+    """
+    destino = modelo_arquivo(ledger, mes)
+    campos = origem.model._meta.local_concrete_fields
+    select, parametros = origem.values_list(*[campo.attname for campo in campos]).query.sql_with_params()
+    colunas = ', '.join(connection.ops.quote_name(campo.column) for campo in campos)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(destino._meta.db_table)} ({colunas}) {select}",
+            parametros
+        )
+        copiadas = cursor.rowcount
+    apagadas, _ = origem.delete()
+    if copiadas != apagadas:
+        raise ArquivamentoInconsistente(
+            f"{ledger} {mes:%m/%Y}: {copiadas} linhas copiadas e {apagadas} apagadas."
+        )
+    particao, _ = ParticaoArquivo.objects.get_or_create(
+        ledger=ledger, mes=mes, defaults={'tabela': destino._meta.db_table}
+    )
+    ParticaoArquivo.objects.filter(pk=particao.pk).update(linhas=F('linhas') + copiadas)
+    return copiadas
+
+
+def _mover(ledger, mes):
+    modelo, campo_data, _ = LEDGERS[ledger]
+    inicio, fim = limites(mes)
+    origem = modelo.objects.filter(**{f'{campo_data}__gte': inicio, f'{campo_data}__lt': fim}).order_by()
+
+    with transaction.atomic():
+        # Os movimentos primeiro: a subconsulta precisa das linhas do ledger ainda na tabela principal
+        _copiar(
+            Movimento.objects.filter(origem=ORIGENS[ledger], registro_id__in=origem.values('pk')).order_by(),
+            'movimentos', mes
+        )
+        return _copiar(origem, ledger, mes)
+
+
+def arquivar(ate=None, retencao_dias=RETENCAO_DIAS):
+    """
+    Move para o arquivo todos os meses anteriores a `ate` (padrão: o mês que
+    contém o instante de `retencao_dias` atrás, exclusive).
+
+    Returns:
+        lista de `(ledger, mes, linhas movidas)`.
+    """
+    ate = ate or inicio_do_mes(timezone.now() - timedelta(days=retencao_dias))
+    limite = limites(ate)[0]
+    movidos = []
+    for ledger, (modelo, campo_data, _) in LEDGERS.items():
+        primeira = (
+            modelo.objects.filter(**{f'{campo_data}__lt': limite})
+            .order_by(campo_data).values_list(campo_data, flat=True).first()
+        )
+        if primeira is None:
+            continue
+        mes = inicio_do_mes(primeira)
+        while mes < ate:
+            inicio, fim = limites(mes)
+            if modelo.objects.filter(**{f'{campo_data}__gte': inicio, f'{campo_data}__lt': fim}).exists():
+                _criar_tabela(modelo_arquivo(ledger, mes))
+                _criar_tabela(modelo_arquivo('movimentos', mes))
+                movidos.append((ledger, mes, _mover(ledger, mes)))
+            mes = proximo_mes(mes)
+    if movidos:
+        versoes.trocar('arquivo')
+    return movidos
+
@@ -0,0 +1,146 @@
+"""
+Últimas transações do financeiro mantidas em memória (buffer circular).
+
+Cada processo guarda, por origem (venda, compra, serviço), as
+`CAPACIDADE` transações mais recentes como registros `Transacao` com
+`__slots__`, com o nome do item já resolvido. `movimentos.registrar()`
+agenda `registrar_confirmados()` com `transaction.on_commit`, então só
+entram transações confirmadas e o painel do financeiro é montado sem
+consultar os ledgers.
+
+O buffer é semeado a partir de `Movimento` no primeiro acesso (e não no
+`AppConfig.ready()`, onde o banco pode ainda não existir). Gravações de
+outros processos são percebidas pelo banco: o buffer guarda o maior id de
+`Movimento` que reflete e, a cada acesso, compara-o com `MAX(id)` (uma
+busca no fim do índice da chave primária). As próprias gravações só avançam
+esse id se continuarem a sequência, isto é, se nenhum outro processo gravou
+no meio; caso contrário o próximo acesso semeia de novo.
+"""
+
+import threading
+from collections import deque
+
+from django.db.models import Max
+
+from .roteamento import primario
+from .models import Movimento, RegistroServico
+
+CAPACIDADE = 50
+ORIGENS = ('VENDA', 'COMPRA', 'SERVICO')
+TIPOS = dict(RegistroServico.TIPO_TRANSACAO)
+
+
+class Transacao:
+    """Resumo imutável de um `Movimento`, só com o que o painel exibe."""
+
+    __slots__ = ('origem', 'registro_id', 'tipo', 'item_label', 'quantidade', 'total', 'data')
+
+    def __init__(self, origem, registro_id, tipo, item_label, quantidade, total, data):
+        self.origem = origem
+        self.registro_id = registro_id
+        self.tipo = tipo
+        self.item_label = item_label
+        self.quantidade = quantidade
+        self.total = total
+        self.data = data
+
+    @classmethod
+    def de_movimento(cls, movimento):
+        return cls(
+            movimento.origem, movimento.registro_id, movimento.tipo, movimento.item_label,
+            movimento.quantidade, movimento.total, movimento.data
+        )
+
+    def get_tipo_display(self):
+        return TIPOS.get(self.tipo, self.tipo)
+
+    @property
+    def chave(self):
+        return (self.data, self.registro_id)
+
+
+CAMPOS = Transacao.__slots__
+
+
+class Atividade:
+    def __init__(self, capacidade=CAPACIDADE):
+        self.capacidade = capacidade
+        self.buffers = {origem: deque(maxlen=capacidade) for origem in ORIGENS}
+        # Maior id de `Movimento` que o buffer reflete (None = nunca semeado)
+        self.ultimo_id = None
+        self.trava = threading.Lock()
+
+    def _mesclar(self, origem, transacoes):
+        """Junta `transacoes` ao buffer sem duplicar e mantendo a ordem cronológica."""
+        buffer = self.buffers[origem]
+        ultima = buffer[-1].chave if buffer else None
+        novas = sorted(transacoes, key=lambda t: t.chave)
+        if ultima is None or all(t.chave > ultima for t in novas):
+            buffer.extend(novas)
+            return
+        existentes = {t.registro_id: t for t in buffer}
+        existentes.update((t.registro_id, t) for t in novas)
+        buffer.clear()
+        buffer.extend(sorted(existentes.values(), key=lambda t: t.chave)[-self.capacidade:])
+
+    def registrar_confirmados(self, movimentos):
+        """
+        Acrescenta `Movimento`s recém-confirmados. Se os ids continuam a
+        sequência do buffer, nenhuma outra gravação aconteceu no meio e o
+        buffer continua em dia; senão será semeado de novo no próximo acesso.
+        """
+        por_origem = {}
+        for movimento in movimentos:
+            por_origem.setdefault(movimento.origem, []).append(Transacao.de_movimento(movimento))
+        ids = sorted(movimento.pk for movimento in movimentos)
+        with self.trava:
+            for origem, transacoes in por_origem.items():
+                self._mesclar(origem, transacoes)
+            if self.ultimo_id is not None and ids == list(range(self.ultimo_id + 1, self.ultimo_id + 1 + len(ids))):
+                self.ultimo_id = ids[-1]
+
+    def semear(self):
+        # Do primário (ver `roteamento`): o buffer passa a valer pelo id lido antes
+        with primario():
+            ultimo_id = _ultimo_id()
+            linhas = {
+                origem: list(
+                    Movimento.objects.filter(origem=origem)
+                    .order_by('-data', '-id')
+                    .values_list(*CAMPOS)[:self.capacidade]
+                )
+                for origem in ORIGENS
+            }
+        with self.trava:
+            for origem, valores in linhas.items():
+                self._mesclar(origem, [Transacao(*v) for v in valores])
+            self.ultimo_id = ultimo_id
+
+    def _conferir(self):
+        """Semeia de novo se o banco tem gravações que o buffer não reflete."""
+        if self.ultimo_id is None:
+            self.semear()
+            return
+        with primario():
+            if _ultimo_id() != self.ultimo_id:
+                self.semear()
+
+    def recentes(self, limite=10):
+        """As `limite` transações mais recentes de cada origem, com uma só conferência no banco."""
+        self._conferir()
+        with self.trava:
+            return {
+                origem: [buffer[-n] for n in range(1, min(limite, len(buffer)) + 1)]
+                for origem, buffer in self.buffers.items()
+            }
+
+    def ultimas(self, origem, limite=10):
+        """As `limite` transações mais recentes de `origem`, da mais nova para a mais antiga."""
+        return self.recentes(limite)[origem]
+
+
+def _ultimo_id():
+    return Movimento.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+
+
+atividade = Atividade()
@@ -0,0 +1,66 @@
+"""
+Orçamentos de desempenho das principais views.
+
+Cada view tem um teto de consultas SQL por requisição e um teto de latência
+(mediana, em ms) medidos com o volume de `gerar_dados`. O comando
+`benchmark_views` mede todas, grava o resultado em JSON (comparável entre
+execuções) e falha se algum orçamento for estourado; os testes conferem os
+tetos de consultas com um volume pequeno.
+"""
+
+import statistics
+import time
+from collections import namedtuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+Orcamento = namedtuple('Orcamento', 'nome rota consultas ms')
+
+ORCAMENTOS = [
+    Orcamento('financeiro', 'financeiro', 6, 400),
+    Orcamento('estoque_gasolina', 'estoque_gasolina', 6, 100),
+    Orcamento('edit_combustiveis', 'edit_combustiveis', 5, 600),
+    Orcamento('lista_servicos', 'lista_servicos', 4, 500),
+]
+
+
+def medir(cliente, repeticoes=5, orcamentos=ORCAMENTOS):
+    """
+    Faz `repeticoes` GETs (após um de aquecimento) em cada view com `cliente`.
+
+    Retorna uma lista de dicionários com consultas, latências (mediana, p95 e
+    máxima, em ms) e se a view ficou dentro do orçamento.
+    """
+    resultados = []
+    for orcamento in orcamentos:
+        url = reverse(orcamento.rota)
+        cliente.get(url)
+
+        tempos = []
+        consultas = 0
+        status = None
+        for _ in range(repeticoes):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                resposta = cliente.get(url)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas = max(consultas, len(capturadas))
+            status = resposta.status_code
+
+        tempos.sort()
+        mediana = statistics.median(tempos)
+        resultados.append({
+            'view': orcamento.nome,
+            'url': url,
+            'status': status,
+            'consultas': consultas,
+            'ms_mediana': round(mediana, 2),
+            'ms_p95': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 2),
+            'ms_max': round(tempos[-1], 2),
+            'orcamento_consultas': orcamento.consultas,
+            'orcamento_ms': orcamento.ms,
+            'dentro': status == 200 and consultas <= orcamento.consultas and mediana <= orcamento.ms,
+        })
+    return resultados
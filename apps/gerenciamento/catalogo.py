@@ -0,0 +1,169 @@
+"""
+Catálogo de combustíveis e serviços mantido em memória.
+
+Guarda as instâncias de `EstoqueGasolina` (por tipo) e de `Servico` (por
+nome, com e sem os serviços de categoria 'COMBUSTIVEL', que espelham
+combustíveis), além das listas de choices já montadas. Os combustíveis
+valem enquanto o token 'catalogo' de `versoes` não muda, e os serviços
+enquanto 'servicos' não muda. Os sinais `post_save`/`post_delete` de
+`signals.py` (e os reajustes em massa) limpam a cópia deste processo na
+hora e trocam o token após o commit, então o próximo acesso em qualquer
+processo recarrega com uma consulta.
+
+O saldo dos combustíveis muda a cada venda, que troca apenas o token
+'estoque' (ver `operacoes.aplicar_delta`): uma venda não recarrega o
+catálogo, só os saldos, com uma consulta de `CAMPOS_SALDO` aplicada sobre
+cópias das instâncias do catálogo.
+
+O token só é visto pelos outros processos com um cache compartilhado (ver
+`versoes`); por isso cada cópia também expira após `VALIDADE` segundos,
+limitando o atraso quando o cache é local (`LocMemCache`).
+
+Dentro de uma transação o catálogo é lido direto do banco, já que ela pode
+conter alterações ainda não confirmadas.
+
+As instâncias são compartilhadas entre requisições: use-as apenas para
+leitura (copie antes de anotar atributos).
+"""
+
+import threading
+import time
+from copy import copy
+
+from django.db import connection
+
+from . import versoes
+from .roteamento import primario
+from .models import EstoqueGasolina, Servico
+
+# Segundos até a cópia deste processo ser recarregada mesmo sem troca de token
+VALIDADE = 60
+
+# Campos de `EstoqueGasolina` gravados a cada venda/compra (ver `operacoes.aplicar_delta`)
+CAMPOS_SALDO = ('quantidade_litros', 'data_ultima_atualizacao')
+
+_memo = {}
+_trava = threading.Lock()
+
+
+def _token(*nomes):
+    return tuple(versoes.versao(nome)[0] for nome in nomes)
+
+
+def _carregar(nome, token, fabricar):
+    if connection.in_atomic_block:
+        return fabricar()
+    agora = time.monotonic()
+    with _trava:
+        atual = _memo.get(nome)
+    if atual is not None and atual[0] == token and agora - atual[2] < VALIDADE:
+        return atual[1]
+    # Do primário: uma réplica atrasada deixaria dados antigos sob o token novo
+    with primario():
+        valor = fabricar()
+    with _trava:
+        _memo[nome] = (token, valor, agora)
+    return valor
+
+
+def _montar_catalogo():
+    return tuple(EstoqueGasolina.objects.order_by('tipo'))
+
+
+def _indexar(itens):
+    return {
+        'lista': itens,
+        'por_pk': {item.pk: item for item in itens},
+        'choices': [(item.pk, str(item)) for item in itens],
+    }
+
+
+def _montar_combustiveis(catalogo):
+    saldos = {pk: valores for pk, *valores in EstoqueGasolina.objects.values_list('pk', *CAMPOS_SALDO)}
+    itens = []
+    for item in catalogo:
+        if item.pk in saldos:
+            item = copy(item)
+            for campo, valor in zip(CAMPOS_SALDO, saldos[item.pk]):
+                setattr(item, campo, valor)
+            itens.append(item)
+    return _indexar(tuple(itens))
+
+
+def _montar_servicos():
+    todos = tuple(Servico.objects.order_by('nome'))
+    proprios = tuple(s for s in todos if s.categoria == 'SERVICO')
+    return {
+        'todos': todos,
+        'lista': proprios,
+        'por_pk': {s.pk: s for s in proprios},
+    }
+
+
+def limpar(*nomes):
+    """Descarta partes do catálogo deste processo ('combustiveis', 'servicos')."""
+    with _trava:
+        for nome in nomes:
+            _memo.pop(nome, None)
+        _memo.pop('saldos', None)
+        _memo.pop('simulacao', None)
+
+
+def _catalogo_combustiveis():
+    return _carregar('combustiveis', _token('catalogo'), _montar_catalogo)
+
+
+def _dados_combustiveis():
+    if connection.in_atomic_block:
+        # Sem cópia em memória: a leitura completa já traz os saldos
+        return _indexar(_montar_catalogo())
+    catalogo = _catalogo_combustiveis()
+    return _carregar('saldos', _token('catalogo', 'estoque'), lambda: _montar_combustiveis(catalogo))
+
+
+def _dados_servicos():
+    return _carregar('servicos', _token('servicos'), _montar_servicos)
+
+
+def combustiveis():
+    """Combustíveis ordenados por tipo."""
+    return _dados_combustiveis()['lista']
+
+
+def combustivel(pk):
+    return _dados_combustiveis()['por_pk'].get(pk)
+
+
+def choices_combustiveis():
+    """Choices `(pk, rótulo)` dos combustíveis, como os do antigo `ModelChoiceField`."""
+    return _dados_combustiveis()['choices']
+
+
+def servicos():
+    """Serviços do posto ordenados por nome, sem os espelhos de combustíveis."""
+    return _dados_servicos()['lista']
+
+
+def todos_servicos():
+    """Todos os serviços ordenados por nome, incluindo os espelhos de combustíveis."""
+    return _dados_servicos()['todos']
+
+
+def servico(pk):
+    return _dados_servicos()['por_pk'].get(pk)
+
+
+def choices_simulacao():
+    """Choices 'C:<pk>' / 'S:<pk>' do formulário de simulação do financeiro."""
+    def montar():
+        choices = [
+            (f"C:{c.pk}", f"Combustível - {c.get_tipo_display()} (R$ {c.preco_atual_litro})")
+            for c in _catalogo_combustiveis()
+        ]
+        choices.extend(
+            (f"S:{s.pk}", f"Serviço - {s.nome} (R$ {s.preco_unitario})")
+            for s in servicos()
+        )
+        return choices
+
+    return _carregar('simulacao', _token('catalogo', 'servicos'), montar)
@@ -0,0 +1,211 @@
+"""
+Motor incremental de custo (custo médio ponderado e PEPS/FIFO) dos combustíveis.
+
+Cada entrada atualiza o custo médio de `CustoCombustivel` e abre uma
+`CamadaCusto`; cada saída calcula o CMV pelos dois métodos, consome as
+camadas mais antigas e grava o resultado na própria `RegistroVenda`
+(`custo_medio_total` / `custo_fifo_total`). Assim a margem de um período é
+apenas `SUM(total_venda - custo)` sobre as vendas, sem reprocessar o ledger.
+
+O estado é criado na primeira movimentação de cada combustível. O saldo que
+já existia (ex.: estoque inicial cadastrado sem compra) vira uma camada
+inicial custeada pelo preço atual por litro, a melhor estimativa disponível.
+
+Deve ser usado dentro da mesma transação que grava a movimentação, depois
+do UPDATE condicional do saldo, que serializa os escritores de um mesmo
+combustível.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import arquivo, precos
+from .models import CamadaCusto, CustoCombustivel, EstoqueGasolina
+
+CENTAVOS = Decimal('0.01')
+QUATRO_CASAS = Decimal('0.0001')
+
+
+class MotorCusto:
+    """
+    Estado de custo de um combustível carregado em memória.
+
+    Aplique as movimentações em ordem com `entrada()` / `saida()` e chame
+    `salvar()` uma vez no final (um UPDATE do estado e operações em lote nas
+    camadas), o que serve tanto para uma venda isolada quanto para um lote.
+    """
+
+    def __init__(self, combustivel, saldo_anterior, data_inicial=None, custo_inicial=None):
+        self.combustivel = combustivel
+        self.estado, criado = CustoCombustivel.objects.get_or_create(combustivel=combustivel)
+        self.camadas = list(
+            CamadaCusto.objects
+            .filter(combustivel=combustivel, litros_restantes__gt=0)
+            .order_by('data', 'id')
+        )
+        self.alteradas = set()
+        if criado and saldo_anterior > 0:
+            self._abrir_camada(
+                saldo_anterior,
+                custo_inicial if custo_inicial is not None else combustivel.preco_atual_litro,
+                data_inicial or timezone.now()
+            )
+
+    def _abrir_camada(self, litros, custo_litro, data):
+        self.estado.valor_estoque += litros * custo_litro
+        self.estado.litros += litros
+        self.estado.custo_medio_litro = (self.estado.valor_estoque / self.estado.litros).quantize(QUATRO_CASAS)
+        self.camadas.append(CamadaCusto(
+            combustivel=self.combustivel,
+            data=data,
+            litros_restantes=litros,
+            custo_litro=custo_litro
+        ))
+
+    def entrada(self, litros, custo_litro, data=None):
+        self._abrir_camada(litros, custo_litro, data or timezone.now())
+
+    def saida(self, litros):
+        """Consome `litros` e retorna `(cmv_custo_medio, cmv_peps)`."""
+        custo_medio = (litros * self.estado.custo_medio_litro).quantize(CENTAVOS)
+
+        custo_fifo = Decimal('0')
+        restante = litros
+        for camada in self.camadas:
+            if restante <= 0:
+                break
+            if camada.litros_restantes <= 0:
+                continue
+            consumo = min(restante, camada.litros_restantes)
+            custo_fifo += consumo * camada.custo_litro
+            camada.litros_restantes -= consumo
+            restante -= consumo
+            if camada.pk:
+                self.alteradas.add(camada)
+        if restante > 0:
+            # Venda além do saldo custeado: usa o custo médio para o excedente
+            custo_fifo += restante * self.estado.custo_medio_litro
+
+        self.estado.litros -= litros
+        self.estado.valor_estoque -= litros * self.estado.custo_medio_litro
+        if self.estado.litros <= 0:
+            self.estado.valor_estoque = Decimal('0')
+        return custo_medio, custo_fifo.quantize(CENTAVOS)
+
+    def salvar(self):
+        self.estado.save()
+        CamadaCusto.objects.bulk_create([c for c in self.camadas if c.pk is None])
+        CamadaCusto.objects.bulk_update(self.alteradas, ['litros_restantes'])
+        self.alteradas = set()
+
+
+@transaction.atomic
+def reconstruir():
+    """
+    Refaz o estado de custo de todos os combustíveis reprocessando compras e
+    vendas em ordem cronológica (carga inicial ou correção).
+
+    O saldo anterior à primeira movimentação registrada é deduzido do saldo
+    atual e custeado pelo preço vigente naquele instante (histórico de preços).
+    """
+    CamadaCusto.objects.all().delete()
+    CustoCombustivel.objects.all().delete()
+    vendas_atualizadas = 0
+
+    # Meses arquivados também entram: o custo depende de toda a sequência
+    particoes_compras = [p.queryset for p in arquivo.no_intervalo('compras')]
+    particoes_vendas = [p.queryset for p in arquivo.no_intervalo('vendas')]
+
+    for combustivel in EstoqueGasolina.objects.select_for_update().order_by('pk'):
+        compras = [c for qs in particoes_compras for c in qs.filter(combustivel=combustivel).order_by('data_compra', 'id')]
+        vendas = [v for qs in particoes_vendas for v in qs.filter(combustivel=combustivel).order_by('data_venda', 'id')]
+        saldo_inicial = (
+            combustivel.quantidade_litros
+            - sum((c.quantidade_litros for c in compras), Decimal('0'))
+            + sum((v.quantidade_litros for v in vendas), Decimal('0'))
+        )
+        eventos = sorted(
+            [(c.data_compra, 0, c.id, c) for c in compras] + [(v.data_venda, 1, v.id, v) for v in vendas],
+            key=lambda evento: evento[:3]
+        )
+        data_inicial = eventos[0][0] if eventos else None
+        motor = MotorCusto(
+            combustivel,
+            max(saldo_inicial, Decimal('0')),
+            data_inicial,
+            precos.preco_em(precos.item_combustivel(combustivel), data_inicial)
+        )
+
+        for data, ordem, _, registro in eventos:
+            if ordem == 0:
+                motor.entrada(registro.quantidade_litros, registro.preco_compra_litro, data)
+            else:
+                registro.custo_medio_total, registro.custo_fifo_total = motor.saida(registro.quantidade_litros)
+
+        motor.salvar()
+        # Uma atualização por tabela (principal e cada mês arquivado)
+        por_tabela = defaultdict(list)
+        for venda in vendas:
+            por_tabela[type(venda)].append(venda)
+        for modelo, registros in por_tabela.items():
+            modelo.objects.bulk_update(registros, ['custo_medio_total', 'custo_fifo_total'], batch_size=500)
+        vendas_atualizadas += len(vendas)
+
+    return vendas_atualizadas
+
+
+def margens(inicio=None, fim=None):
+    """
+    Receita, CMV e margem bruta por combustível no período `[inicio, fim)`.
+
+    Uma agregação simples sobre as vendas, já que o CMV foi gravado em cada
+    uma; meses arquivados só entram se o período os alcança.
+    """
+    totais = {}
+    for particao in arquivo.no_intervalo('vendas', inicio, fim):
+        vendas = particao.queryset.order_by()
+        if inicio:
+            vendas = vendas.filter(data_venda__gte=inicio)
+        if fim:
+            vendas = vendas.filter(data_venda__lt=fim)
+        linhas = vendas.values('combustivel_id', 'combustivel__tipo').annotate(
+            litros=Sum('quantidade_litros'),
+            receita=Sum('total_venda'),
+            cmv_medio=Sum('custo_medio_total'),
+            cmv_fifo=Sum('custo_fifo_total'),
+        )
+        for linha in linhas:
+            atual = totais.get(linha['combustivel_id'])
+            if atual is None:
+                totais[linha['combustivel_id']] = linha
+                continue
+            for campo in ('litros', 'receita', 'cmv_medio', 'cmv_fifo'):
+                atual[campo] = _somar(atual[campo], linha[campo])
+
+    nomes = dict(EstoqueGasolina.TIPOS_COMBUSTIVEL)
+    return [
+        dict(
+            linha,
+            margem_medio=_diferenca(linha['receita'], linha['cmv_medio']),
+            margem_fifo=_diferenca(linha['receita'], linha['cmv_fifo']),
+            nome=nomes.get(linha['combustivel__tipo'], linha['combustivel__tipo']),
+        )
+        for linha in sorted(totais.values(), key=lambda linha: linha['combustivel__tipo'])
+    ]
+
+
+def _somar(a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    return a + b
+
+
+def _diferenca(receita, custo):
+    # Mesmo resultado de `F('receita') - F('cmv')` no SQL: nulo se faltar um dos lados
+    if receita is None or custo is None:
+        return None
+    return receita - custo
@@ -0,0 +1,128 @@
+"""
+Difusão de preços e estoque por Server-Sent Events (SSE).
+
+Cada processo ASGI mantém um único `Difusor`: uma tarefa asyncio que, a cada
+`INTERVALO` segundos, compara os tokens de `versoes` ('estoque' e
+'servicos'). Só quando algum deles muda o snapshot é lido do banco (uma vez
+para o processo inteiro) e colocado na fila de cada assinante. Assinantes
+ociosos são apenas uma `asyncio.Queue` parada num `await`, sem thread por
+cliente, o que permite milhares de conexões num só processo.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import versoes
+from .models import EstoqueGasolina, Servico
+
+# Intervalo (s) entre verificações de versão
+INTERVALO = 1.0
+# Comentário enviado periodicamente para manter proxies e navegadores conectados
+KEEPALIVE = 15.0
+# Tempo (ms) que o navegador espera antes de reconectar
+RETRY_MS = 5000
+# Mensagens pendentes por assinante; clientes lentos só recebem o estado mais novo
+FILA_MAXIMA = 4
+
+
+def snapshot():
+    """Estado atual de preços/estoque dos combustíveis e dos serviços."""
+    nomes = dict(EstoqueGasolina.TIPOS_COMBUSTIVEL)
+    combustiveis = [
+        {
+            'id': pk,
+            'tipo': tipo,
+            'nome': nomes.get(tipo, tipo),
+            'quantidade_litros': quantidade,
+            'preco_atual_litro': preco,
+            'atualizado_em': atualizado,
+        }
+        for pk, tipo, quantidade, preco, atualizado in EstoqueGasolina.objects.order_by('tipo').values_list(
+            'pk', 'tipo', 'quantidade_litros', 'preco_atual_litro', 'data_ultima_atualizacao'
+        )
+    ]
+    servicos = [
+        {'id': pk, 'nome': nome, 'preco_unitario': preco}
+        for pk, nome, preco in Servico.objects.order_by('nome').values_list('pk', 'nome', 'preco_unitario')
+    ]
+    return {'combustiveis': combustiveis, 'servicos': servicos}
+
+
+def formatar_evento(dados, evento='estoque'):
+    corpo = json.dumps(dados, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"event: {evento}\ndata: {corpo}\n\n"
+
+
+def _tokens():
+    return versoes.versao('estoque')[0], versoes.versao('servicos')[0]
+
+
+class Difusor:
+    """Vigia as versões e distribui o snapshot a todos os assinantes do processo."""
+
+    def __init__(self):
+        self.assinantes = set()
+        self.tokens = None
+        self.mensagem = None
+        self.tarefa = None
+
+    async def _atualizar(self):
+        tokens = await sync_to_async(_tokens)()
+        if tokens == self.tokens and self.mensagem is not None:
+            return False
+        dados = await sync_to_async(snapshot)()
+        self.tokens = tokens
+        self.mensagem = formatar_evento(dados)
+        return True
+
+    async def assinar(self):
+        """Registra um assinante e devolve sua fila, já com o estado atual."""
+        if self.mensagem is None or self.tarefa is None or self.tarefa.done():
+            await self._atualizar()
+        fila = asyncio.Queue(maxsize=FILA_MAXIMA)
+        fila.put_nowait(self.mensagem)
+        self.assinantes.add(fila)
+        if self.tarefa is None or self.tarefa.done():
+            self.tarefa = asyncio.create_task(self._vigiar())
+        return fila
+
+    def cancelar(self, fila):
+        self.assinantes.discard(fila)
+
+    def _publicar(self, mensagem):
+        for fila in list(self.assinantes):
+            if fila.full():
+                # Descarta a mensagem mais antiga: só o estado mais recente importa
+                fila.get_nowait()
+            fila.put_nowait(mensagem)
+
+    async def _vigiar(self):
+        while self.assinantes:
+            await asyncio.sleep(INTERVALO)
+            try:
+                if await self._atualizar():
+                    self._publicar(self.mensagem)
+            except Exception:
+                # Falha momentânea (ex.: banco bloqueado): tenta de novo no próximo ciclo
+                continue
+
+
+difusor = Difusor()
+
+
+async def fluxo(fila):
+    """Gera o corpo da resposta SSE de um assinante até a conexão ser fechada."""
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                mensagem = await asyncio.wait_for(fila.get(), timeout=KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield mensagem
+    finally:
+        difusor.cancelar(fila)
@@ -0,0 +1,110 @@
+"""
+Exportação dos ledgers em CSV ou JSONL com memória constante.
+
+Os registros são lidos com `values_list(...).iterator(chunk_size=...)`, sem
+instanciar modelos nem acessar FKs linha a linha: os nomes dos combustíveis
+e serviços vêm de um dicionário montado uma única vez. Cada linha é gerada
+e descartada em seguida, então exportar 1 mil ou 10 milhões de registros
+usa a mesma quantidade de memória.
+"""
+
+import csv
+import heapq
+import json
+
+from django.utils import timezone
+
+from . import arquivo
+from .ledgers import LEDGERS
+from .models import EstoqueGasolina, Servico
+
+TAMANHO_LOTE = 2000
+
+# ledger -> [(nome da coluna, campo do modelo)]
+COLUNAS = {
+    'compras': [
+        ('id', 'id'),
+        ('data', 'data_compra'),
+        ('combustivel', 'combustivel_id'),
+        ('quantidade_litros', 'quantidade_litros'),
+        ('preco_compra_litro', 'preco_compra_litro'),
+        ('total_compra', 'total_compra'),
+    ],
+    'vendas': [
+        ('id', 'id'),
+        ('data', 'data_venda'),
+        ('combustivel', 'combustivel_id'),
+        ('quantidade_litros', 'quantidade_litros'),
+        ('preco_venda_litro', 'preco_venda_litro'),
+        ('total_venda', 'total_venda'),
+    ],
+    'servicos': [
+        ('id', 'id'),
+        ('data', 'data'),
+        ('servico', 'servico_id'),
+        ('tipo', 'tipo'),
+        ('quantidade', 'quantidade'),
+        ('preco_unitario', 'preco_unitario'),
+        ('total', 'total'),
+    ],
+}
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _rotulos(ledger):
+    if ledger == 'servicos':
+        return dict(Servico.objects.values_list('pk', 'nome'))
+    nomes = dict(EstoqueGasolina.TIPOS_COMBUSTIVEL)
+    return {pk: nomes.get(tipo, tipo) for pk, tipo in EstoqueGasolina.objects.values_list('pk', 'tipo')}
+
+
+def registros(ledger, querysets=None):
+    """
+    Gera uma lista de valores (já formatados como texto) por registro, em ordem cronológica.
+
+    `querysets` são as partições do ledger (ver `arquivo.consultar`); cada
+    uma é lida em lotes e as linhas são intercaladas por `(data, id)`.
+    """
+    _, campo_data, _ = LEDGERS[ledger]
+    if querysets is None:
+        querysets = [particao.queryset for particao in arquivo.consultar(ledger)]
+
+    campos = [campo for _, campo in COLUNAS[ledger]]
+    rotulos = _rotulos(ledger)
+    indice_data = campos.index(campo_data)
+    indice_item = 2
+
+    fontes = [
+        queryset.order_by(campo_data, 'pk').values_list(*campos).iterator(chunk_size=TAMANHO_LOTE)
+        for queryset in querysets
+    ]
+    for linha in heapq.merge(*fontes, key=lambda linha: (linha[indice_data], linha[0])):
+        valores = [str(v) for v in linha]
+        valores[indice_data] = timezone.localtime(linha[indice_data]).isoformat()
+        valores[indice_item] = rotulos.get(linha[indice_item], valores[indice_item])
+        yield valores
+
+
+class _Eco:
+    """Pseudo-arquivo para o `csv.writer`: devolve a linha em vez de acumulá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar(ledger, formato, querysets=None):
+    """Gera o conteúdo da exportação, uma linha de texto por vez."""
+    nomes = [nome for nome, _ in COLUNAS[ledger]]
+
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(nomes)
+        for valores in registros(ledger, querysets):
+            yield escritor.writerow(valores)
+    else:
+        for valores in registros(ledger, querysets):
+            yield json.dumps(dict(zip(nomes, valores)), ensure_ascii=False) + '\n'
@@ -1,5 +1,6 @@
 from django import forms
-from .models import EstoqueGasolina
+from . import catalogo
+from .models import EstoqueGasolina, RegistroServico, Servico
 from decimal import Decimal
 
 
@@ -9,10 +10,10 @@ class MovimentacaoEstoqueForm(forms.Form):
         ('SAIDA', 'Saída (- Remover)'),
     ]
 
-    combustivel = forms.ModelChoiceField(
-        queryset=EstoqueGasolina.objects.all().order_by('tipo'),
+    # Choices vêm do catálogo em memória (ver __init__), sem consultar o banco
+    combustivel = forms.TypedChoiceField(
+        coerce=int,
         label="Combustível",
-        empty_label="Selecione o Combustível",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
 
@@ -36,6 +37,16 @@ class MovimentacaoEstoqueForm(forms.Form):
         widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ex: Recebimento de Cargas'})
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['combustivel'].choices = [('', "Selecione o Combustível")] + catalogo.choices_combustiveis()
+
+    def clean_combustivel(self):
+        item = catalogo.combustivel(self.cleaned_data['combustivel'])
+        if item is None:
+            raise forms.ValidationError("Combustível não encontrado.")
+        return item
+
 
 class EstoqueGasolinaCreationForm(forms.ModelForm):
     PRECOS_BASE = {
@@ -106,4 +117,77 @@ class SimulacaoForm(forms.Form):
         decimal_places=2,
         min_value=Decimal('0.01'),
         widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Quantidade'})
-    )
\ No newline at end of file
+    )
+
+
+class LinhaLoteForm(forms.Form):
+    """Valida uma linha do lote de movimentações enviado pelas bombas."""
+
+    combustivel = forms.CharField(max_length=20)
+
+    movimento = forms.ChoiceField(choices=MovimentacaoEstoqueForm.TIPO_MOVIMENTACAO)
+
+    quantidade = forms.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=Decimal('0.01'),
+    )
+
+
+class ItemPrecoForm(forms.Form):
+    """Valida um item de um reajuste de preços em lote ('C:<pk>' ou 'S:<pk>')."""
+
+    item = forms.RegexField(regex=r'^[CS]:\d+$', max_length=20)
+
+    preco = forms.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=Decimal('0.00'),
+    )
+
+
+class HistoricoFiltroForm(forms.Form):
+    """Filtros das páginas de histórico do financeiro (todos opcionais)."""
+
+    combustivel = forms.ModelChoiceField(
+        queryset=EstoqueGasolina.objects.all().order_by('tipo'),
+        required=False,
+        label="Combustível",
+        empty_label="Todos",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    servico = forms.ModelChoiceField(
+        queryset=Servico.objects.all().order_by('nome'),
+        required=False,
+        label="Serviço",
+        empty_label="Todos",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    tipo = forms.ChoiceField(
+        choices=[('', 'Todos')] + RegistroServico.TIPO_TRANSACAO,
+        required=False,
+        label="Tipo de Transação",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    data_inicio = forms.DateField(
+        required=False,
+        label="De",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    data_fim = forms.DateField(
+        required=False,
+        label="Até",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        inicio = cleaned_data.get('data_inicio')
+        fim = cleaned_data.get('data_fim')
+        if inicio and fim and inicio > fim:
+            raise forms.ValidationError("A data inicial deve ser anterior à data final.")
+        return cleaned_data
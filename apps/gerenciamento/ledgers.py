@@ -0,0 +1,57 @@
+"""
+Metadados e filtros comuns aos três ledgers do financeiro.
+
+Usado pelas páginas de histórico e pelas exportações para aplicar os
+mesmos filtros (item, tipo de transação e intervalo de datas locais).
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import RegistroCompra, RegistroServico, RegistroVenda
+
+# ledger -> (modelo, campo de data, título)
+LEDGERS = {
+    'compras': (RegistroCompra, 'data_compra', 'Histórico de Compras'),
+    'vendas': (RegistroVenda, 'data_venda', 'Histórico de Vendas'),
+    'servicos': (RegistroServico, 'data', 'Histórico de Serviços'),
+}
+
+
+def intervalo_local(data_inicio=None, data_fim=None):
+    """Converte datas (inclusive) em limites `[inicio, fim)` no fuso local."""
+    fuso = timezone.get_current_timezone()
+    inicio = datetime.combine(data_inicio, time.min, tzinfo=fuso) if data_inicio else None
+    fim = datetime.combine(data_fim + timedelta(days=1), time.min, tzinfo=fuso) if data_fim else None
+    return inicio, fim
+
+
+def filtrar(ledger, filtros, queryset=None):
+    """
+    Aplica os filtros de `HistoricoFiltroForm` ao ledger.
+
+    Args:
+        ledger: 'compras', 'vendas' ou 'servicos'.
+        filtros: dicionário com as chaves opcionais combustivel, servico,
+            tipo, data_inicio e data_fim.
+        queryset: queryset de partida (padrão: todos os registros do ledger).
+    """
+    modelo, campo_data, _ = LEDGERS[ledger]
+    if queryset is None:
+        queryset = modelo.objects.all()
+
+    if ledger == 'servicos':
+        if filtros.get('servico'):
+            queryset = queryset.filter(servico=filtros['servico'])
+        if filtros.get('tipo'):
+            queryset = queryset.filter(tipo=filtros['tipo'])
+    elif filtros.get('combustivel'):
+        queryset = queryset.filter(combustivel=filtros['combustivel'])
+
+    inicio, fim = intervalo_local(filtros.get('data_inicio'), filtros.get('data_fim'))
+    if inicio:
+        queryset = queryset.filter(**{f'{campo_data}__gte': inicio})
+    if fim:
+        queryset = queryset.filter(**{f'{campo_data}__lt': fim})
+    return queryset
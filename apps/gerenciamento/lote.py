@@ -0,0 +1,236 @@
+"""
+Ingestão em lote de movimentações de combustível.
+
+As bombas enviam muitas vendas/compras de uma só vez (JSON ou CSV). Em vez de
+uma requisição, uma transação e um `save()` por litro vendido, o lote inteiro
+é aplicado numa única transação: os registros são gravados com `bulk_create`
+e cada `EstoqueGasolina` recebe um único UPDATE condicional com o saldo
+agregado (ver `operacoes.aplicar_delta`).
+
+Cada linha recebe seu próprio resultado (`ok` ou `erro`), de forma que uma
+linha inválida não impede as demais de serem aplicadas. Com `tudo_ou_nada`
+uma única linha inválida (inclusive por estoque insuficiente) recusa o lote
+inteiro e nada é gravado.
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import movimentos
+from .custos import MotorCusto
+from .forms import LinhaLoteForm
+from .models import EstoqueGasolina, RegistroCompra, RegistroVenda
+from .operacoes import SaldoAlterado, aplicar_delta, com_tentativas
+
+# Limite de linhas por requisição, para manter a transação curta.
+LOTE_MAXIMO = 5000
+
+CAMPOS_CSV = ('combustivel', 'movimento', 'quantidade')
+
+
+class LoteInvalido(ValueError):
+    """O corpo da requisição não pôde ser interpretado como um lote."""
+
+
+def ler_lote(corpo, content_type):
+    """Converte o corpo da requisição (JSON ou CSV) numa lista de dicionários."""
+    if isinstance(corpo, bytes):
+        try:
+            corpo = corpo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise LoteInvalido("O lote deve estar codificado em UTF-8.")
+
+    if 'csv' in (content_type or ''):
+        leitor = csv.DictReader(io.StringIO(corpo))
+        if not leitor.fieldnames or not set(CAMPOS_CSV) <= {c.strip() for c in leitor.fieldnames}:
+            raise LoteInvalido(f"Cabeçalho CSV deve conter: {', '.join(CAMPOS_CSV)}.")
+        linhas = [{(k or '').strip(): (v or '').strip() for k, v in linha.items()} for linha in leitor]
+    else:
+        try:
+            dados = json.loads(corpo or 'null')
+        except json.JSONDecodeError as e:
+            raise LoteInvalido(f"JSON inválido: {e}")
+        linhas = dados.get('movimentos') if isinstance(dados, dict) else dados
+        if not isinstance(linhas, list):
+            raise LoteInvalido("Envie uma lista de movimentos ou um objeto com a chave 'movimentos'.")
+
+    if not linhas:
+        raise LoteInvalido("O lote está vazio.")
+    if len(linhas) > LOTE_MAXIMO:
+        raise LoteInvalido(f"O lote excede o limite de {LOTE_MAXIMO} linhas.")
+    return linhas
+
+
+def _validar_linha(linha):
+    if not isinstance(linha, dict):
+        return None, "Linha deve ser um objeto com combustivel, movimento e quantidade."
+
+    dados = {campo: linha.get(campo) for campo in CAMPOS_CSV}
+    if isinstance(dados['movimento'], str):
+        dados['movimento'] = dados['movimento'].strip().upper()
+    if isinstance(dados['combustivel'], (str, int)):
+        dados['combustivel'] = str(dados['combustivel']).strip()
+
+    form = LinhaLoteForm(dados)
+    if not form.is_valid():
+        erros = '; '.join(f"{campo}: {' '.join(msgs)}" for campo, msgs in form.errors.items())
+        return None, erros
+    return form.cleaned_data, None
+
+
+def _localizar(estoques, referencia):
+    """Aceita tanto o código do tipo (ex.: 'GAS_COMUM') quanto a pk."""
+    item = estoques.get(referencia.upper())
+    if item is None and referencia.isdigit():
+        item = estoques.get(int(referencia))
+    return item
+
+
+def _recusar(resultados):
+    """Resultado de um lote tudo-ou-nada com alguma linha inválida: nada foi aplicado."""
+    return {
+        'aplicadas': 0,
+        'rejeitadas': len(resultados),
+        'saldos': {},
+        'resultados': [
+            resultado if resultado and resultado['status'] == 'erro'
+            else {'linha': indice + 1, 'status': 'erro', 'erro': "Lote recusado por erro em outra linha."}
+            for indice, resultado in enumerate(resultados)
+        ],
+    }
+
+
+def processar_lote(linhas, tudo_ou_nada=False):
+    """
+    Aplica as movimentações do lote numa única transação.
+
+    As linhas são avaliadas na ordem recebida; uma saída só é aceita se o
+    saldo do combustível, considerando as linhas anteriores do mesmo lote,
+    for suficiente.
+
+    Args:
+        linhas: dicionários com combustivel, movimento e quantidade.
+        tudo_ou_nada: se alguma linha for recusada, nenhuma é aplicada.
+
+    Returns:
+        dict com os totais e a lista `resultados` (um item por linha).
+    """
+    resultados = [None] * len(linhas)
+    validas = []
+    for indice, linha in enumerate(linhas):
+        dados, erro = _validar_linha(linha)
+        if erro:
+            resultados[indice] = {'linha': indice + 1, 'status': 'erro', 'erro': erro}
+        else:
+            validas.append((indice, dados))
+
+    if tudo_ou_nada and len(validas) < len(linhas):
+        return _recusar(resultados)
+    return _aplicar(validas, resultados, tudo_ou_nada)
+
+
+@com_tentativas
+def _aplicar(validas, resultados, tudo_ou_nada=False):
+    resultados = list(resultados)
+
+    with transaction.atomic():
+        estoques = {}
+        for item in EstoqueGasolina.objects.select_for_update().all():
+            estoques[item.tipo] = item
+            estoques[item.pk] = item
+
+        saldos = {}
+        deltas = defaultdict(Decimal)
+        # (combustível, registro) na ordem do lote, para o custo após o UPDATE
+        movimentacoes = []
+        vendas = []
+        compras = []
+
+        for indice, dados in validas:
+            item = _localizar(estoques, dados['combustivel'])
+            if item is None:
+                resultados[indice] = {'linha': indice + 1, 'status': 'erro', 'erro': "Combustível não encontrado."}
+                continue
+
+            quantidade = dados['quantidade']
+            saldo = saldos.get(item.pk, item.quantidade_litros)
+            total = Decimal(item.preco_atual_litro) * quantidade
+
+            if dados['movimento'] == 'SAIDA':
+                if saldo - quantidade < 0:
+                    resultados[indice] = {'linha': indice + 1, 'status': 'erro', 'erro': "Estoque insuficiente para esta saída."}
+                    continue
+                delta = -quantidade
+                vendas.append(RegistroVenda(
+                    combustivel=item,
+                    quantidade_litros=quantidade,
+                    preco_venda_litro=item.preco_atual_litro,
+                    total_venda=total
+                ))
+                movimentacoes.append((item, vendas[-1]))
+                registro = 'venda'
+            else:
+                delta = quantidade
+                compras.append(RegistroCompra(
+                    combustivel=item,
+                    quantidade_litros=quantidade,
+                    preco_compra_litro=item.preco_atual_litro,
+                    total_compra=total
+                ))
+                movimentacoes.append((item, compras[-1]))
+                registro = 'compra'
+
+            saldos[item.pk] = saldo + delta
+            deltas[item.pk] += delta
+            resultados[indice] = {
+                'linha': indice + 1,
+                'status': 'ok',
+                'registro': registro,
+                'combustivel': item.tipo,
+                'quantidade': str(quantidade),
+                'total': str(total.quantize(Decimal('0.01'))),
+            }
+
+        if tudo_ou_nada and any(r['status'] == 'erro' for r in resultados):
+            # Nada foi gravado ainda: só os bloqueios da leitura são liberados
+            return _recusar(resultados)
+
+        # O UPDATE condicional protege contra vendas concorrentes feitas depois
+        # da leitura acima; se o saldo mudou, o lote inteiro é reavaliado.
+        agora = timezone.now()
+        for pk, delta in deltas.items():
+            if not aplicar_delta(pk, delta, agora):
+                raise SaldoAlterado(estoques[pk].tipo)
+
+        # Custo só depois do UPDATE condicional, que serializa os escritores
+        # (ver `custos`); o saldo anterior é o lido no início do lote
+        motores = {}
+        for item, registro in movimentacoes:
+            if item.pk not in motores:
+                motores[item.pk] = MotorCusto(item, item.quantidade_litros)
+            if isinstance(registro, RegistroVenda):
+                registro.custo_medio_total, registro.custo_fifo_total = motores[item.pk].saida(registro.quantidade_litros)
+            else:
+                motores[item.pk].entrada(registro.quantidade_litros, registro.preco_compra_litro)
+        for motor in motores.values():
+            motor.salvar()
+
+        # Compras antes das vendas: no reprocessamento (`custos.reconstruir`)
+        # as entradas do lote continuam precedendo as saídas
+        RegistroCompra.objects.bulk_create(compras, batch_size=500)
+        RegistroVenda.objects.bulk_create(vendas, batch_size=500)
+        movimentos.registrar(compras + vendas)
+
+    aplicadas = sum(1 for r in resultados if r['status'] == 'ok')
+    return {
+        'aplicadas': aplicadas,
+        'rejeitadas': len(resultados) - aplicadas,
+        'saldos': {estoques[pk].tipo: str(saldo) for pk, saldo in saldos.items()},
+        'resultados': resultados,
+    }
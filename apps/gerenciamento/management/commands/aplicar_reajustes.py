@@ -0,0 +1,52 @@
+"""
+Aplica os reajustes de preço agendados que já venceram.
+
+Uso:
+    python manage.py aplicar_reajustes                 # uma passada (ex.: via cron)
+    python manage.py aplicar_reajustes --continuo      # agendador em processo próprio
+    python manage.py aplicar_reajustes --continuo --intervalo 15 --lote 200
+
+Vários processos podem rodar ao mesmo tempo: cada reajuste é aplicado uma
+única vez (ver `reajuste.aplicar_vencidos`).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.gerenciamento import reajuste
+
+
+class Command(BaseCommand):
+    help = "Aplica, em lotes, os reajustes de preço agendados cuja vigência já começou."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help="Continua rodando e verifica os agendamentos a cada --intervalo segundos."
+        )
+        parser.add_argument('--intervalo', type=float, default=30.0, help="Segundos entre verificações (padrão: 30).")
+        parser.add_argument(
+            '--lote', type=int, default=reajuste.LOTE_AGENDADOS,
+            help=f"Reajustes aplicados por transação (padrão: {reajuste.LOTE_AGENDADOS})."
+        )
+
+    def _passada(self, lote):
+        aplicados = reajuste.aplicar_vencidos(tamanho=lote)
+        if aplicados:
+            self.stdout.write(self.style.SUCCESS(f"{aplicados} reajustes aplicados."))
+        return aplicados
+
+    def handle(self, *args, **options):
+        if not options['continuo']:
+            if not self._passada(options['lote']):
+                self.stdout.write("Nenhum reajuste vencido.")
+            return
+
+        self.stdout.write(f"Agendador de reajustes ativo (a cada {options['intervalo']:g} s).")
+        try:
+            while True:
+                self._passada(options['lote'])
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Agendador encerrado.")
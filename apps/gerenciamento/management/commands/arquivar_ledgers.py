@@ -0,0 +1,47 @@
+"""
+Move os meses antigos dos ledgers para tabelas de arquivo mensais.
+
+Uso:
+    python manage.py arquivar_ledgers                       # meses fora dos últimos 90 dias
+    python manage.py arquivar_ledgers --retencao-dias 180
+    python manage.py arquivar_ledgers --ate 2024-01         # tudo antes de janeiro/2024
+
+Pode ser rodado periodicamente (ex.: via cron no início de cada mês); meses
+já arquivados não são tocados. Ver `apps.gerenciamento.arquivo`.
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.gerenciamento import arquivo
+
+
+class Command(BaseCommand):
+    help = "Arquiva, em tabelas mensais, os registros de compras, vendas e serviços fora do período de retenção."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retencao-dias', type=int, default=arquivo.RETENCAO_DIAS,
+            help=f"Dias mantidos na tabela principal (padrão: {arquivo.RETENCAO_DIAS})."
+        )
+        parser.add_argument('--ate', help="Arquiva os meses anteriores a este (AAAA-MM), ignorando --retencao-dias.")
+
+    def handle(self, *args, **options):
+        ate = None
+        if options['ate']:
+            try:
+                ate = datetime.strptime(options['ate'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("Use o formato AAAA-MM em --ate.")
+        if options['retencao_dias'] < 0:
+            raise CommandError("--retencao-dias não pode ser negativo.")
+
+        movidos = arquivo.arquivar(ate=ate, retencao_dias=options['retencao_dias'])
+        if not movidos:
+            self.stdout.write("Nenhum mês a arquivar.")
+            return
+        for ledger, mes, linhas in movidos:
+            self.stdout.write(f"{ledger:<9} {mes:%m/%Y}  {linhas} registros")
+        total = sum(linhas for _, _, linhas in movidos)
+        self.stdout.write(self.style.SUCCESS(f"{total} registros arquivados em {len(movidos)} tabelas mensais."))
@@ -0,0 +1,153 @@
+"""
+Mede a vazão de escritas concorrentes no SQLite com cada perfil de conexão.
+
+Para cada perfil de `settings.SQLITE_PERFIS` o banco atual é copiado para um
+diretório temporário (o original não é alterado) e vários processos registram
+movimentações de combustível ao mesmo tempo, fechando a conexão ao fim de
+cada operação como o Django faz ao fim de cada requisição (com
+`CONN_MAX_AGE` a conexão é reaproveitada).
+
+Uso:
+    python manage.py gerar_dados                  # uma vez, para ter um banco com volume
+    python manage.py benchmark_escritas
+    python manage.py benchmark_escritas --processos 16 --operacoes 300 --saida escritas.json
+"""
+
+import json
+import multiprocessing
+import sqlite3
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections
+
+from apps.gerenciamento.models import EstoqueGasolina
+from apps.gerenciamento.operacoes import EstoqueInsuficiente, registrar_movimentacao_combustivel
+
+
+def _copiar_banco(destino, perfil):
+    origem = sqlite3.connect(settings.DATABASES['default']['NAME'])
+    copia = sqlite3.connect(destino)
+    try:
+        origem.backup(copia)
+        # O modo de journal fica gravado no arquivo: o perfil de fábrica parte do DELETE
+        if 'journal_mode' not in settings.SQLITE_PERFIS[perfil]['OPTIONS'].get('init_command', ''):
+            copia.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        copia.close()
+        origem.close()
+
+
+def _trabalhador(banco, perfil, combustivel_pk, operacoes, largada, resultados):
+    """Processo filho: aponta a conexão para a cópia com o perfil e registra `operacoes` movimentos."""
+    connections['default'].settings_dict.update(
+        {chave: (dict(valor) if isinstance(valor, dict) else valor)
+         for chave, valor in settings.SQLITE_PERFIS[perfil].items()},
+        NAME=banco,
+    )
+    latencias, falhas = [], 0
+    largada.wait()
+    for indice in range(operacoes):
+        movimento = 'ENTRADA' if indice % 2 == 0 else 'SAIDA'
+        inicio = time.perf_counter()
+        try:
+            registrar_movimentacao_combustivel(combustivel_pk, movimento, Decimal('1.00'))
+        except (OperationalError, EstoqueInsuficiente):
+            falhas += 1
+        else:
+            latencias.append(time.perf_counter() - inicio)
+        finally:
+            # Equivale ao fim de uma requisição
+            close_old_connections()
+    connections.close_all()
+    resultados.put((latencias, falhas, time.perf_counter()))
+
+
+class Command(BaseCommand):
+    help = "Compara a vazão de escritas concorrentes (vários processos) entre os perfis do SQLite."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=8)
+        parser.add_argument('--operacoes', type=int, default=200, help="Movimentações por processo.")
+        parser.add_argument(
+            '--perfis', nargs='+', default=list(settings.SQLITE_PERFIS),
+            help=f"Perfis a comparar (padrão: {' '.join(settings.SQLITE_PERFIS)})."
+        )
+        parser.add_argument('--saida', help="Arquivo JSON para gravar o resultado.")
+
+    def _medir(self, banco, perfil, combustivel_pk, processos, operacoes):
+        contexto = multiprocessing.get_context('fork')
+        largada = contexto.Event()
+        resultados = contexto.Queue()
+        filhos = [
+            contexto.Process(target=_trabalhador, args=(banco, perfil, combustivel_pk, operacoes, largada, resultados))
+            for _ in range(processos)
+        ]
+        for filho in filhos:
+            filho.start()
+        # Dá tempo de todos os processos subirem antes da largada
+        time.sleep(0.5)
+        inicio = time.perf_counter()
+        largada.set()
+        coletados = [resultados.get() for _ in filhos]
+        for filho in filhos:
+            filho.join()
+
+        latencias = sorted(t for lat, _, _ in coletados for t in lat)
+        duracao = max(fim for _, _, fim in coletados) - inicio
+        concluidas = len(latencias)
+        return {
+            'perfil': perfil,
+            'processos': processos,
+            'operacoes': processos * operacoes,
+            'concluidas': concluidas,
+            'falhas': sum(falhas for _, falhas, _ in coletados),
+            'segundos': round(duracao, 3),
+            'operacoes_por_segundo': round(concluidas / duracao, 1) if duracao else 0.0,
+            'p50_ms': round(statistics.median(latencias) * 1000, 2) if latencias else None,
+            'p95_ms': round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 2) if latencias else None,
+        }
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Este benchmark só se aplica ao SQLite.")
+        for opcao in ('processos', 'operacoes'):
+            if options[opcao] < 1:
+                raise CommandError(f"--{opcao} deve ser pelo menos 1.")
+        desconhecidos = set(options['perfis']) - set(settings.SQLITE_PERFIS)
+        if desconhecidos:
+            raise CommandError(f"Perfis desconhecidos: {', '.join(sorted(desconhecidos))}.")
+        combustivel_pk = EstoqueGasolina.objects.order_by('pk').values_list('pk', flat=True).first()
+        if combustivel_pk is None:
+            raise CommandError("Nenhum combustível cadastrado; rode `gerar_dados` antes.")
+        # Conexões SQLite não podem atravessar o fork
+        connections.close_all()
+
+        relatorio = []
+        with tempfile.TemporaryDirectory() as diretorio:
+            for perfil in options['perfis']:
+                banco = str(Path(diretorio) / f"{perfil}.sqlite3")
+                _copiar_banco(banco, perfil)
+                resultado = self._medir(banco, perfil, combustivel_pk, options['processos'], options['operacoes'])
+                relatorio.append(resultado)
+                self.stdout.write(
+                    f"{perfil:<12} {resultado['operacoes_por_segundo']:>8.1f} op/s  "
+                    f"p50 {resultado['p50_ms']} ms  p95 {resultado['p95_ms']} ms  "
+                    f"falhas {resultado['falhas']}/{resultado['operacoes']}"
+                )
+
+        base = relatorio[0]
+        for resultado in relatorio[1:]:
+            if base['operacoes_por_segundo']:
+                ganho = resultado['operacoes_por_segundo'] / base['operacoes_por_segundo']
+                self.stdout.write(self.style.SUCCESS(f"{resultado['perfil']}: {ganho:.1f}x a vazão de {base['perfil']}"))
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em {options['saida']}")
@@ -0,0 +1,89 @@
+"""
+Mede consultas e latência das principais views e grava o resultado em JSON.
+
+Uso:
+    python manage.py gerar_dados                       # uma vez, para ter volume
+    python manage.py benchmark_views --saida antes.json
+    python manage.py benchmark_views --saida depois.json --comparar antes.json
+
+Sai com erro se alguma view estourar o orçamento de `benchmark.ORCAMENTOS`
+(use --sem-falhar para apenas registrar).
+"""
+
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from apps.gerenciamento import benchmark
+from apps.gerenciamento.models import Movimento, RegistroCompra, RegistroServico, RegistroVenda, Servico
+
+USUARIO = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = "Mede consultas SQL e latência das views de gerenciamento contra o banco atual."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--saida', default='benchmark.json', help="Arquivo JSON de resultado.")
+        parser.add_argument('--comparar', help="JSON de uma execução anterior para mostrar a diferença.")
+        parser.add_argument('--sem-falhar', action='store_true', help="Não falha quando um orçamento é estourado.")
+
+    def handle(self, *args, **options):
+        usuario, criado = User.objects.get_or_create(
+            username=USUARIO, defaults={'is_superuser': True, 'is_staff': True}
+        )
+        if criado:
+            usuario.set_unusable_password()
+            usuario.save()
+
+        host = settings.ALLOWED_HOSTS[0].lstrip('.') if settings.ALLOWED_HOSTS else 'localhost'
+        if host == '*':
+            host = 'localhost'
+        cliente = Client(HTTP_HOST=host)
+        cliente.force_login(usuario)
+
+        resultados = benchmark.medir(cliente, options['repeticoes'])
+        relatorio = {
+            'gerado_em': timezone.now().isoformat(),
+            'repeticoes': options['repeticoes'],
+            'volumes': {
+                'vendas': RegistroVenda.objects.count(),
+                'compras': RegistroCompra.objects.count(),
+                'registros_servico': RegistroServico.objects.count(),
+                'movimentos': Movimento.objects.count(),
+                'servicos': Servico.objects.count(),
+                'usuarios': User.objects.count(),
+            },
+            'resultados': resultados,
+        }
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+
+        anteriores = {}
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                anteriores = {r['view']: r for r in json.load(arquivo)['resultados']}
+
+        for r in resultados:
+            linha = (
+                f"{r['view']:<20} {r['consultas']:>3}/{r['orcamento_consultas']:<3} consultas "
+                f"{r['ms_mediana']:>9.2f}/{r['orcamento_ms']} ms (p95 {r['ms_p95']:.2f})"
+            )
+            anterior = anteriores.get(r['view'])
+            if anterior:
+                linha += (
+                    f"  Δ {r['consultas'] - anterior['consultas']:+d} consultas, "
+                    f"{r['ms_mediana'] - anterior['ms_mediana']:+.2f} ms"
+                )
+            estilo = self.style.SUCCESS if r['dentro'] else self.style.ERROR
+            self.stdout.write(estilo(linha))
+        self.stdout.write(f"Resultado gravado em {options['saida']}.")
+
+        estouradas = [r['view'] for r in resultados if not r['dentro']]
+        if estouradas and not options['sem_falhar']:
+            raise CommandError(f"Orçamento estourado em: {', '.join(estouradas)}.")
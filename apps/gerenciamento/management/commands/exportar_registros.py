@@ -0,0 +1,52 @@
+"""
+Exporta um ledger (compras, vendas ou servicos) em CSV ou JSONL.
+
+Uso:
+    python manage.py exportar_registros vendas --inicio 2025-01-01 --fim 2025-01-31 --saida vendas.csv
+    python manage.py exportar_registros servicos --formato jsonl > servicos.jsonl
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.gerenciamento import arquivo, exportacao
+from apps.gerenciamento.ledgers import LEDGERS
+
+
+def _data(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Data inválida: {valor} (use AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = "Exporta um ledger do financeiro em CSV ou JSONL, lendo os registros em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('ledger', choices=sorted(LEDGERS))
+        parser.add_argument('--formato', choices=sorted(exportacao.FORMATOS), default='csv')
+        parser.add_argument('--inicio', type=_data, help="Data inicial (inclusive), AAAA-MM-DD.")
+        parser.add_argument('--fim', type=_data, help="Data final (inclusive), AAAA-MM-DD.")
+        parser.add_argument('--saida', help="Arquivo de saída (padrão: stdout).")
+
+    def handle(self, *args, **options):
+        particoes = arquivo.consultar(options['ledger'], {
+            'data_inicio': options['inicio'],
+            'data_fim': options['fim'],
+        })
+        conteudo = exportacao.gerar(
+            options['ledger'], options['formato'], [particao.queryset for particao in particoes]
+        )
+
+        if options['saida']:
+            total = 0
+            with open(options['saida'], 'w', encoding='utf-8', newline='') as arquivo:
+                for linha in conteudo:
+                    arquivo.write(linha)
+                    total += 1
+            self.stderr.write(f"{total} linhas gravadas em {options['saida']}.")
+        else:
+            for linha in conteudo:
+                self.stdout.write(linha, ending='')
@@ -0,0 +1,230 @@
+"""
+Gera dados sintéticos em volume realista para testes de desempenho.
+
+Uso:
+    python manage.py gerar_dados                                  # volumes padrão (milhões de linhas)
+    python manage.py gerar_dados --vendas 50000 --compras 5000 --registros-servico 20000 --servicos 500 --funcionarios 200
+
+As vendas seguem um perfil diário (picos de manhã e no fim da tarde) ao
+longo de `--dias`, e cada registro ganha o `Movimento` correspondente; os
+resumos por dia/hora são reconstruídos no final. Tudo é gravado com
+`bulk_create` em lotes, sem sinais, então o CMV das vendas fica vazio até
+rodar `python manage.py recalcular_custos`.
+
+Use apenas em bancos de desenvolvimento/benchmark.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.models import Funcionario
+from apps.gerenciamento import movimentos, resumos, versoes
+from apps.gerenciamento.forms import EstoqueGasolinaCreationForm
+from apps.gerenciamento.models import (
+    EstoqueGasolina, Movimento, RegistroCompra, RegistroServico, RegistroVenda, Servico,
+)
+
+# Peso relativo das vendas por hora do dia (0h a 23h)
+PERFIL_HORARIO = [
+    1, 1, 1, 1, 1, 2, 5, 9, 10, 8, 7, 7,
+    8, 7, 6, 6, 7, 9, 10, 8, 5, 3, 2, 1,
+]
+# Participação de cada combustível nas vendas
+PARTICIPACAO = {
+    'GAS_COMUM': 40,
+    'GAS_ADITIVADA': 12,
+    'ETANOL': 25,
+    'DIESEL_COMUM': 8,
+    'DIESEL_S10': 15,
+}
+NOMES_SERVICO = [
+    'Troca de Óleo', 'Balanceamento', 'Alinhamento', 'Revisão Preventiva', 'Troca de Pneus',
+    'Lavagem Completa', 'Troca de Filtro', 'Calibragem', 'Higienização', 'Polimento',
+]
+SENHA_PADRAO = 'senha-benchmark'
+
+
+@contextmanager
+def datas_livres(*campos):
+    """Desliga `auto_now_add` para gravar as datas geradas em vez de `now()`."""
+    originais = [campo.auto_now_add for campo in campos]
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, original in zip(campos, originais):
+            campo.auto_now_add = original
+
+
+class Command(BaseCommand):
+    help = "Gera combustíveis, serviços, funcionários e milhões de registros sintéticos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendas', type=int, default=2_000_000)
+        parser.add_argument('--compras', type=int, default=100_000)
+        parser.add_argument('--registros-servico', type=int, default=500_000)
+        parser.add_argument('--servicos', type=int, default=2_000)
+        parser.add_argument('--funcionarios', type=int, default=2_000)
+        parser.add_argument('--dias', type=int, default=730, help="Período coberto, terminando agora.")
+        parser.add_argument('--lote', type=int, default=10_000, help="Registros por transação.")
+        parser.add_argument('--semente', type=int, default=42, help="Semente do gerador aleatório.")
+
+    def handle(self, *args, **options):
+        self.aleatorio = random.Random(options['semente'])
+        self.lote = options['lote']
+        self.fim = timezone.now()
+        self.inicio = self.fim - timedelta(days=options['dias'])
+
+        combustiveis = self._combustiveis()
+        servicos = self._servicos(options['servicos'])
+        self._funcionarios(options['funcionarios'])
+
+        campos = (
+            RegistroVenda._meta.get_field('data_venda'),
+            RegistroCompra._meta.get_field('data_compra'),
+            RegistroServico._meta.get_field('data'),
+        )
+        with datas_livres(*campos):
+            self._registros('vendas', options['vendas'], lambda data: self._venda(combustiveis, data))
+            self._registros('compras', options['compras'], lambda data: self._compra(combustiveis, data))
+            self._registros('registros de serviço', options['registros_servico'], lambda data: self._servico(servicos, data))
+
+        linhas = resumos.reconstruir()
+        self.stdout.write(f"{linhas} linhas de resumo reconstruídas.")
+
+        with transaction.atomic():
+            versoes.invalidar('catalogo')
+            versoes.invalidar('estoque')
+            versoes.invalidar('servicos')
+        self.stdout.write(self.style.SUCCESS(
+            "Dados gerados. Rode `recalcular_custos` para preencher o CMV das vendas."
+        ))
+
+    def _combustiveis(self):
+        combustiveis = []
+        for tipo, _ in EstoqueGasolina.TIPOS_COMBUSTIVEL:
+            item, _ = EstoqueGasolina.objects.get_or_create(
+                tipo=tipo,
+                defaults={
+                    'quantidade_litros': Decimal(self.aleatorio.randint(2_000, 30_000)),
+                    'preco_atual_litro': EstoqueGasolinaCreationForm.PRECOS_BASE.get(tipo, Decimal('5.00')),
+                }
+            )
+            combustiveis.append(item)
+        return combustiveis
+
+    def _servicos(self, quantidade):
+        existentes = Servico.objects.count()
+        novos = [
+            Servico(
+                nome=f"{self.aleatorio.choice(NOMES_SERVICO)} #{existentes + n + 1}",
+                descricao="Serviço gerado para benchmark",
+                preco_unitario=Decimal(self.aleatorio.randint(2_000, 40_000)) / 100,
+            )
+            for n in range(max(quantidade - existentes, 0))
+        ]
+        Servico.objects.bulk_create(novos, batch_size=1000)
+        self.stdout.write(f"{len(novos)} serviços criados.")
+        return list(Servico.objects.filter(categoria='SERVICO'))
+
+    def _funcionarios(self, quantidade):
+        # Um único hash para todos: gerar milhares de hashes PBKDF2 levaria minutos
+        senha = make_password(SENHA_PADRAO)
+        prefixo = f"bench{self.aleatorio.randrange(10 ** 6):06d}"
+        cargos = [codigo for codigo, _ in Funcionario.CARGOS]
+        with transaction.atomic():
+            usuarios = User.objects.bulk_create(
+                [
+                    User(
+                        username=f"{prefixo}_{n}",
+                        email=f"{prefixo}_{n}@exemplo.com",
+                        first_name=f"Funcionário {n}",
+                        password=senha,
+                    )
+                    for n in range(quantidade)
+                ],
+                batch_size=1000
+            )
+            Funcionario.objects.bulk_create(
+                [
+                    Funcionario(
+                        user=usuario,
+                        employee_id_number=f"{prefixo.upper()}-{n:06d}",
+                        full_name=usuario.first_name,
+                        job_title=self.aleatorio.choice(cargos),
+                        salary=Decimal(self.aleatorio.randint(1_500, 9_000)),
+                    )
+                    for n, usuario in enumerate(usuarios)
+                ],
+                batch_size=1000
+            )
+        self.stdout.write(f"{quantidade} funcionários criados (senha: {SENHA_PADRAO}).")
+
+    def _data(self):
+        """Instante aleatório no período, respeitando o perfil de horário."""
+        dia = self.inicio + timedelta(days=self.aleatorio.randrange((self.fim - self.inicio).days or 1))
+        hora = self.aleatorio.choices(range(24), weights=PERFIL_HORARIO)[0]
+        local = timezone.localtime(dia).replace(hour=hora, minute=0, second=0, microsecond=0)
+        return local + timedelta(seconds=self.aleatorio.randrange(3600))
+
+    def _venda(self, combustiveis, data):
+        item = self.aleatorio.choices(combustiveis, weights=[PARTICIPACAO.get(c.tipo, 10) for c in combustiveis])[0]
+        litros = Decimal(self.aleatorio.randint(500, 6_000)) / 100
+        return RegistroVenda(
+            combustivel=item,
+            data_venda=data,
+            quantidade_litros=litros,
+            preco_venda_litro=item.preco_atual_litro,
+            total_venda=(litros * item.preco_atual_litro).quantize(Decimal('0.01')),
+        )
+
+    def _compra(self, combustiveis, data):
+        item = self.aleatorio.choice(combustiveis)
+        litros = Decimal(self.aleatorio.randint(5_000, 15_000))
+        preco = (item.preco_atual_litro * Decimal('0.85')).quantize(Decimal('0.01'))
+        return RegistroCompra(
+            combustivel=item,
+            data_compra=data,
+            quantidade_litros=litros,
+            preco_compra_litro=preco,
+            total_compra=litros * preco,
+        )
+
+    def _servico(self, servicos, data):
+        servico = self.aleatorio.choice(servicos)
+        quantidade = Decimal(self.aleatorio.randint(1, 4))
+        return RegistroServico(
+            servico=servico,
+            data=data,
+            tipo='VENDA' if self.aleatorio.random() < 0.9 else 'COMPRA',
+            quantidade=quantidade,
+            preco_unitario=servico.preco_unitario,
+            total=quantidade * servico.preco_unitario,
+        )
+
+    def _registros(self, nome, total, fabricar):
+        """Cria `total` registros em transações de `self.lote`, com seus `Movimento`."""
+        criados = 0
+        while criados < total:
+            quantidade = min(self.lote, total - criados)
+            registros = [fabricar(self._data()) for _ in range(quantidade)]
+            with transaction.atomic():
+                type(registros[0]).objects.bulk_create(registros, batch_size=1000)
+                Movimento.objects.bulk_create(
+                    [movimentos.CONVERSORES[type(r)](r) for r in registros],
+                    batch_size=1000
+                )
+            criados += quantidade
+            self.stdout.write(f"\r{nome}: {criados}/{total}", ending='')
+            self.stdout.flush()
+        if total:
+            self.stdout.write('')
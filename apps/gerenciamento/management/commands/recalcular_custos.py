@@ -0,0 +1,18 @@
+"""
+Recalcula o custo (médio ponderado e PEPS) dos combustíveis e o CMV de cada venda.
+
+Uso:
+    python manage.py recalcular_custos
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.gerenciamento import custos
+
+
+class Command(BaseCommand):
+    help = "Reprocessa compras e vendas em ordem e regrava o estado de custo e o CMV das vendas."
+
+    def handle(self, *args, **options):
+        vendas = custos.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Custos recalculados; {vendas} vendas atualizadas."))
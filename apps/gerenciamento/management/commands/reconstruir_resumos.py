@@ -0,0 +1,38 @@
+"""
+Reconstrói e/ou confere os resumos por dia/hora (`ResumoMovimento`).
+
+Uso:
+    python manage.py reconstruir_resumos              # apaga, recria e confere
+    python manage.py reconstruir_resumos --verificar  # apenas confere
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.gerenciamento import resumos
+
+
+class Command(BaseCommand):
+    help = "Reconstrói os resumos de movimentos a partir dos ledgers e confere o resultado."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help="Não reconstrói; apenas compara os resumos gravados com os ledgers."
+        )
+
+    def handle(self, *args, **options):
+        if not options['verificar']:
+            linhas = resumos.reconstruir()
+            self.stdout.write(f"{linhas} linhas de resumo reconstruídas.")
+
+        diferencas = resumos.divergencias()
+        if diferencas:
+            for (granularidade, periodo, item, tipo), esperado, gravado in diferencas[:20]:
+                self.stderr.write(
+                    f"{granularidade} {periodo:%Y-%m-%d %H:%M} {item} {tipo}: "
+                    f"esperado={esperado} gravado={gravado}"
+                )
+            raise CommandError(f"{len(diferencas)} resumos divergem dos ledgers.")
+
+        self.stdout.write(self.style.SUCCESS("Resumos conferem com os ledgers."))
@@ -0,0 +1,20 @@
+"""
+Cria os serviços padrão que ainda não existem (idempotente).
+
+Uso:
+    python manage.py semear_servicos
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.gerenciamento import servicos_padrao
+
+
+class Command(BaseCommand):
+    help = "Cria os serviços padrão do posto que ainda não estão cadastrados."
+
+    def handle(self, *args, **options):
+        novos = servicos_padrao.semear()
+        for servico in novos:
+            self.stdout.write(f"Criado: {servico.nome}")
+        self.stdout.write(self.style.SUCCESS(f"{len(novos)} serviços padrão criados."))
@@ -0,0 +1,51 @@
+"""
+Copia o banco primário para a réplica somente leitura (`DB_REPLICA_NAME`).
+
+Uso:
+    python manage.py sincronizar_replica                  # uma cópia (ex.: via cron)
+    python manage.py sincronizar_replica --continuo       # mantém a réplica em dia
+
+Sem sincronizações dentro de `DB_REPLICA_ATRASO_MAXIMO` segundos, as views
+voltam a ler do primário (ver `roteamento`).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.gerenciamento import roteamento
+
+
+class Command(BaseCommand):
+    help = "Sincroniza a réplica somente leitura com o banco primário (API de backup do SQLite)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help="Continua sincronizando a cada --intervalo segundos.")
+        parser.add_argument(
+            '--intervalo', type=float,
+            help="Segundos entre cópias (padrão: metade de DB_REPLICA_ATRASO_MAXIMO)."
+        )
+
+    def _sincronizar(self):
+        inicio = time.perf_counter()
+        roteamento.sincronizar_replica()
+        return time.perf_counter() - inicio
+
+    def handle(self, *args, **options):
+        if not roteamento.replica_configurada():
+            raise CommandError("Nenhuma réplica configurada; defina DB_REPLICA_NAME.")
+
+        if not options['continuo']:
+            duracao = self._sincronizar()
+            self.stdout.write(self.style.SUCCESS(f"Réplica sincronizada em {duracao * 1000:.0f} ms."))
+            return
+
+        intervalo = options['intervalo'] or settings.DB_REPLICA_ATRASO_MAXIMO / 2
+        self.stdout.write(f"Sincronizando a réplica a cada {intervalo:g} s.")
+        try:
+            while True:
+                self._sincronizar()
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            self.stdout.write("Sincronização encerrada.")
@@ -0,0 +1,221 @@
+"""
+Métricas de requisições no formato de exposição do Prometheus.
+
+`MetricasMiddleware` registra, por nome de rota (`url_name`) e método
+(métodos fora de `METODOS` contam como 'OTHER', para que requisições com
+métodos arbitrários não criem séries sem limite):
+
+- histograma de latência (segundos);
+- histograma de consultas SQL por requisição, mais o total de consultas e
+  o tempo gasto nelas, medidos com `execute_wrapper` em todas as conexões
+  (o primário e a réplica, se configurada);
+- histograma do tamanho das respostas (bytes; respostas em streaming não
+  têm tamanho conhecido e ficam de fora);
+- contador de requisições por status.
+
+O custo por requisição é um punhado de somas sob um `Lock` e uma busca
+binária nos limites dos histogramas, sem E/S. As métricas ficam em memória
+e valem por processo: com vários workers, o Prometheus deve coletar cada um
+(ou somar os valores na consulta).
+
+`texto()` gera o corpo servido por `/gerenciamento/metricas/`.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+LATENCIA_LIMITES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONSULTAS_LIMITES = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+BYTES_LIMITES = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+
+
+class Histograma:
+    """Contagens acumuladas por faixa (`le`), soma e total para cada conjunto de rótulos."""
+
+    def __init__(self, nome, ajuda, limites):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.limites = limites
+        self.series = defaultdict(lambda: [[0] * (len(limites) + 1), 0.0, 0])
+
+    def observar(self, rotulos, valor):
+        contagens, _, _ = serie = self.series[rotulos]
+        contagens[bisect_left(self.limites, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def linhas(self, nomes_rotulos):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} histogram"
+        for rotulos, (contagens, soma, total) in sorted(self.series.items()):
+            base = _rotulos(nomes_rotulos, rotulos)
+            acumulado = 0
+            for limite, contagem in zip(self.limites, contagens):
+                acumulado += contagem
+                yield f'{self.nome}_bucket{{{base},le="{limite}"}} {acumulado}'
+            yield f'{self.nome}_bucket{{{base},le="+Inf"}} {total}'
+            yield f"{self.nome}_sum{{{base}}} {soma}"
+            yield f"{self.nome}_count{{{base}}} {total}"
+
+
+class Contador:
+    def __init__(self, nome, ajuda):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.series = defaultdict(float)
+
+    def somar(self, rotulos, valor=1):
+        self.series[rotulos] += valor
+
+    def linhas(self, nomes_rotulos):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} counter"
+        for rotulos, valor in sorted(self.series.items()):
+            yield f"{self.nome}{{{_rotulos(nomes_rotulos, rotulos)}}} {valor}"
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(nomes, valores):
+    return ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores))
+
+
+ROTULOS = ('view', 'metodo')
+METODOS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+_trava = threading.Lock()
+latencia = Histograma(
+    'gerenciamento_requisicao_duracao_segundos', "Latência das requisições por view.", LATENCIA_LIMITES
+)
+consultas = Histograma(
+    'gerenciamento_requisicao_consultas_sql', "Consultas SQL por requisição.", CONSULTAS_LIMITES
+)
+tamanho = Histograma(
+    'gerenciamento_resposta_bytes', "Tamanho do corpo das respostas.", BYTES_LIMITES
+)
+tempo_sql = Contador(
+    'gerenciamento_consultas_sql_segundos_total', "Tempo gasto em consultas SQL."
+)
+requisicoes = Contador(
+    'gerenciamento_requisicoes_total', "Requisições atendidas por status."
+)
+
+
+def registrar(view, metodo, status, duracao, total_consultas=None, duracao_sql=0.0, bytes_resposta=None):
+    rotulos = (view, metodo if metodo in METODOS else 'OTHER')
+    with _trava:
+        latencia.observar(rotulos, duracao)
+        requisicoes.somar(rotulos + (status,))
+        if total_consultas is not None:
+            consultas.observar(rotulos, total_consultas)
+            tempo_sql.somar(rotulos, duracao_sql)
+        if bytes_resposta is not None:
+            tamanho.observar(rotulos, bytes_resposta)
+
+
+def texto():
+    """Todas as métricas no formato de exposição em texto do Prometheus."""
+    with _trava:
+        linhas = [
+            *latencia.linhas(ROTULOS),
+            *consultas.linhas(ROTULOS),
+            *tempo_sql.linhas(ROTULOS),
+            *tamanho.linhas(ROTULOS),
+            *requisicoes.linhas(ROTULOS + ('status',)),
+        ]
+    return '\n'.join(linhas) + '\n'
+
+
+class MedidorConsultas:
+    """`execute_wrapper` que conta as consultas e soma o tempo gasto nelas."""
+
+    def __init__(self):
+        self.total = 0
+        self.duracao = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duracao += time.perf_counter() - inicio
+            self.total += 1
+
+
+@contextmanager
+def _medindo(medidor):
+    """Instala `medidor` em todas as conexões da thread atual."""
+    with ExitStack() as pilha:
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(medidor))
+        yield medidor
+
+
+def _nome_view(request):
+    rota = getattr(request, 'resolver_match', None)
+    return rota.view_name if rota is not None else 'sem_rota'
+
+
+def _bytes(resposta):
+    if resposta.streaming:
+        return None
+    return len(resposta.content)
+
+
+class MetricasMiddleware:
+    """
+    Mede cada requisição; deve ser o primeiro da lista para incluir o tempo e
+    as consultas dos outros middlewares (sessão, autenticação).
+
+    Sob ASGI a cadeia é assíncrona e o código síncrono da requisição (outros
+    middlewares, views síncronas e os `sync_to_async` das views assíncronas)
+    roda numa thread própria, com as conexões dessa thread. O
+    `execute_wrapper` é instalado e removido nessa mesma thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        with _medindo(medidor):
+            resposta = self.get_response(request)
+        registrar(
+            _nome_view(request), request.method, resposta.status_code,
+            time.perf_counter() - inicio, medidor.total, medidor.duracao, _bytes(resposta)
+        )
+        return resposta
+
+    async def __acall__(self, request):
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        pilha = ExitStack()
+        # Na thread (sensível ao contexto da requisição) onde as consultas rodam
+        await sync_to_async(pilha.enter_context)(_medindo(medidor))
+        try:
+            resposta = await self.get_response(request)
+        finally:
+            await sync_to_async(pilha.close)()
+        registrar(
+            _nome_view(request), request.method, resposta.status_code,
+            time.perf_counter() - inicio, medidor.total, medidor.duracao, _bytes(resposta)
+        )
+        return resposta
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+def popular_movimentos(apps, schema_editor):
+    """Gera os `Movimento` dos registros que já existiam antes desta migração."""
+    EstoqueGasolina = apps.get_model('gerenciamento', 'EstoqueGasolina')
+    Movimento = apps.get_model('gerenciamento', 'Movimento')
+    RegistroCompra = apps.get_model('gerenciamento', 'RegistroCompra')
+    RegistroVenda = apps.get_model('gerenciamento', 'RegistroVenda')
+    RegistroServico = apps.get_model('gerenciamento', 'RegistroServico')
+
+    labels = dict(EstoqueGasolina._meta.get_field('tipo').choices)
+    tipos = dict(EstoqueGasolina.objects.values_list('pk', 'tipo'))
+
+    def lotes():
+        for r in RegistroCompra.objects.order_by('pk').iterator(chunk_size=2000):
+            yield Movimento(origem='COMPRA', registro_id=r.pk, item=f"C:{r.combustivel_id}",
+                            item_label=labels.get(tipos.get(r.combustivel_id), ''), tipo='COMPRA',
+                            data=r.data_compra, quantidade=r.quantidade_litros,
+                            preco_unitario=r.preco_compra_litro, total=r.total_compra)
+        for r in RegistroVenda.objects.order_by('pk').iterator(chunk_size=2000):
+            yield Movimento(origem='VENDA', registro_id=r.pk, item=f"C:{r.combustivel_id}",
+                            item_label=labels.get(tipos.get(r.combustivel_id), ''), tipo='VENDA',
+                            data=r.data_venda, quantidade=r.quantidade_litros,
+                            preco_unitario=r.preco_venda_litro, total=r.total_venda)
+        for r in RegistroServico.objects.select_related('servico').order_by('pk').iterator(chunk_size=2000):
+            yield Movimento(origem='SERVICO', registro_id=r.pk, item=f"S:{r.servico_id}",
+                            item_label=r.servico.nome, tipo=r.tipo, data=r.data,
+                            quantidade=r.quantidade, preco_unitario=r.preco_unitario, total=r.total)
+
+    buffer = []
+    for movimento in lotes():
+        buffer.append(movimento)
+        if len(buffer) >= 2000:
+            Movimento.objects.bulk_create(buffer)
+            buffer = []
+    Movimento.objects.bulk_create(buffer)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0004_servico_registroservico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Movimento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(choices=[('COMPRA', 'Compra de Combustível'), ('VENDA', 'Venda de Combustível'), ('SERVICO', 'Registro de Serviço')], max_length=10)),
+                ('registro_id', models.PositiveBigIntegerField(verbose_name='Registro de Origem')),
+                ('item', models.CharField(max_length=20, verbose_name='Item')),
+                ('item_label', models.CharField(max_length=120, verbose_name='Descrição do Item')),
+                ('tipo', models.CharField(choices=[('COMPRA', 'Compra'), ('VENDA', 'Venda')], max_length=10)),
+                ('data', models.DateTimeField()),
+                ('quantidade', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('preco_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Movimento',
+                'verbose_name_plural': 'Movimentos',
+                'ordering': ['-data', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='registrocompra',
+            index=models.Index(fields=['combustivel', 'data_compra'], name='compra_comb_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrocompra',
+            index=models.Index(fields=['data_compra', 'id'], name='compra_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroservico',
+            index=models.Index(fields=['servico', 'tipo', 'data'], name='regserv_serv_tipo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroservico',
+            index=models.Index(fields=['data', 'id'], name='regserv_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrovenda',
+            index=models.Index(fields=['combustivel', 'data_venda'], name='venda_comb_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrovenda',
+            index=models.Index(fields=['data_venda', 'id'], name='venda_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimento',
+            index=models.Index(fields=['data', 'id'], name='movimento_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimento',
+            index=models.Index(fields=['item', 'data', 'id'], name='movimento_item_data_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='movimento',
+            constraint=models.UniqueConstraint(fields=('origem', 'registro_id'), name='movimento_origem_registro_uniq'),
+        ),
+        migrations.RunPython(popular_movimentos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:10
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0005_indices_ledgers_movimento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMovimento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidade', models.CharField(choices=[('DIA', 'Dia'), ('HORA', 'Hora')], max_length=4)),
+                ('periodo', models.DateTimeField()),
+                ('item', models.CharField(max_length=20)),
+                ('tipo', models.CharField(choices=[('COMPRA', 'Compra'), ('VENDA', 'Venda')], max_length=10)),
+                ('litros', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('quantidade', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('receita', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('custo', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('contagem', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumo de Movimentos',
+                'verbose_name_plural': 'Resumos de Movimentos',
+                'ordering': ['granularidade', 'periodo', 'item', 'tipo'],
+                'indexes': [models.Index(fields=['granularidade', 'item', 'periodo'], name='resumo_item_periodo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularidade', 'periodo', 'item', 'tipo'), name='resumo_periodo_item_tipo_uniq')],
+            },
+        ),
+    ]
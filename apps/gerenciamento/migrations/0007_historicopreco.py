@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:14
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def registrar_precos_atuais(apps, schema_editor):
+    """
+    Inicia o histórico com o preço vigente de cada item existente.
+
+    `data_ultima_atualizacao` é `auto_now` e pode ser posterior às vendas já
+    registradas, que ficariam sem preço; a vigência começa no movimento mais
+    antigo do item, quando ele é anterior a essa data.
+    """
+    EstoqueGasolina = apps.get_model('gerenciamento', 'EstoqueGasolina')
+    Servico = apps.get_model('gerenciamento', 'Servico')
+    HistoricoPreco = apps.get_model('gerenciamento', 'HistoricoPreco')
+    Movimento = apps.get_model('gerenciamento', 'Movimento')
+
+    primeiros = dict(Movimento.objects.order_by().values('item').annotate(inicio=Min('data')).values_list('item', 'inicio'))
+
+    def inicio(item, data):
+        primeiro = primeiros.get(item)
+        return min(primeiro, data) if primeiro else data
+
+    historico = [
+        HistoricoPreco(item=f"C:{c.pk}", preco=c.preco_atual_litro, vigente_desde=inicio(f"C:{c.pk}", c.data_ultima_atualizacao))
+        for c in EstoqueGasolina.objects.all()
+    ] + [
+        HistoricoPreco(item=f"S:{s.pk}", preco=s.preco_unitario, vigente_desde=inicio(f"S:{s.pk}", s.criado_em))
+        for s in Servico.objects.all()
+    ]
+    HistoricoPreco.objects.bulk_create(historico)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0006_resumomovimento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoPreco',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item', models.CharField(max_length=20, verbose_name='Item')),
+                ('preco', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço (R$)')),
+                ('vigente_desde', models.DateTimeField(verbose_name='Vigente desde')),
+                ('registrado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Histórico de Preço',
+                'verbose_name_plural': 'Histórico de Preços',
+                'ordering': ['item', '-vigente_desde'],
+                'indexes': [models.Index(fields=['item', 'vigente_desde'], name='historico_item_vigencia_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_precos_atuais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:15
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0007_historicopreco'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrovenda',
+            name='custo_fifo_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='CMV - PEPS (R$)'),
+        ),
+        migrations.AddField(
+            model_name='registrovenda',
+            name='custo_medio_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='CMV - Custo Médio (R$)'),
+        ),
+        migrations.CreateModel(
+            name='CustoCombustivel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('litros', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Litros Custeados')),
+                ('custo_medio_litro', models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=12, verbose_name='Custo Médio por Litro (R$)')),
+                ('valor_estoque', models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=16, verbose_name='Valor do Estoque (R$)')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('combustivel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='custo', to='gerenciamento.estoquegasolina', verbose_name='Combustível')),
+            ],
+            options={
+                'verbose_name': 'Custo de Combustível',
+                'verbose_name_plural': 'Custos de Combustíveis',
+            },
+        ),
+        migrations.CreateModel(
+            name='CamadaCusto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateTimeField()),
+                ('litros_restantes', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('custo_litro', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('combustivel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='camadas_custo', to='gerenciamento.estoquegasolina', verbose_name='Combustível')),
+            ],
+            options={
+                'verbose_name': 'Camada de Custo (PEPS)',
+                'verbose_name_plural': 'Camadas de Custo (PEPS)',
+                'ordering': ['combustivel', 'data', 'id'],
+                'indexes': [models.Index(condition=models.Q(('litros_restantes__gt', 0)), fields=['combustivel', 'data', 'id'], name='camada_abertas_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+def marcar_espelhos_de_combustivel(apps, schema_editor):
+    """Converte a convenção antiga (prefixo na descrição) para a categoria."""
+    Servico = apps.get_model('gerenciamento', 'Servico')
+    Servico.objects.filter(descricao__startswith='origem:combustivel:').update(categoria='COMBUSTIVEL')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0008_custos_combustivel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servico',
+            name='categoria',
+            field=models.CharField(choices=[('SERVICO', 'Serviço'), ('COMBUSTIVEL', 'Combustível')], default='SERVICO', max_length=12, verbose_name='Categoria'),
+        ),
+        migrations.AddIndex(
+            model_name='servico',
+            index=models.Index(fields=['categoria', 'nome'], name='servico_categoria_nome_idx'),
+        ),
+        migrations.RunPython(marcar_espelhos_de_combustivel, migrations.RunPython.noop),
+    ]
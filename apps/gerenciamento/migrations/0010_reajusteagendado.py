@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0009_servico_categoria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReajusteAgendado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item', models.CharField(max_length=20, verbose_name='Item')),
+                ('preco', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço (R$)')),
+                ('vigente_em', models.DateTimeField(verbose_name='Vigente a partir de')),
+                ('situacao', models.CharField(choices=[('PENDENTE', 'Pendente'), ('APLICADO', 'Aplicado'), ('SUBSTITUIDO', 'Substituído'), ('DESCARTADO', 'Descartado')], default='PENDENTE', max_length=12, verbose_name='Situação')),
+                ('lote', models.UUIDField(blank=True, editable=False, null=True)),
+                ('aplicado_em', models.DateTimeField(blank=True, null=True, verbose_name='Aplicado em')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Reajuste Agendado',
+                'verbose_name_plural': 'Reajustes Agendados',
+                'ordering': ['vigente_em', 'id'],
+                'indexes': [models.Index(condition=models.Q(('situacao', 'PENDENTE')), fields=['vigente_em', 'id'], name='reajuste_pendente_idx')],
+            },
+        ),
+    ]
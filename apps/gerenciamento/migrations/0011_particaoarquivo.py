@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0010_reajusteagendado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticaoArquivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger', models.CharField(choices=[('compras', 'Compras'), ('vendas', 'Vendas'), ('servicos', 'Serviços')], max_length=10)),
+                ('mes', models.DateField(verbose_name='Mês')),
+                ('tabela', models.CharField(max_length=80, unique=True)),
+                ('linhas', models.PositiveIntegerField(default=0)),
+                ('arquivado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Partição de Arquivo',
+                'verbose_name_plural': 'Partições de Arquivo',
+                'ordering': ['ledger', '-mes'],
+                'constraints': [models.UniqueConstraint(fields=('ledger', 'mes'), name='particao_ledger_mes_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gerenciamento', '0011_particaoarquivo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='particaoarquivo',
+            name='ledger',
+            field=models.CharField(choices=[('compras', 'Compras'), ('vendas', 'Vendas'), ('servicos', 'Serviços'), ('movimentos', 'Movimentos')], max_length=10),
+        ),
+    ]
@@ -63,6 +63,10 @@ class RegistroCompra(models.Model):
         verbose_name = 'Registro de Compra'
         verbose_name_plural = 'Registros de Compras'
         ordering = ['-data_compra'] 
+        indexes = [
+            models.Index(fields=['combustivel', 'data_compra'], name='compra_comb_data_idx'),
+            models.Index(fields=['data_compra', 'id'], name='compra_data_id_idx'),
+        ]
 
     def __str__(self):
         return f"Compra: {self.combustivel.get_tipo_display()} - {self.quantidade_litros} L em {self.data_compra:%Y-%m-%d %H:%M}"
@@ -78,25 +82,42 @@ class RegistroVenda(models.Model):
     quantidade_litros = models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Quantidade (L)')
     preco_venda_litro = models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço de Venda por Litro (R$)')
     total_venda = models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Total Recebido (R$)')
+    # Custo das mercadorias vendidas (CMV), calculado no momento da venda (ver `custos.py`)
+    custo_medio_total = models.DecimalField(decimal_places=2, max_digits=12, null=True, blank=True, verbose_name='CMV - Custo Médio (R$)')
+    custo_fifo_total = models.DecimalField(decimal_places=2, max_digits=12, null=True, blank=True, verbose_name='CMV - PEPS (R$)')
 
     class Meta:
         verbose_name = 'Registro de Venda'
         verbose_name_plural = 'Registros de Vendas'
         ordering = ['-data_venda'] 
+        indexes = [
+            models.Index(fields=['combustivel', 'data_venda'], name='venda_comb_data_idx'),
+            models.Index(fields=['data_venda', 'id'], name='venda_data_id_idx'),
+        ]
 
     def __str__(self):
         return f"Venda: {self.combustivel.get_tipo_display()} - {self.quantidade_litros} L em {self.data_venda:%Y-%m-%d %H:%M}"
 
 
 class Servico(models.Model):
+    CATEGORIAS = [
+        ('SERVICO', 'Serviço'),
+        # Espelho de um combustível na lista pública; fica fora do financeiro e da edição de serviços
+        ('COMBUSTIVEL', 'Combustível'),
+    ]
+
     nome = models.CharField(max_length=120, verbose_name='Nome do Serviço')
     descricao = models.TextField(blank=True, null=True, verbose_name='Descrição') 
     preco_unitario = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), verbose_name='Preço por Unidade (R$)')
+    categoria = models.CharField(max_length=12, choices=CATEGORIAS, default='SERVICO', verbose_name='Categoria')
     criado_em = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = 'Serviço'
         verbose_name_plural = 'Serviços'
+        indexes = [
+            models.Index(fields=['categoria', 'nome'], name='servico_categoria_nome_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} - R$ {self.preco_unitario}"
@@ -123,6 +144,243 @@ class RegistroServico(models.Model):
         verbose_name = 'Registro de Serviço'
         verbose_name_plural = 'Registros de Serviços'
         ordering = ['-data']
+        indexes = [
+            models.Index(fields=['servico', 'tipo', 'data'], name='regserv_serv_tipo_data_idx'),
+            models.Index(fields=['data', 'id'], name='regserv_data_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.servico.nome} - R$ {self.total} em {self.data:%Y-%m-%d %H:%M}"
+
+
+class Movimento(models.Model):
+    """
+    Livro-razão unificado (somente leitura) de combustíveis e serviços.
+
+    Cada `RegistroCompra`, `RegistroVenda` e `RegistroServico` gera uma linha
+    aqui, de forma que "últimas N transações" e "histórico de um item" viram
+    uma leitura por índice em vez de três consultas ordenadas.
+    """
+    ORIGENS = [
+        ('COMPRA', 'Compra de Combustível'),
+        ('VENDA', 'Venda de Combustível'),
+        ('SERVICO', 'Registro de Serviço'),
+    ]
+
+    origem = models.CharField(max_length=10, choices=ORIGENS)
+    registro_id = models.PositiveBigIntegerField(verbose_name='Registro de Origem')
+    # Mesmo formato das choices do financeiro: 'C:<pk>' (combustível) ou 'S:<pk>' (serviço)
+    item = models.CharField(max_length=20, verbose_name='Item')
+    item_label = models.CharField(max_length=120, verbose_name='Descrição do Item')
+    tipo = models.CharField(max_length=10, choices=RegistroServico.TIPO_TRANSACAO)
+    data = models.DateTimeField()
+    quantidade = models.DecimalField(max_digits=10, decimal_places=2)
+    preco_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Movimento'
+        verbose_name_plural = 'Movimentos'
+        ordering = ['-data', '-id']
+        indexes = [
+            models.Index(fields=['data', 'id'], name='movimento_data_id_idx'),
+            models.Index(fields=['item', 'data', 'id'], name='movimento_item_data_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['origem', 'registro_id'], name='movimento_origem_registro_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.item_label} - R$ {self.total} em {self.data:%Y-%m-%d %H:%M}"
+
+
+class ResumoMovimento(models.Model):
+    """
+    Totais pré-agregados por período (dia ou hora local), item e tipo de transação.
+
+    Atualizado na mesma transação de cada gravação de ledger (ver
+    `apps.gerenciamento.resumos`), de modo que relatórios leem dezenas de
+    linhas em vez de agregar todos os registros.
+    """
+    GRANULARIDADES = [
+        ('DIA', 'Dia'),
+        ('HORA', 'Hora'),
+    ]
+
+    granularidade = models.CharField(max_length=4, choices=GRANULARIDADES)
+    # Início do período no fuso local (TIME_ZONE), armazenado como datetime aware
+    periodo = models.DateTimeField()
+    # Mesmo formato do `Movimento`: 'C:<pk>' ou 'S:<pk>'
+    item = models.CharField(max_length=20)
+    tipo = models.CharField(max_length=10, choices=RegistroServico.TIPO_TRANSACAO)
+    litros = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    quantidade = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    receita = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    custo = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    contagem = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Resumo de Movimentos'
+        verbose_name_plural = 'Resumos de Movimentos'
+        ordering = ['granularidade', 'periodo', 'item', 'tipo']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularidade', 'periodo', 'item', 'tipo'],
+                name='resumo_periodo_item_tipo_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularidade', 'item', 'periodo'], name='resumo_item_periodo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_granularidade_display()} {self.periodo:%Y-%m-%d %H:%M} {self.item} {self.tipo}: R$ {self.receita or self.custo}"
+
+
+class HistoricoPreco(models.Model):
+    """
+    Linha do tempo (somente inserção) dos preços de combustíveis e serviços.
+
+    Cada alteração de `EstoqueGasolina.preco_atual_litro` ou
+    `Servico.preco_unitario` gera uma linha; o índice `(item, vigente_desde)`
+    responde "qual era o preço de X no instante T" com uma busca no índice.
+    """
+    # Mesmo formato do `Movimento`: 'C:<pk>' ou 'S:<pk>'
+    item = models.CharField(max_length=20, verbose_name='Item')
+    preco = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Preço (R$)')
+    vigente_desde = models.DateTimeField(verbose_name='Vigente desde')
+    registrado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Histórico de Preço'
+        verbose_name_plural = 'Histórico de Preços'
+        ordering = ['item', '-vigente_desde']
+        indexes = [
+            models.Index(fields=['item', 'vigente_desde'], name='historico_item_vigencia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item}: R$ {self.preco} desde {self.vigente_desde:%Y-%m-%d %H:%M}"
+
+
+class CustoCombustivel(models.Model):
+    """Estado corrente do custo médio ponderado de um combustível."""
+    combustivel = models.OneToOneField(
+        EstoqueGasolina,
+        on_delete=models.CASCADE,
+        related_name='custo',
+        verbose_name='Combustível'
+    )
+    litros = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name='Litros Custeados')
+    custo_medio_litro = models.DecimalField(max_digits=12, decimal_places=4, default=Decimal('0.0000'), verbose_name='Custo Médio por Litro (R$)')
+    valor_estoque = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.0000'), verbose_name='Valor do Estoque (R$)')
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Custo de Combustível'
+        verbose_name_plural = 'Custos de Combustíveis'
+
+    def __str__(self):
+        return f"{self.combustivel_id}: {self.litros} L a R$ {self.custo_medio_litro}/L"
+
+
+class CamadaCusto(models.Model):
+    """Camada PEPS (FIFO): litros de uma entrada ainda não consumidos por vendas."""
+    combustivel = models.ForeignKey(
+        EstoqueGasolina,
+        on_delete=models.CASCADE,
+        related_name='camadas_custo',
+        verbose_name='Combustível'
+    )
+    data = models.DateTimeField()
+    litros_restantes = models.DecimalField(max_digits=12, decimal_places=2)
+    custo_litro = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Camada de Custo (PEPS)'
+        verbose_name_plural = 'Camadas de Custo (PEPS)'
+        ordering = ['combustivel', 'data', 'id']
+        indexes = [
+            models.Index(
+                fields=['combustivel', 'data', 'id'],
+                name='camada_abertas_idx',
+                condition=models.Q(litros_restantes__gt=0)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.combustivel_id}: {self.litros_restantes} L a R$ {self.custo_litro}/L ({self.data:%Y-%m-%d})"
+
+
+class ReajusteAgendado(models.Model):
+    """
+    Mudança de preço anunciada com antecedência.
+
+    O comando `aplicar_reajustes` aplica as pendentes já vencidas em lotes
+    (ver `reajuste.aplicar_vencidos`). O índice parcial sobre as pendentes
+    mantém a busca pelas vencidas proporcional a elas, e não ao histórico.
+    """
+    PENDENTE = 'PENDENTE'
+    SITUACOES = [
+        (PENDENTE, 'Pendente'),
+        ('APLICADO', 'Aplicado'),
+        ('SUBSTITUIDO', 'Substituído'),
+        ('DESCARTADO', 'Descartado'),
+    ]
+
+    # Mesmo formato do `HistoricoPreco`: 'C:<pk>' ou 'S:<pk>'
+    item = models.CharField(max_length=20, verbose_name='Item')
+    preco = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Preço (R$)')
+    vigente_em = models.DateTimeField(verbose_name='Vigente a partir de')
+    situacao = models.CharField(max_length=12, choices=SITUACOES, default=PENDENTE, verbose_name='Situação')
+    # Identifica o lote do agendador que aplicou a linha
+    lote = models.UUIDField(null=True, blank=True, editable=False)
+    aplicado_em = models.DateTimeField(null=True, blank=True, verbose_name='Aplicado em')
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Reajuste Agendado'
+        verbose_name_plural = 'Reajustes Agendados'
+        ordering = ['vigente_em', 'id']
+        indexes = [
+            models.Index(
+                fields=['vigente_em', 'id'],
+                name='reajuste_pendente_idx',
+                condition=models.Q(situacao='PENDENTE')
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.item}: R$ {self.preco} em {self.vigente_em:%Y-%m-%d %H:%M} ({self.get_situacao_display()})"
+
+
+class ParticaoArquivo(models.Model):
+    """
+    Mês fechado de um ledger (ou dos `Movimento` que ele gerou) movido da
+    tabela principal para a tabela de arquivo `tabela` (ver
+    `apps.gerenciamento.arquivo`).
+    """
+    LEDGERS = [
+        ('compras', 'Compras'),
+        ('vendas', 'Vendas'),
+        ('servicos', 'Serviços'),
+        ('movimentos', 'Movimentos'),
+    ]
+
+    ledger = models.CharField(max_length=10, choices=LEDGERS)
+    # Primeiro dia do mês no fuso local (TIME_ZONE)
+    mes = models.DateField(verbose_name='Mês')
+    tabela = models.CharField(max_length=80, unique=True)
+    linhas = models.PositiveIntegerField(default=0)
+    arquivado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Partição de Arquivo'
+        verbose_name_plural = 'Partições de Arquivo'
+        ordering = ['ledger', '-mes']
+        constraints = [
+            models.UniqueConstraint(fields=['ledger', 'mes'], name='particao_ledger_mes_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_ledger_display()} {self.mes:%m/%Y}: {self.linhas} linhas em {self.tabela}"
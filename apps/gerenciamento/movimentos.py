@@ -0,0 +1,90 @@
+"""
+Manutenção e leitura do livro-razão unificado (`Movimento`).
+
+Toda gravação de `RegistroCompra`, `RegistroVenda` ou `RegistroServico`
+deve passar por `registrar()` dentro da mesma transação, para que o
+`Movimento` correspondente (e os resumos por dia/hora) exista sempre que o
+registro existir.
+"""
+
+from functools import partial
+
+from django.db import transaction
+
+from . import resumos
+from .atividade import atividade
+from .models import Movimento, RegistroCompra, RegistroServico, RegistroVenda
+
+
+def de_compra(registro):
+    return Movimento(
+        origem='COMPRA',
+        registro_id=registro.pk,
+        item=f"C:{registro.combustivel_id}",
+        item_label=registro.combustivel.get_tipo_display(),
+        tipo='COMPRA',
+        data=registro.data_compra,
+        quantidade=registro.quantidade_litros,
+        preco_unitario=registro.preco_compra_litro,
+        total=registro.total_compra,
+    )
+
+
+def de_venda(registro):
+    return Movimento(
+        origem='VENDA',
+        registro_id=registro.pk,
+        item=f"C:{registro.combustivel_id}",
+        item_label=registro.combustivel.get_tipo_display(),
+        tipo='VENDA',
+        data=registro.data_venda,
+        quantidade=registro.quantidade_litros,
+        preco_unitario=registro.preco_venda_litro,
+        total=registro.total_venda,
+    )
+
+
+def de_servico(registro):
+    return Movimento(
+        origem='SERVICO',
+        registro_id=registro.pk,
+        item=f"S:{registro.servico_id}",
+        item_label=registro.servico.nome,
+        tipo=registro.tipo,
+        data=registro.data,
+        quantidade=registro.quantidade,
+        preco_unitario=registro.preco_unitario,
+        total=registro.total,
+    )
+
+
+CONVERSORES = {
+    RegistroCompra: de_compra,
+    RegistroVenda: de_venda,
+    RegistroServico: de_servico,
+}
+
+
+def registrar(registros):
+    """
+    Cria os `Movimento` de registros já salvos (com pk) usando um único
+    `bulk_create`, acumula-os em `ResumoMovimento` e, após o commit, no
+    buffer de últimas transações (`atividade`).
+    """
+    movimentos = Movimento.objects.bulk_create(
+        [CONVERSORES[type(r)](r) for r in registros],
+        batch_size=500
+    )
+    resumos.acumular(movimentos)
+    transaction.on_commit(partial(atividade.registrar_confirmados, movimentos))
+    return movimentos
+
+
+def recentes(limite=10):
+    """Últimas transações de todos os ledgers (varredura reversa do índice `(data, id)`)."""
+    return Movimento.objects.order_by('-data', '-id')[:limite]
+
+
+def historico_item(item, limite=50):
+    """Histórico de um item ('C:<pk>' ou 'S:<pk>'), servido pelo índice `(item, data, id)`."""
+    return Movimento.objects.filter(item=item).order_by('-data', '-id')[:limite]
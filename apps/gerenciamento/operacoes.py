@@ -0,0 +1,182 @@
+"""
+Serviço compartilhado de movimentação de estoque de combustível.
+
+Em vez de ler a linha com `select_for_update()` (que não faz nada no SQLite),
+conferir o saldo em Python e salvar a linha inteira, o saldo é alterado com um
+único UPDATE condicional:
+
+    UPDATE ... SET quantidade_litros = quantidade_litros - x
+    WHERE id = ... AND quantidade_litros >= x
+
+O `RETURNING` devolve a linha já atualizada (saldo e preço), então a venda
+não precisa de um SELECT depois do UPDATE. Se nenhuma linha for afetada, o
+estoque é insuficiente. Erros de "database is locked" fazem a operação
+inteira ser repetida algumas vezes, com espera crescente, antes de desistir.
+
+O token 'estoque' de `versoes` é trocado de forma agrupada (no máximo uma
+vez por `versoes.AGRUPAMENTO` segundos por processo), e não a cada venda.
+"""
+
+import functools
+import random
+import time
+
+from django.db import OperationalError, connection, router, transaction
+from django.db.models import F
+from django.db.models.sql import UpdateQuery
+from django.utils import timezone
+
+from . import movimentos, versoes
+from .custos import MotorCusto
+from .models import EstoqueGasolina, RegistroCompra, RegistroServico, RegistroVenda, Servico
+
+TENTATIVAS_MAXIMAS = 8
+ESPERA_INICIAL = 0.02
+
+
+class EstoqueInsuficiente(Exception):
+    """O saldo do combustível não cobre a saída solicitada."""
+
+
+class SaldoAlterado(Exception):
+    """O saldo mudou entre a leitura e o UPDATE condicional; a operação deve ser refeita."""
+
+
+def _banco_bloqueado(erro):
+    mensagem = str(erro).lower()
+    return 'database is locked' in mensagem or 'database table is locked' in mensagem
+
+
+def com_tentativas(funcao):
+    """
+    Repete `funcao` quando o banco está bloqueado ou o saldo mudou no meio do caminho.
+
+    Só há nova tentativa quando a chamada não está dentro de uma transação
+    externa: nesse caso o erro é repassado para quem abriu a transação.
+    """
+    @functools.wraps(funcao)
+    def wrapper(*args, **kwargs):
+        for tentativa in range(1, TENTATIVAS_MAXIMAS + 1):
+            try:
+                return funcao(*args, **kwargs)
+            except (OperationalError, SaldoAlterado) as e:
+                repetivel = isinstance(e, SaldoAlterado) or _banco_bloqueado(e)
+                if not repetivel or connection.in_atomic_block or tentativa == TENTATIVAS_MAXIMAS:
+                    raise
+                espera = ESPERA_INICIAL * (2 ** (tentativa - 1))
+                time.sleep(espera + random.uniform(0, espera))
+    return wrapper
+
+
+def aplicar_delta(combustivel_pk, delta, agora=None):
+    """
+    Soma `delta` (negativo para saídas) ao saldo com um único
+    `UPDATE ... RETURNING`.
+
+    Saídas só são aplicadas se o saldo for suficiente. Retorna o
+    `EstoqueGasolina` com o saldo já atualizado, ou None se a linha não foi
+    alterada (combustível inexistente ou saldo insuficiente).
+    """
+    qs = EstoqueGasolina.objects.filter(pk=combustivel_pk)
+    if delta < 0:
+        qs = qs.filter(quantidade_litros__gte=-delta)
+    banco = router.db_for_write(EstoqueGasolina)
+    query = qs.query.chain(UpdateQuery)
+    query.add_update_values({
+        'quantidade_litros': F('quantidade_litros') + delta,
+        'data_ultima_atualizacao': agora or timezone.now(),
+    })
+    sql, parametros = query.get_compiler(banco).as_sql()
+    colunas = ', '.join(connection.ops.quote_name(campo.column) for campo in EstoqueGasolina._meta.concrete_fields)
+    # `list` lê o RETURNING até o fim: o UPDATE só termina quando o cursor se esgota
+    linhas = list(EstoqueGasolina.objects.db_manager(banco).raw(f"{sql} RETURNING {colunas}", parametros))
+    if not linhas:
+        return None
+    # O UPDATE não dispara sinais: invalida as páginas públicas aqui
+    versoes.invalidar_agrupado('estoque')
+    return linhas[0]
+
+
+@com_tentativas
+def registrar_movimentacao_combustivel(combustivel_pk, movimento, quantidade):
+    """
+    Registra uma entrada (compra) ou saída (venda) e atualiza o saldo.
+
+    Args:
+        combustivel_pk: pk do `EstoqueGasolina`.
+        movimento: 'ENTRADA' ou 'SAIDA'.
+        quantidade: litros (Decimal positivo).
+
+    Returns:
+        O `RegistroCompra` ou `RegistroVenda` criado, com `combustivel`
+        já carregado (saldo e preço após a movimentação).
+
+    Raises:
+        EstoqueGasolina.DoesNotExist: combustível inexistente.
+        EstoqueInsuficiente: saída maior que o saldo.
+    """
+    delta = quantidade if movimento == 'ENTRADA' else -quantidade
+
+    with transaction.atomic():
+        item_estoque = aplicar_delta(combustivel_pk, delta)
+        if item_estoque is None:
+            if not EstoqueGasolina.objects.filter(pk=combustivel_pk).exists():
+                raise EstoqueGasolina.DoesNotExist
+            raise EstoqueInsuficiente("Estoque insuficiente para esta saída.")
+
+        preco_unitario = item_estoque.preco_atual_litro
+        total = preco_unitario * quantidade
+        motor = MotorCusto(item_estoque, item_estoque.quantidade_litros - delta)
+
+        if movimento == 'ENTRADA':
+            motor.entrada(quantidade, preco_unitario)
+            registro = RegistroCompra.objects.create(
+                combustivel=item_estoque,
+                quantidade_litros=quantidade,
+                preco_compra_litro=preco_unitario,
+                total_compra=total
+            )
+        else:
+            custo_medio, custo_fifo = motor.saida(quantidade)
+            registro = RegistroVenda.objects.create(
+                combustivel=item_estoque,
+                quantidade_litros=quantidade,
+                preco_venda_litro=preco_unitario,
+                total_venda=total,
+                custo_medio_total=custo_medio,
+                custo_fifo_total=custo_fifo
+            )
+
+        motor.salvar()
+        movimentos.registrar([registro])
+
+    return registro
+
+
+def registrar_transacao_servico(servico_pk, tipo, quantidade):
+    """
+    Registra a compra ou venda de um serviço pelo preço unitário atual.
+
+    Args:
+        servico_pk: pk do `Servico`.
+        tipo: 'COMPRA' ou 'VENDA'.
+        quantidade: unidades (Decimal positivo).
+
+    Returns:
+        O `RegistroServico` criado.
+
+    Raises:
+        Servico.DoesNotExist: serviço inexistente.
+    """
+    with transaction.atomic():
+        servico = Servico.objects.get(pk=servico_pk)
+        registro = RegistroServico.objects.create(
+            servico=servico,
+            tipo=tipo,
+            quantidade=quantidade,
+            preco_unitario=servico.preco_unitario,
+            total=servico.preco_unitario * quantidade
+        )
+        movimentos.registrar([registro])
+
+    return registro
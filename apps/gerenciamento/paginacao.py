@@ -0,0 +1,93 @@
+"""
+Paginação por cursor (keyset) para os ledgers do financeiro.
+
+Em vez de `OFFSET`, que obriga o banco a percorrer e descartar todas as
+linhas das páginas anteriores, cada página começa logo após a última linha
+da página anterior:
+
+    WHERE data <= :d AND (data < :d OR (data = :d AND id < :id))
+    ORDER BY data DESC, id DESC
+    LIMIT :n
+
+Com os índices `(data, id)` / `(item, data)` a consulta é uma varredura de
+intervalo no índice, e a página N custa o mesmo que a página 1.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+TAMANHO_PAGINA = 50
+
+
+class CursorInvalido(ValueError):
+    """O cursor recebido na URL não pôde ser decodificado."""
+
+
+def codificar_cursor(data, pk):
+    bruto = f"{data.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        data_iso, pk = bruto.rsplit('|', 1)
+        return datetime.fromisoformat(data_iso), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(str(e))
+
+
+def _apos_cursor(queryset, campo_data, cursor):
+    if not cursor:
+        return queryset
+    data, pk = cursor
+    return queryset.filter(
+        Q(**{f'{campo_data}__lt': data}) | Q(**{campo_data: data, 'pk__lt': pk}),
+        **{f'{campo_data}__lte': data}
+    )
+
+
+def _fechar(itens, campo_data, tamanho):
+    proximo = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        ultimo = itens[-1]
+        proximo = codificar_cursor(getattr(ultimo, campo_data), ultimo.pk)
+    return itens, proximo
+
+
+def pagina(queryset, campo_data, cursor=None, tamanho=TAMANHO_PAGINA):
+    """
+    Retorna `(itens, proximo_cursor)` da página que começa após `cursor`.
+
+    `proximo_cursor` é None na última página. Uma linha a mais é lida para
+    saber se há próxima página sem precisar de `COUNT(*)`.
+    """
+    cursor = decodificar_cursor(cursor) if cursor else None
+    queryset = _apos_cursor(queryset, campo_data, cursor)
+    itens = list(queryset.order_by(f'-{campo_data}', '-pk')[:tamanho + 1])
+    return _fechar(itens, campo_data, tamanho)
+
+
+def pagina_particionada(particoes, campo_data, cursor=None, tamanho=TAMANHO_PAGINA):
+    """
+    `pagina()` sobre várias partições de um ledger (ver `arquivo.consultar`),
+    recebidas da mais nova para a mais antiga.
+
+    Cada partição consultada custa a mesma varredura de índice de `pagina()`;
+    um mês arquivado só é consultado se ainda puder ter linhas da página, isto
+    é, se termina depois da última linha já garantida.
+    """
+    cursor = decodificar_cursor(cursor) if cursor else None
+    itens = []
+    for particao in particoes:
+        if len(itens) > tamanho and particao.fim is not None and particao.fim <= getattr(itens[tamanho], campo_data):
+            break
+        if cursor and particao.inicio is not None and particao.inicio > cursor[0]:
+            continue
+        queryset = _apos_cursor(particao.queryset, campo_data, cursor)
+        itens.extend(queryset.order_by(f'-{campo_data}', '-pk')[:tamanho + 1])
+        itens = sorted(itens, key=lambda item: (getattr(item, campo_data), item.pk), reverse=True)[:tamanho + 1]
+    return _fechar(itens, campo_data, tamanho)
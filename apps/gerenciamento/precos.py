@@ -0,0 +1,93 @@
+"""
+Histórico de preços de combustíveis e serviços (`HistoricoPreco`).
+
+Consultas pontuais (`preco_em`) e por intervalo (`linha_do_tempo`) usam o
+índice `(item, vigente_desde)`, custando uma busca logarítmica no índice em
+vez de varrer as vendas. Para simulações que consultam o mesmo item muitas
+vezes, `LinhaDoTempo` carrega as vigências uma vez e responde com `bisect`.
+
+Os itens seguem o formato 'C:<pk>' (combustível) / 'S:<pk>' (serviço).
+"""
+
+from bisect import bisect_right
+
+from django.utils import timezone
+
+from .models import HistoricoPreco
+
+
+def item_combustivel(combustivel):
+    return f"C:{combustivel.pk}"
+
+
+def item_servico(servico):
+    return f"S:{servico.pk}"
+
+
+def registrar_precos(alteracoes, vigente_desde=None):
+    """
+    Grava novas vigências de preço com um único `bulk_create`.
+
+    Args:
+        alteracoes: iterável de `(item, preco)`.
+        vigente_desde: instante a partir do qual os preços valem (padrão: agora).
+    """
+    vigente_desde = vigente_desde or timezone.now()
+    return HistoricoPreco.objects.bulk_create([
+        HistoricoPreco(item=item, preco=preco, vigente_desde=vigente_desde)
+        for item, preco in alteracoes
+    ])
+
+
+def preco_em(item, instante=None):
+    """Preço de `item` vigente em `instante` (padrão: agora), ou None se não houver registro."""
+    return (
+        HistoricoPreco.objects
+        .filter(item=item, vigente_desde__lte=instante or timezone.now())
+        .order_by('-vigente_desde', '-id')
+        .values_list('preco', flat=True)
+        .first()
+    )
+
+
+def linha_do_tempo(item, inicio, fim):
+    """
+    Vigências de `item` que se sobrepõem a `[inicio, fim]`.
+
+    Returns:
+        lista de `(vigente_desde, preco)` em ordem cronológica; o primeiro
+        elemento é o preço que já valia em `inicio` (quando existir).
+    """
+    anterior = (
+        HistoricoPreco.objects
+        .filter(item=item, vigente_desde__lte=inicio)
+        .order_by('-vigente_desde', '-id')
+        .values_list('vigente_desde', 'preco')
+        .first()
+    )
+    mudancas = list(
+        HistoricoPreco.objects
+        .filter(item=item, vigente_desde__gt=inicio, vigente_desde__lte=fim)
+        .order_by('vigente_desde', 'id')
+        .values_list('vigente_desde', 'preco')
+    )
+    return ([anterior] if anterior else []) + mudancas
+
+
+class LinhaDoTempo:
+    """Vigências de um item em memória, para muitas consultas `preco_em` seguidas."""
+
+    def __init__(self, item):
+        vigencias = list(
+            HistoricoPreco.objects
+            .filter(item=item)
+            .order_by('vigente_desde', 'id')
+            .values_list('vigente_desde', 'preco')
+        )
+        self.item = item
+        self.instantes = [v for v, _ in vigencias]
+        self.precos = [p for _, p in vigencias]
+
+    def preco_em(self, instante):
+        posicao = bisect_right(self.instantes, instante)
+        return self.precos[posicao - 1] if posicao else None
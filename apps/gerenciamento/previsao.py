@@ -0,0 +1,188 @@
+"""
+Previsão de esgotamento dos tanques e alertas de reposição.
+
+O histórico de `RegistroVenda` é lido uma vez como arrays NumPy (combustível,
+hora local, litros vendidos na hora) e todo o resto é vetorizado:
+
+1. `np.bincount` distribui as vendas numa matriz combustível x hora;
+2. a matriz vira um perfil de demanda por hora da semana (168 posições);
+3. a média móvel das últimas `JANELA_TENDENCIA_DIAS` ajusta o perfil à
+   demanda recente (um fator de escala por combustível);
+4. a demanda projetada das próximas `HORIZONTE_HORAS` é acumulada e comparada
+   com `quantidade_litros` para achar a hora em que o tanque esvazia.
+
+Não há laço Python por venda: o banco devolve uma linha por combustível e
+hora e o restante é aritmética de arrays. O resultado fica em cache pela
+versão 'estoque' (ver `versoes`), então só é recalculado quando o estoque
+muda.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import CharField, FloatField, Sum
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+
+from . import arquivo, versoes
+from .models import EstoqueGasolina
+from .roteamento import primario
+
+# Histórico usado para montar o perfil semanal
+JANELA_DIAS = 365
+# Período recente que define o nível atual da demanda
+JANELA_TENDENCIA_DIAS = 14
+# Até onde a projeção olha; além disso o tanque é considerado "sem previsão"
+HORIZONTE_HORAS = 24 * 60
+# Alertas: abaixo de PRAZO_CRITICO_HORAS é crítico, abaixo de PRAZO_REPOSICAO_HORAS pede reposição
+PRAZO_CRITICO_HORAS = 24
+PRAZO_REPOSICAO_HORAS = 72
+
+HORAS_SEMANA = 168
+# 01/01/1970 foi uma quinta-feira; o deslocamento faz a semana começar na segunda
+DESLOCAMENTO_SEMANA = 72
+CACHE_TIMEOUT = 300
+
+
+def carregar_vendas(inicio, fim, deslocamento):
+    """
+    Litros vendidos em `[inicio, fim)` por combustível e hora, como arrays
+    `(combustivel_id, hora_local, litros)`.
+
+    O banco já agrupa por hora UTC (os 13 primeiros caracteres do timestamp
+    em texto, 'AAAA-MM-DD HH') e devolve texto e float, sem os conversores de
+    datetime/Decimal do ORM por linha; o NumPy converte as horas de uma vez.
+    `hora_local` é o número de horas desde a época no fuso local
+    (`deslocamento` em segundos, múltiplo de uma hora como em
+    America/Sao_Paulo).
+    """
+    linhas = []
+    # A janela costuma ficar na tabela principal; meses arquivados só se alcançados
+    for particao in arquivo.no_intervalo('vendas', inicio, fim):
+        linhas += (
+            particao.queryset
+            .filter(data_venda__gte=inicio, data_venda__lt=fim)
+            .annotate(hora=Substr(Cast('data_venda', CharField()), 1, 13))
+            .values('combustivel_id', 'hora')
+            .annotate(litros=Sum(Cast('quantidade_litros', FloatField())))
+            .order_by()
+            .values_list('combustivel_id', 'hora', 'litros')
+        )
+    if not linhas:
+        vazio = np.array([], dtype=np.int64)
+        return vazio, vazio, np.array([], dtype=np.float64)
+    combustiveis, horas, litros = zip(*linhas)
+    horas = np.array(horas, dtype='datetime64[h]').astype(np.int64) + int(deslocamento // 3600)
+    return np.array(combustiveis, dtype=np.int64), horas, np.array(litros, dtype=np.float64)
+
+
+def demanda_horaria(codigos, horas, litros, quantidade, hora_inicial, total_horas):
+    """Matriz `quantidade x total_horas` com os litros vendidos em cada hora."""
+    posicoes = codigos * total_horas + (horas - hora_inicial)
+    return np.bincount(
+        posicoes, weights=litros, minlength=quantidade * total_horas
+    ).reshape(quantidade, total_horas)
+
+
+def hora_da_semana(horas):
+    return (horas + DESLOCAMENTO_SEMANA) % HORAS_SEMANA
+
+
+def perfil_semanal(matriz, hora_inicial):
+    """Demanda média (litros/hora) de cada combustível em cada hora da semana."""
+    quantidade, total_horas = matriz.shape
+    semana = hora_da_semana(np.arange(hora_inicial, hora_inicial + total_horas))
+    posicoes = (np.arange(quantidade)[:, None] * HORAS_SEMANA + semana[None, :]).ravel()
+    somas = np.bincount(
+        posicoes, weights=matriz.ravel(), minlength=quantidade * HORAS_SEMANA
+    ).reshape(quantidade, HORAS_SEMANA)
+    ocorrencias = np.bincount(semana, minlength=HORAS_SEMANA)
+    return somas / np.maximum(ocorrencias, 1)
+
+
+def media_movel(matriz, janela):
+    """Média móvel (litros/hora) das últimas `janela` horas, para cada hora."""
+    acumulado = np.cumsum(matriz, axis=1)
+    anterior = np.zeros_like(acumulado)
+    anterior[:, janela:] = acumulado[:, :-janela]
+    return (acumulado - anterior) / np.minimum(np.arange(1, matriz.shape[1] + 1), janela)
+
+
+def horas_ate_vazio(perfil, fator, saldos, hora_atual, horizonte=HORIZONTE_HORAS):
+    """
+    Horas até cada tanque esvaziar seguindo o perfil semanal escalado por
+    `fator`; `-1` quando não esvazia dentro do horizonte.
+    """
+    futuras = hora_da_semana(hora_atual + np.arange(horizonte))
+    acumulado = np.cumsum(perfil[:, futuras] * fator[:, None], axis=1)
+    horas = (acumulado < saldos[:, None]).sum(axis=1)
+    return np.where(horas >= horizonte, -1, horas)
+
+
+def calcular(agora=None):
+    """
+    Previsão de todos os combustíveis, indexada pelo pk.
+
+    Cada valor traz `consumo_diario` (L/dia recente), `horas_ate_vazio`,
+    `esgota_em` (ambos None sem previsão) e `nivel` ('critico', 'reposicao'
+    ou None).
+    """
+    agora = agora or timezone.now()
+    deslocamento = timezone.localtime(agora).utcoffset().total_seconds()
+    estoques = list(EstoqueGasolina.objects.order_by('tipo').values_list('pk', 'quantidade_litros'))
+    if not estoques:
+        return {}
+
+    pks = np.array([pk for pk, _ in estoques], dtype=np.int64)
+    saldos = np.array([float(saldo) for _, saldo in estoques])
+    combustiveis, horas, litros = carregar_vendas(agora - timedelta(days=JANELA_DIAS), agora, deslocamento)
+
+    hora_atual = int((agora.timestamp() + deslocamento) // 3600)
+    hora_inicial = hora_atual - JANELA_DIAS * 24 + 1
+    total_horas = hora_atual - hora_inicial + 1
+
+    # pks ordenados por tipo, não por valor: searchsorted precisa da ordem crescente
+    ordem = np.argsort(pks)
+    codigos = ordem[np.searchsorted(pks[ordem], combustiveis)]
+    dentro = (horas >= hora_inicial) & (horas <= hora_atual)
+    matriz = demanda_horaria(codigos[dentro], horas[dentro], litros[dentro], len(pks), hora_inicial, total_horas)
+
+    perfil = perfil_semanal(matriz, hora_inicial)
+    recente = media_movel(matriz, JANELA_TENDENCIA_DIAS * 24)[:, -1]
+    base = perfil.mean(axis=1)
+    fator = np.divide(recente, base, out=np.zeros_like(recente), where=base > 0)
+    restantes = horas_ate_vazio(perfil, fator, saldos, hora_atual + 1)
+
+    previsoes = {}
+    for posicao, pk in enumerate(pks.tolist()):
+        horas_restantes = int(restantes[posicao])
+        if horas_restantes < 0:
+            horas_restantes = None
+            nivel = None
+        elif horas_restantes <= PRAZO_CRITICO_HORAS:
+            nivel = 'critico'
+        elif horas_restantes <= PRAZO_REPOSICAO_HORAS:
+            nivel = 'reposicao'
+        else:
+            nivel = None
+        previsoes[pk] = {
+            'consumo_diario': round(float(recente[posicao]) * 24, 2),
+            'horas_ate_vazio': horas_restantes,
+            'esgota_em': agora + timedelta(hours=horas_restantes) if horas_restantes is not None else None,
+            'nivel': nivel,
+        }
+    return previsoes
+
+
+def previsoes():
+    """`calcular()` em cache enquanto a versão do estoque não mudar."""
+    token, _ = versoes.versao('estoque')
+    chave = f'gerenciamento:previsao:{token}'
+    resultado = cache.get(chave)
+    if resultado is None:
+        # Do primário: uma réplica atrasada deixaria dados antigos sob o token novo
+        with primario():
+            resultado = calcular()
+        cache.set(chave, resultado, CACHE_TIMEOUT)
+    return resultado
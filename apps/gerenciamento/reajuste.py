@@ -0,0 +1,319 @@
+"""
+Reajuste de preços de combustíveis e serviços em lote.
+
+Em vez de um POST, um `get` e um `save()` da linha inteira por preço, o
+reajuste recebe vários itens 'C:<pk>' / 'S:<pk>' de uma vez, valida todos
+juntos (nada é aplicado se algum for inválido) e grava numa única transação:
+um `in_bulk` e um `bulk_update` por modelo e um `bulk_create` no histórico de
+preços. Só as colunas de preço são escritas, então o reajuste não sobrescreve
+o saldo alterado por vendas concorrentes.
+
+`bulk_update` não dispara os sinais de `signals.py`, por isso o catálogo e as
+versões são invalidados aqui, uma vez por modelo alterado; o canal SSE
+(`eventos`) percebe a troca e envia um único evento com todos os preços.
+
+Reajustes com data futura são gravados como `ReajusteAgendado` e aplicados
+por `aplicar_vencidos()` (comando `aplicar_reajustes`). Cada lote é
+reivindicado com um UPDATE condicional `PENDENTE -> APLICADO` marcado com um
+identificador próprio, na mesma transação que grava os preços: dois
+agendadores rodando juntos nunca aplicam a mesma linha, e uma falha desfaz
+preços e reivindicação juntos.
+"""
+
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import catalogo, precos, versoes
+from .forms import ItemPrecoForm
+from .models import EstoqueGasolina, ReajusteAgendado, Servico
+from .operacoes import com_tentativas
+
+# Limite de itens por reajuste
+REAJUSTE_MAXIMO = 500
+
+# Reajustes agendados aplicados por transação
+LOTE_AGENDADOS = 500
+
+CENTAVO = Decimal('0.01')
+
+
+class ReajusteInvalido(ValueError):
+    """O reajuste não pôde ser aplicado; `erros` traz uma mensagem por problema."""
+
+    def __init__(self, erros):
+        self.erros = erros if isinstance(erros, list) else [erros]
+        super().__init__('; '.join(self.erros))
+
+
+def ler_vigencia(valor):
+    """Converte 'AAAA-MM-DDTHH:MM[:SS]' (sem fuso = fuso local) num datetime; vazio = None."""
+    if not valor:
+        return None
+    try:
+        vigente_em = parse_datetime(str(valor).strip())
+    except ValueError:
+        vigente_em = None
+    if vigente_em is None:
+        raise ReajusteInvalido(f"Data de vigência inválida: '{valor}'.")
+    if timezone.is_naive(vigente_em):
+        vigente_em = timezone.make_aware(vigente_em)
+    return vigente_em
+
+
+def ler_reajuste(corpo):
+    """
+    Converte o corpo JSON (lista ou objeto com a chave 'precos') em
+    `(itens, vigente_em)`; `vigente_em` vem da chave opcional 'vigente_em'.
+    """
+    if isinstance(corpo, bytes):
+        try:
+            corpo = corpo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ReajusteInvalido("O reajuste deve estar codificado em UTF-8.")
+    try:
+        dados = json.loads(corpo or 'null')
+    except json.JSONDecodeError as e:
+        raise ReajusteInvalido(f"JSON inválido: {e}")
+    itens = dados.get('precos') if isinstance(dados, dict) else dados
+    if not isinstance(itens, list):
+        raise ReajusteInvalido("Envie uma lista de preços ou um objeto com a chave 'precos'.")
+    vigente_em = ler_vigencia(dados.get('vigente_em')) if isinstance(dados, dict) else None
+    return itens, vigente_em
+
+
+def _validar(itens):
+    if not itens:
+        raise ReajusteInvalido("Nenhum preço informado.")
+    if len(itens) > REAJUSTE_MAXIMO:
+        raise ReajusteInvalido(f"O reajuste excede o limite de {REAJUSTE_MAXIMO} itens.")
+
+    novos, erros = {}, []
+    for indice, item in enumerate(itens, start=1):
+        if not isinstance(item, dict):
+            erros.append(f"Item {indice}: deve ser um objeto com item e preco.")
+            continue
+        form = ItemPrecoForm({'item': str(item.get('item', '')).strip(), 'preco': item.get('preco')})
+        if not form.is_valid():
+            detalhes = '; '.join(f"{campo}: {' '.join(msgs)}" for campo, msgs in form.errors.items())
+            erros.append(f"Item {indice}: {detalhes}")
+            continue
+        chave = form.cleaned_data['item']
+        if chave in novos:
+            erros.append(f"Item {indice}: '{chave}' repetido no reajuste.")
+            continue
+        novos[chave] = form.cleaned_data['preco'].quantize(CENTAVO)
+    if erros:
+        raise ReajusteInvalido(erros)
+    return novos
+
+
+def _separar(chaves):
+    pks = {'C': [], 'S': []}
+    for chave in chaves:
+        prefixo, pk = chave.split(':')
+        pks[prefixo].append(int(pk))
+    return pks
+
+
+def _ausentes(chaves, combustiveis, servicos):
+    return [
+        chave for chave in chaves
+        if int(chave[2:]) not in (combustiveis if chave[0] == 'C' else servicos)
+    ]
+
+
+def _mesmo_preco(valor, atual):
+    try:
+        return atual is not None and Decimal(str(valor).strip()).quantize(CENTAVO) == atual
+    except (InvalidOperation, ValueError):
+        return False
+
+
+def descartar_inalterados(itens, atuais):
+    """
+    Remove de `itens` os que trazem o preço atual (`atuais`: {'C:<pk>': preço}).
+
+    O formulário de edição vem preenchido com todos os preços; sem este filtro
+    um agendamento criaria uma linha por item e, ao vencer, devolveria os
+    preços antigos por cima de reajustes feitos nesse meio-tempo. Itens
+    inválidos são mantidos para a validação apontá-los.
+    """
+    return [
+        item for item in itens
+        if not (isinstance(item, dict)
+                and _mesmo_preco(item.get('preco'), atuais.get(str(item.get('item', '')).strip())))
+    ]
+
+
+def aplicar_reajuste(itens):
+    """
+    Valida e aplica um reajuste de preços.
+
+    Args:
+        itens: lista de `{'item': 'C:<pk>' | 'S:<pk>', 'preco': ...}`.
+
+    Returns:
+        dict com `alterados` (item, nome, preço anterior e novo) e a contagem
+        de `inalterados` (itens já com o preço informado).
+
+    Raises:
+        ReajusteInvalido: algum item é inválido ou não existe; nada é gravado.
+    """
+    novos = _validar(itens)
+    with transaction.atomic():
+        return _gravar(novos)
+
+
+def _gravar(novos, ignorar_ausentes=False):
+    """Grava `novos` ({item: preço}); deve rodar dentro de uma transação."""
+    pks = _separar(novos)
+    combustiveis = EstoqueGasolina.objects.in_bulk(pks['C']) if pks['C'] else {}
+    servicos = Servico.objects.in_bulk(pks['S']) if pks['S'] else {}
+
+    ausentes = _ausentes(novos, combustiveis, servicos)
+    if ausentes and not ignorar_ausentes:
+        raise ReajusteInvalido([f"Item '{chave}' não encontrado." for chave in ausentes])
+
+    agora = timezone.now()
+    alterados, combustiveis_alterados, servicos_alterados = [], [], []
+    for chave, preco in novos.items():
+        if chave in ausentes:
+            continue
+        if chave[0] == 'C':
+            objeto = combustiveis[int(chave[2:])]
+            anterior, nome = objeto.preco_atual_litro, objeto.get_tipo_display()
+            if anterior == preco:
+                continue
+            objeto.preco_atual_litro = preco
+            # bulk_update não aplica o auto_now
+            objeto.data_ultima_atualizacao = agora
+            combustiveis_alterados.append(objeto)
+        else:
+            objeto = servicos[int(chave[2:])]
+            anterior, nome = objeto.preco_unitario, objeto.nome
+            if anterior == preco:
+                continue
+            objeto.preco_unitario = preco
+            servicos_alterados.append(objeto)
+        alterados.append({'item': chave, 'nome': nome, 'preco_anterior': anterior, 'preco': preco})
+
+    if combustiveis_alterados:
+        EstoqueGasolina.objects.bulk_update(
+            combustiveis_alterados, ['preco_atual_litro', 'data_ultima_atualizacao']
+        )
+        catalogo.limpar('combustiveis')
+        versoes.invalidar('catalogo')
+        versoes.invalidar('estoque')
+    if servicos_alterados:
+        Servico.objects.bulk_update(servicos_alterados, ['preco_unitario'])
+        catalogo.limpar('servicos')
+        versoes.invalidar('servicos')
+    if alterados:
+        precos.registrar_precos([(a['item'], a['preco']) for a in alterados], vigente_desde=agora)
+
+    resultado = {'alterados': alterados, 'inalterados': len(novos) - len(alterados) - len(ausentes)}
+    if ignorar_ausentes:
+        resultado['ausentes'] = ausentes
+    return resultado
+
+
+def agendar_reajuste(itens, vigente_em):
+    """
+    Valida um reajuste e o agenda para `vigente_em` (que deve estar no futuro).
+
+    Itens que já estão com o preço informado não são agendados.
+
+    Returns:
+        lista dos `ReajusteAgendado` criados.
+
+    Raises:
+        ReajusteInvalido: algum item é inválido ou não existe, ou a data já passou.
+    """
+    if vigente_em <= timezone.now():
+        raise ReajusteInvalido("A data de vigência do agendamento deve estar no futuro.")
+    novos = _validar(itens)
+    pks = _separar(novos)
+    combustiveis = dict(
+        EstoqueGasolina.objects.filter(pk__in=pks['C']).values_list('pk', 'preco_atual_litro')
+    ) if pks['C'] else {}
+    servicos = dict(Servico.objects.filter(pk__in=pks['S']).values_list('pk', 'preco_unitario')) if pks['S'] else {}
+    ausentes = _ausentes(novos, combustiveis, servicos)
+    if ausentes:
+        raise ReajusteInvalido([f"Item '{chave}' não encontrado." for chave in ausentes])
+
+    # Agendar o preço atual só restauraria valores antigos quando vencesse
+    return ReajusteAgendado.objects.bulk_create([
+        ReajusteAgendado(item=chave, preco=preco, vigente_em=vigente_em)
+        for chave, preco in novos.items()
+        if preco != (combustiveis if chave[0] == 'C' else servicos)[int(chave[2:])]
+    ])
+
+
+def pendentes(limite=None):
+    """Reajustes agendados ainda não aplicados, do mais próximo ao mais distante."""
+    qs = ReajusteAgendado.objects.filter(situacao=ReajusteAgendado.PENDENTE).order_by('vigente_em', 'id')
+    return qs[:limite] if limite else qs
+
+
+@com_tentativas
+def _aplicar_lote_vencido(agora, tamanho):
+    """
+    Reivindica e aplica até `tamanho` reajustes vencidos.
+
+    Returns:
+        `(encontrados, aplicados)`: linhas vencidas vistas e efetivamente
+        aplicadas por este agendador (outro pode ter reivindicado parte delas).
+    """
+    lote = uuid.uuid4()
+    with transaction.atomic():
+        vencidos = list(
+            pendentes().filter(vigente_em__lte=agora).values_list('pk', flat=True)[:tamanho]
+        )
+        if not vencidos:
+            return 0, 0
+
+        pendentes().filter(pk__in=vencidos).update(situacao='APLICADO', lote=lote, aplicado_em=timezone.now())
+        reivindicados = list(
+            ReajusteAgendado.objects.filter(pk__in=vencidos, lote=lote)
+            .order_by('vigente_em', 'id')
+            .values_list('pk', 'item', 'preco')
+        )
+
+        # Vários agendamentos vencidos do mesmo item: vale o mais recente
+        ultimos, substituidos = {}, []
+        for pk, item, preco in reivindicados:
+            if item in ultimos:
+                substituidos.append(ultimos[item][0])
+            ultimos[item] = (pk, preco)
+
+        resultado = _gravar({item: preco for item, (_, preco) in ultimos.items()}, ignorar_ausentes=True)
+
+        if substituidos:
+            ReajusteAgendado.objects.filter(pk__in=substituidos).update(situacao='SUBSTITUIDO')
+        if resultado['ausentes']:
+            descartados = [ultimos[item][0] for item in resultado['ausentes']]
+            ReajusteAgendado.objects.filter(pk__in=descartados).update(situacao='DESCARTADO')
+
+    return len(vencidos), len(reivindicados) - len(substituidos) - len(resultado['ausentes'])
+
+
+def aplicar_vencidos(agora=None, tamanho=LOTE_AGENDADOS):
+    """
+    Aplica todos os reajustes agendados com `vigente_em <= agora`, em lotes
+    de `tamanho` linhas (uma transação por lote).
+
+    Returns:
+        quantidade de reajustes aplicados por esta chamada.
+    """
+    agora = agora or timezone.now()
+    aplicados = 0
+    while True:
+        encontrados, aplicados_lote = _aplicar_lote_vencido(agora, tamanho)
+        if not encontrados:
+            return aplicados
+        aplicados += aplicados_lote
@@ -0,0 +1,175 @@
+"""
+Manutenção incremental dos resumos por dia/hora (`ResumoMovimento`).
+
+`acumular()` recebe os `Movimento` recém-criados (ver `movimentos.registrar`)
+e soma suas contribuições nas linhas de resumo correspondentes com
+`UPDATE ... SET campo = campo + x`, criando a linha quando ela ainda não
+existe. Deve ser chamado na mesma transação que grava o ledger.
+
+`calcular_dos_ledgers()` refaz os mesmos totais direto de `RegistroCompra`,
+`RegistroVenda` e `RegistroServico` (incluindo os meses arquivados, ver
+`arquivo`); é usado pelo comando
+`reconstruir_resumos` para reconstruir e para conferir os resumos.
+"""
+
+import operator
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from . import arquivo
+from .models import ResumoMovimento
+
+CAMPOS = ('litros', 'quantidade', 'receita', 'custo', 'contagem')
+
+
+def inicio_periodo(data, granularidade):
+    """Início do dia/hora local que contém `data`."""
+    local = timezone.localtime(data)
+    if granularidade == 'DIA':
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return local.replace(minute=0, second=0, microsecond=0)
+
+
+def _valores(item, tipo, quantidade, total, contagem=1):
+    combustivel = item.startswith('C:')
+    return {
+        'litros': quantidade if combustivel else Decimal('0'),
+        'quantidade': Decimal('0') if combustivel else quantidade,
+        'receita': total if tipo == 'VENDA' else Decimal('0'),
+        'custo': total if tipo == 'COMPRA' else Decimal('0'),
+        'contagem': contagem,
+    }
+
+
+def _somar(totais, chave, valores):
+    atual = totais[chave]
+    for campo in CAMPOS:
+        atual[campo] = atual.get(campo, 0) + valores[campo]
+
+
+def acumular(movimentos):
+    """
+    Soma os `Movimento` informados nos resumos diários e horários.
+
+    Linhas do mesmo item e tipo que recebem o mesmo incremento (o dia e a
+    hora de uma única venda, por exemplo) são atualizadas por um só UPDATE.
+    """
+    totais = defaultdict(dict)
+    for m in movimentos:
+        valores = _valores(m.item, m.tipo, m.quantidade, m.total)
+        for granularidade, _ in ResumoMovimento.GRANULARIDADES:
+            chave = (granularidade, inicio_periodo(m.data, granularidade), m.item, m.tipo)
+            _somar(totais, chave, valores)
+
+    grupos = defaultdict(list)
+    for (granularidade, periodo, item, tipo), valores in totais.items():
+        grupos[(item, tipo, tuple(valores[campo] for campo in CAMPOS))].append((granularidade, periodo))
+
+    for (item, tipo, valores), periodos in grupos.items():
+        valores = dict(zip(CAMPOS, valores))
+        incremento = {campo: F(campo) + valores[campo] for campo in CAMPOS}
+        linhas = ResumoMovimento.objects.filter(
+            reduce(operator.or_, (Q(granularidade=g, periodo=p) for g, p in periodos)), item=item, tipo=tipo
+        )
+        if linhas.update(**incremento) == len(periodos):
+            continue
+        # Algum período ainda não tem linha (ex.: primeira venda da hora)
+        existentes = set(linhas.values_list('granularidade', 'periodo'))
+        for granularidade, periodo in periodos:
+            if (granularidade, periodo) in existentes:
+                continue
+            filtro = {'granularidade': granularidade, 'periodo': periodo, 'item': item, 'tipo': tipo}
+            try:
+                with transaction.atomic():
+                    ResumoMovimento.objects.create(**filtro, **valores)
+            except IntegrityError:
+                # Outra transação criou a linha entre o UPDATE e o INSERT.
+                ResumoMovimento.objects.filter(**filtro).update(**incremento)
+
+
+def totais_por_item(inicio, fim, granularidade='DIA'):
+    """
+    Soma os resumos de `[inicio, fim)` por item e tipo de transação.
+
+    Um mês lê ~30 linhas por item em vez de todos os registros do período.
+    """
+    return (
+        ResumoMovimento.objects
+        .filter(granularidade=granularidade, periodo__gte=inicio, periodo__lt=fim)
+        .values('item', 'tipo')
+        .annotate(**{campo: Sum(campo) for campo in CAMPOS})
+        .order_by('item', 'tipo')
+    )
+
+
+def calcular_dos_ledgers():
+    """
+    Agrega os ledgers brutos no mesmo formato dos resumos.
+
+    Returns:
+        dict {(granularidade, periodo, item, tipo): {campo: valor}}.
+    """
+    fuso = timezone.get_current_timezone()
+    fontes = [
+        ('compras', 'data_compra', 'combustivel_id', 'C', None, 'quantidade_litros', 'total_compra'),
+        ('vendas', 'data_venda', 'combustivel_id', 'C', None, 'quantidade_litros', 'total_venda'),
+        ('servicos', 'data', 'servico_id', 'S', 'tipo', 'quantidade', 'total'),
+    ]
+    tipos_fixos = {'compras': 'COMPRA', 'vendas': 'VENDA'}
+
+    totais = defaultdict(dict)
+    for ledger, campo_data, campo_item, prefixo, campo_tipo, campo_qtd, campo_total in fontes:
+        # Tabela principal e meses arquivados
+        for particao in arquivo.no_intervalo(ledger):
+            for granularidade, trunc in (('DIA', TruncDay), ('HORA', TruncHour)):
+                agrupamento = [campo_item] + ([campo_tipo] if campo_tipo else [])
+                linhas = (
+                    particao.queryset.order_by()
+                    .annotate(periodo=trunc(campo_data, tzinfo=fuso))
+                    .values('periodo', *agrupamento)
+                    .annotate(qtd=Sum(campo_qtd), total=Sum(campo_total), n=Count('id'))
+                )
+                for linha in linhas:
+                    item = f"{prefixo}:{linha[campo_item]}"
+                    tipo = linha[campo_tipo] if campo_tipo else tipos_fixos[ledger]
+                    valores = _valores(item, tipo, linha['qtd'], linha['total'], linha['n'])
+                    _somar(totais, (granularidade, linha['periodo'], item, tipo), valores)
+    return totais
+
+
+def reconstruir():
+    """Apaga e recria todos os resumos a partir dos ledgers. Retorna o número de linhas."""
+    totais = calcular_dos_ledgers()
+    with transaction.atomic():
+        ResumoMovimento.objects.all().delete()
+        ResumoMovimento.objects.bulk_create(
+            [
+                ResumoMovimento(granularidade=g, periodo=p, item=i, tipo=t, **valores)
+                for (g, p, i, t), valores in totais.items()
+            ],
+            batch_size=1000
+        )
+    return len(totais)
+
+
+def divergencias():
+    """Lista as diferenças entre os resumos gravados e os ledgers brutos."""
+    esperado = calcular_dos_ledgers()
+    gravado = {
+        (r.granularidade, r.periodo, r.item, r.tipo): {campo: getattr(r, campo) for campo in CAMPOS}
+        for r in ResumoMovimento.objects.iterator(chunk_size=2000)
+    }
+
+    diferencas = []
+    for chave in esperado.keys() | gravado.keys():
+        a = esperado.get(chave)
+        b = gravado.get(chave)
+        if a is None or b is None or any(Decimal(a[c]) != Decimal(b[c]) for c in CAMPOS):
+            diferencas.append((chave, a, b))
+    return diferencas
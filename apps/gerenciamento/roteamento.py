@@ -0,0 +1,139 @@
+"""
+Leituras das páginas públicas e relatórios numa réplica somente leitura.
+
+Com `DB_REPLICA_NAME` configurado, `settings.DATABASES['replica']` aponta
+para uma cópia do `db.sqlite3` mantida pelo comando `sincronizar_replica`
+(API de backup do SQLite). As views marcadas com `@ler_da_replica` fazem
+as consultas dos modelos de `gerenciamento` na réplica quando:
+
+- a requisição é GET/HEAD;
+- a última sincronização tem no máximo `DB_REPLICA_ATRASO_MAXIMO` segundos;
+- o navegador não fez um POST nos últimos `DB_REPLICA_ADERENCIA` segundos
+  (cookie gravado por `LeituraAposEscritaMiddleware`), para que quem acabou
+  de gravar leia o que gravou;
+- nada foi gravado antes na mesma requisição.
+
+Sessões e usuários (`auth`, `sessions`...) são sempre lidos do primário.
+Dados guardados em cache pelo token de `versoes` (catálogo, previsão) e o
+buffer de atividade são montados dentro de `primario()`: carregados da
+réplica, ficariam em cache com dados anteriores à versão.
+"""
+
+import functools
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+PRIMARIO = 'default'
+REPLICA = 'replica'
+APPS_NA_REPLICA = {'gerenciamento'}
+COOKIE_ADERENCIA = 'ler_primario'
+
+_destino = ContextVar('gerenciamento_destino_leitura', default=PRIMARIO)
+
+
+def _marcador():
+    return f"{settings.DATABASES[REPLICA]['NAME']}-sincronizado"
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+def atraso_replica():
+    """Segundos desde a última sincronização da réplica, ou None se nunca sincronizada."""
+    try:
+        return max(0.0, time.time() - os.stat(_marcador()).st_mtime)
+    except OSError:
+        return None
+
+
+def replica_disponivel():
+    if not replica_configurada():
+        return False
+    atraso = atraso_replica()
+    return atraso is not None and atraso <= settings.DB_REPLICA_ATRASO_MAXIMO
+
+
+def sincronizar_replica():
+    """Copia o primário para a réplica com a API de backup e registra o instante."""
+    origem = sqlite3.connect(settings.DATABASES[PRIMARIO]['NAME'])
+    destino = sqlite3.connect(settings.DATABASES[REPLICA]['NAME'], timeout=settings.DB_REPLICA_ATRASO_MAXIMO)
+    try:
+        # Um único passo: a cópia é um retrato consistente do primário
+        origem.backup(destino)
+    finally:
+        destino.close()
+        origem.close()
+    with open(_marcador(), 'w', encoding='utf-8') as marcador:
+        marcador.write(f"{time.time():.3f}\n")
+
+
+@contextmanager
+def primario():
+    """Força as leituras do bloco para o primário."""
+    token = _destino.set(PRIMARIO)
+    try:
+        yield
+    finally:
+        _destino.reset(token)
+
+
+def ler_da_replica(view):
+    """Marca uma view somente leitura cujas consultas podem ir para a réplica."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or COOKIE_ADERENCIA in request.COOKIES
+            or not replica_disponivel()
+        ):
+            return view(request, *args, **kwargs)
+        token = _destino.set(REPLICA)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _destino.reset(token)
+    return wrapper
+
+
+class LeituraNaReplica:
+    """Roteador de `DATABASE_ROUTERS`: escritas e migrações sempre no primário."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _destino.get() == REPLICA
+            and model._meta.app_label in APPS_NA_REPLICA
+            and not connections[PRIMARIO].in_atomic_block
+        ):
+            return REPLICA
+        return PRIMARIO
+
+    def db_for_write(self, model, **hints):
+        # Depois de gravar, o resto da requisição lê do primário
+        _destino.set(PRIMARIO)
+        return PRIMARIO
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica é uma cópia do primário, com o mesmo esquema
+        return db == PRIMARIO
+
+
+class LeituraAposEscritaMiddleware(MiddlewareMixin):
+    """Após um POST (ou outro método que grava), lê do primário por `DB_REPLICA_ADERENCIA` segundos."""
+
+    def process_response(self, request, response):
+        if replica_configurada() and request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                COOKIE_ADERENCIA, '1', max_age=settings.DB_REPLICA_ADERENCIA, httponly=True, samesite='Lax'
+            )
+        return response
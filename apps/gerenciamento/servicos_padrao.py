@@ -0,0 +1,67 @@
+"""
+Serviços padrão oferecidos pelo posto.
+
+`semear()` cria, com um único `bulk_create`, os serviços de `SERVICOS_PADRAO`
+que ainda não existem (comparando o nome sem diferenciar maiúsculas). É
+idempotente e não altera serviços já cadastrados, para não desfazer preços
+ajustados pela gerência. Roda após cada `migrate` (sinal `post_migrate`,
+registrado em `apps.py`, no banco migrado e com os modelos históricos) e pelo
+comando `semear_servicos`; as páginas não precisam mais conferir isso a cada
+acesso.
+"""
+
+from decimal import Decimal
+
+from django.apps import apps as apps_globais
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import catalogo, precos, versoes
+
+SERVICOS_PADRAO = [
+    ('Troca de Óleo', 'Troca de óleo padrão', Decimal('90.00')),
+    ('Balanceamento', 'Balanceamento de rodas e pneus', Decimal('50.00')),
+    ('Alinhamento', 'Alinhamento de direção do veículo', Decimal('80.00')),
+    ('Revisão Preventiva', 'Verificação e manutenção de itens de segurança', Decimal('150.00')),
+    ('Troca de Pneus', 'Remoção e instalação de pneus novos/usados', Decimal('40.00')),
+    ('Lavagem Completa', 'Lavagem externa, interna e cera', Decimal('65.00')),
+]
+
+
+def semear(apps=apps_globais, using=DEFAULT_DB_ALIAS):
+    """
+    Cria os serviços padrão que faltam no banco `using` e retorna os criados.
+
+    `apps` é o registro de modelos a usar: no `post_migrate` é o estado
+    histórico das migrações aplicadas, que pode ainda não ter a tabela ou a
+    coluna `categoria`; nesse caso nada é feito.
+    """
+    try:
+        Servico = apps.get_model('gerenciamento', 'Servico')
+        HistoricoPreco = apps.get_model('gerenciamento', 'HistoricoPreco')
+        Servico._meta.get_field('categoria')
+    except (LookupError, FieldDoesNotExist):
+        return []
+
+    with transaction.atomic(using=using):
+        existentes = {nome.lower() for nome in Servico.objects.using(using).values_list('nome', flat=True)}
+        novos = Servico.objects.using(using).bulk_create([
+            Servico(nome=nome, descricao=descricao, preco_unitario=preco)
+            for nome, descricao, preco in SERVICOS_PADRAO
+            if nome.lower() not in existentes
+        ])
+        if novos:
+            # bulk_create não dispara os sinais de histórico de preço e de invalidação
+            HistoricoPreco.objects.using(using).bulk_create([
+                HistoricoPreco(item=precos.item_servico(s), preco=s.preco_unitario, vigente_desde=s.criado_em)
+                for s in novos
+            ])
+    if novos and using == DEFAULT_DB_ALIAS:
+        # Catálogo e versões só descrevem o banco padrão
+        catalogo.limpar('servicos')
+        versoes.invalidar('servicos')
+    return novos
+
+
+def semear_apos_migrate(sender, apps=apps_globais, using=DEFAULT_DB_ALIAS, **kwargs):
+    semear(apps=apps, using=using)
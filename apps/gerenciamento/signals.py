@@ -0,0 +1,48 @@
+"""
+Sinais do app `gerenciamento`.
+
+Alterações feitas com `save()`/`delete()` (admin, edição de preços, cadastro
+de combustível) invalidam o catálogo e as versões públicas e registram
+mudanças de preço no histórico aqui. Atualizações em massa (`QuerySet.update`, `bulk_update`)
+não disparam sinais e chamam `versoes.invalidar` / `precos.registrar_precos`
+diretamente.
+"""
+
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import catalogo, precos, versoes
+from .models import EstoqueGasolina, Servico
+
+
+@receiver([post_save, post_delete], sender=EstoqueGasolina)
+def invalidar_estoque(sender, **kwargs):
+    catalogo.limpar('combustiveis')
+    versoes.invalidar('catalogo')
+    versoes.invalidar('estoque')
+
+
+def _registrar_se_mudou(item, preco):
+    preco = Decimal(str(preco))
+    if precos.preco_em(item) != preco:
+        precos.registrar_precos([(item, preco)])
+
+
+@receiver(post_save, sender=EstoqueGasolina)
+def registrar_preco_combustivel(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _registrar_se_mudou(precos.item_combustivel(instance), instance.preco_atual_litro)
+
+
+@receiver(post_save, sender=Servico)
+def registrar_preco_servico(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _registrar_se_mudou(precos.item_servico(instance), instance.preco_unitario)
+
+
+@receiver([post_save, post_delete], sender=Servico)
+def invalidar_servicos(sender, **kwargs):
+    catalogo.limpar('servicos')
+    versoes.invalidar('servicos')
@@ -16,6 +16,1156 @@ Exemplo mínimo:
 
 """
 
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, router, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    arquivo, benchmark, catalogo, custos, eventos, exportacao, metricas, movimentos, precos, previsao, resumos,
+    roteamento, servicos_padrao, versoes,
+)
+from .atividade import ORIGENS, Atividade
+from .custos import MotorCusto
+from .lote import processar_lote
+from .models import (
+    CamadaCusto, CustoCombustivel, EstoqueGasolina, HistoricoPreco, Movimento, ParticaoArquivo, ReajusteAgendado,
+    RegistroCompra, RegistroVenda, ResumoMovimento, Servico,
+)
+from .operacoes import EstoqueInsuficiente, registrar_movimentacao_combustivel, registrar_transacao_servico
+from .paginacao import CursorInvalido, codificar_cursor, pagina_particionada
+from .reajuste import ReajusteInvalido, agendar_reajuste, aplicar_reajuste, aplicar_vencidos
+
+# Cache em memória para os testes que dependem dos tokens de `versoes`: o
+# cache em arquivos do projeto é compartilhado com o servidor e entre execuções
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'testes'}}
+
+
+def descartar_trocas_agendadas():
+    """Cancela as trocas de token agrupadas pendentes e esquece os intervalos em curso."""
+    for agrupamento in versoes._agrupamentos.values():
+        if agrupamento.agendada is not None:
+            agrupamento.agendada.cancel()
+    versoes._agrupamentos.clear()
+
+
+class MovimentacaoConcorrenteTests(TransactionTestCase):
+    """Estresse do UPDATE condicional com vários frentistas vendendo ao mesmo tempo."""
+
+    FRENTISTAS = 8
+    VENDAS_POR_FRENTISTA = 25
+
+    def _disparar(self, combustivel, quantidade, registrar=registrar_movimentacao_combustivel):
+        sucessos = []
+        recusas = []
+        erros = []
+
+        def frentista():
+            try:
+                for _ in range(self.VENDAS_POR_FRENTISTA):
+                    try:
+                        registrar(combustivel.pk, 'SAIDA', quantidade)
+                        sucessos.append(1)
+                    except EstoqueInsuficiente:
+                        recusas.append(1)
+            except Exception as e:
+                erros.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=frentista) for _ in range(self.FRENTISTAS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(erros, [])
+        return len(sucessos), len(recusas)
+
+    def test_vendas_concorrentes_nao_perdem_litros(self):
+        combustivel = EstoqueGasolina.objects.create(
+            tipo='DIESEL_S10', quantidade_litros=Decimal('10000.00'), preco_atual_litro=Decimal('6.50')
+        )
+
+        sucessos, recusas = self._disparar(combustivel, Decimal('1.50'))
+
+        combustivel.refresh_from_db()
+        total = self.FRENTISTAS * self.VENDAS_POR_FRENTISTA
+        self.assertEqual(sucessos, total)
+        self.assertEqual(recusas, 0)
+        self.assertEqual(RegistroVenda.objects.count(), total)
+        self.assertEqual(combustivel.quantidade_litros, Decimal('10000.00') - Decimal('1.50') * total)
+
+    def test_vazao_comparada_a_leitura_modificacao_escrita(self):
+        """
+        Vendas/s do UPDATE condicional contra o antigo `get` + `save()`; os dois
+        gravam o mesmo custo, `Movimento` e resumos, então só a baixa do saldo muda.
+        """
+        atual = EstoqueGasolina.objects.create(
+            tipo='DIESEL_S10', quantidade_litros=Decimal('10000.00'), preco_atual_litro=Decimal('6.50')
+        )
+        antigo = EstoqueGasolina.objects.create(
+            tipo='DIESEL_COMUM', quantidade_litros=Decimal('10000.00'), preco_atual_litro=Decimal('6.00')
+        )
+
+        def leitura_modificacao_escrita(pk, movimento, quantidade):
+            # Caminho anterior das views: lê a linha, confere o saldo e salva a linha inteira
+            with transaction.atomic():
+                item = EstoqueGasolina.objects.select_for_update().get(pk=pk)
+                if item.quantidade_litros - quantidade < 0:
+                    raise EstoqueInsuficiente
+                motor = MotorCusto(item, item.quantidade_litros)
+                custo_medio, custo_fifo = motor.saida(quantidade)
+                registro = RegistroVenda.objects.create(
+                    combustivel=item, quantidade_litros=quantidade,
+                    preco_venda_litro=item.preco_atual_litro, total_venda=item.preco_atual_litro * quantidade,
+                    custo_medio_total=custo_medio, custo_fifo_total=custo_fifo
+                )
+                motor.salvar()
+                movimentos.registrar([registro])
+                item.quantidade_litros -= quantidade
+                item.save()
+
+        def vazao(combustivel, registrar):
+            inicio = time.perf_counter()
+            sucessos, _ = self._disparar(combustivel, Decimal('1.50'), registrar)
+            self.assertEqual(sucessos, self.FRENTISTAS * self.VENDAS_POR_FRENTISTA)
+            return sucessos / (time.perf_counter() - inicio)
+
+        # Rodadas alternadas; vale a melhor de cada caminho, a menos afetada por ruído da máquina
+        rodadas = [
+            (vazao(antigo, leitura_modificacao_escrita), vazao(atual, registrar_movimentacao_combustivel))
+            for _ in range(3)
+        ]
+        self.assertGreater(max(nova for _, nova in rodadas), max(antiga for antiga, _ in rodadas))
+
+    def test_token_do_estoque_trocado_no_maximo_uma_vez_por_intervalo(self):
+        combustivel = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('100.00'), preco_atual_litro=Decimal('5.00')
+        )
+        # Trocas agendadas por testes anteriores não podem cair no meio da contagem
+        descartar_trocas_agendadas()
+
+        with mock.patch.object(versoes, 'AGRUPAMENTO', 0.2), \
+                mock.patch.object(versoes, 'trocar', wraps=versoes.trocar) as trocar:
+            for _ in range(3):
+                registrar_movimentacao_combustivel(combustivel.pk, 'SAIDA', Decimal('1.00'))
+            # A primeira venda troca o token na hora; as seguintes esperam o fim do intervalo
+            self.assertEqual(trocar.call_count, 1)
+            time.sleep(0.4)
+            self.assertEqual(trocar.call_count, 2)
+
+    def test_saidas_concorrentes_nunca_deixam_saldo_negativo(self):
+        combustivel = EstoqueGasolina.objects.create(
+            tipo='ETANOL', quantidade_litros=Decimal('50.00'), preco_atual_litro=Decimal('4.50')
+        )
+
+        sucessos, recusas = self._disparar(combustivel, Decimal('1.00'))
+
+        combustivel.refresh_from_db()
+        self.assertEqual(sucessos, 50)
+        self.assertEqual(recusas, self.FRENTISTAS * self.VENDAS_POR_FRENTISTA - 50)
+        self.assertEqual(combustivel.quantidade_litros, Decimal('0.00'))
+        self.assertEqual(RegistroVenda.objects.count(), 50)
+
+
+class OrcamentoConsultasTests(TestCase):
+    """Cada view principal fica dentro do teto de consultas de `benchmark.ORCAMENTOS`."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'gerar_dados', vendas=500, compras=50, registros_servico=200,
+            servicos=30, funcionarios=10, stdout=StringIO()
+        )
+        cls.usuario = User.objects.create_superuser('gerente', 'gerente@exemplo.com', 'senha')
+
+    def test_views_dentro_do_orcamento_de_consultas(self):
+        self.client.force_login(self.usuario)
+
+        for resultado in benchmark.medir(self.client, repeticoes=1):
+            with self.subTest(view=resultado['view']):
+                self.assertEqual(resultado['status'], 200)
+                self.assertLessEqual(resultado['consultas'], resultado['orcamento_consultas'])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ReajustePrecosTests(TestCase):
+    """Reajuste em lote: tudo ou nada, com consultas fixas para qualquer quantidade de itens."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gasolina = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('100.00'), preco_atual_litro=Decimal('5.00')
+        )
+        cls.diesel = EstoqueGasolina.objects.create(
+            tipo='DIESEL_COMUM', quantidade_litros=Decimal('100.00'), preco_atual_litro=Decimal('6.00')
+        )
+        cls.lavagem = Servico.objects.create(nome='Lavagem Teste', preco_unitario=Decimal('30.00'))
+
+    def test_aplica_varios_precos_de_uma_vez(self):
+        historico = HistoricoPreco.objects.count()
+        itens = [
+            {'item': f'C:{self.gasolina.pk}', 'preco': '5.49'},
+            {'item': f'C:{self.diesel.pk}', 'preco': '6.00'},
+            {'item': f'S:{self.lavagem.pk}', 'preco': '35'},
+        ]
+
+        # in_bulk + bulk_update por modelo, um bulk_create no histórico e o savepoint
+        with self.assertNumQueries(7):
+            resultado = aplicar_reajuste(itens)
+
+        self.assertEqual([a['item'] for a in resultado['alterados']], [f'C:{self.gasolina.pk}', f'S:{self.lavagem.pk}'])
+        self.assertEqual(resultado['inalterados'], 1)
+        self.gasolina.refresh_from_db()
+        self.lavagem.refresh_from_db()
+        self.assertEqual(self.gasolina.preco_atual_litro, Decimal('5.49'))
+        self.assertEqual(self.lavagem.preco_unitario, Decimal('35.00'))
+        self.assertEqual(HistoricoPreco.objects.count(), historico + 2)
+        self.assertEqual(catalogo.servico(self.lavagem.pk).preco_unitario, Decimal('35.00'))
+
+    def test_item_invalido_cancela_o_reajuste_inteiro(self):
+        with self.assertRaises(ReajusteInvalido) as contexto:
+            aplicar_reajuste([
+                {'item': f'C:{self.gasolina.pk}', 'preco': '9.99'},
+                {'item': 'S:999999', 'preco': '10'},
+                {'item': 'X:1', 'preco': '-1'},
+            ])
+
+        self.assertEqual(len(contexto.exception.erros), 1)
+        self.gasolina.refresh_from_db()
+        self.assertEqual(self.gasolina.preco_atual_litro, Decimal('5.00'))
+
+    def test_reajustes_agendados_sao_aplicados_uma_unica_vez(self):
+        agora = timezone.now()
+        agendar_reajuste([{'item': f'C:{self.gasolina.pk}', 'preco': '5.10'}], agora + timedelta(hours=1))
+        agendar_reajuste([
+            {'item': f'C:{self.gasolina.pk}', 'preco': '5.20'},
+            {'item': f'S:{self.lavagem.pk}', 'preco': '40'},
+        ], agora + timedelta(hours=2))
+        agendar_reajuste([{'item': f'C:{self.diesel.pk}', 'preco': '7.00'}], agora + timedelta(days=1))
+
+        self.assertEqual(aplicar_vencidos(agora), 0)
+        self.assertEqual(aplicar_vencidos(agora + timedelta(hours=3), tamanho=2), 2)
+        self.assertEqual(aplicar_vencidos(agora + timedelta(hours=3)), 0)
+
+        self.gasolina.refresh_from_db()
+        self.diesel.refresh_from_db()
+        self.lavagem.refresh_from_db()
+        self.assertEqual(self.gasolina.preco_atual_litro, Decimal('5.20'))
+        self.assertEqual(self.diesel.preco_atual_litro, Decimal('6.00'))
+        self.assertEqual(self.lavagem.preco_unitario, Decimal('40.00'))
+        self.assertEqual(
+            sorted(ReajusteAgendado.objects.values_list('situacao', flat=True)),
+            ['APLICADO', 'APLICADO', 'PENDENTE', 'SUBSTITUIDO']
+        )
+
+    def test_formulario_exige_funcionario(self):
+        url = reverse('edit_combustiveis')
+        dados = {f'preco-C:{self.gasolina.pk}': '9.99'}
+
+        self.assertRedirects(self.client.post(url, dados), f"{reverse('login')}?next={url}", fetch_redirect_response=False)
+        self.client.force_login(User.objects.create_user('sem_papel', 's@exemplo.com', 'senha'))
+        self.assertEqual(self.client.post(url, dados).status_code, 302)
+        self.gasolina.refresh_from_db()
+        self.assertEqual(self.gasolina.preco_atual_litro, Decimal('5.00'))
+
+    def test_formulario_agenda_so_os_precos_alterados(self):
+        self.client.force_login(User.objects.create_superuser('gerente_reajuste', 'g@exemplo.com', 'senha'))
+        # O formulário chega com todos os preços preenchidos; só a gasolina mudou
+        vigente_em = timezone.localtime(timezone.now() + timedelta(hours=1))
+        dados = {
+            f'preco-C:{self.gasolina.pk}': '5.50',
+            f'preco-C:{self.diesel.pk}': '6.00',
+            f'preco-S:{self.lavagem.pk}': '30.00',
+            'vigente_em': f'{vigente_em:%Y-%m-%dT%H:%M}',
+        }
+        resp = self.client.post(reverse('edit_combustiveis'), dados)
+
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(list(ReajusteAgendado.objects.values_list('item', flat=True)), [f'C:{self.gasolina.pk}'])
+
+        # Um reajuste imediato no meio-tempo não é desfeito quando o agendamento vence
+        aplicar_reajuste([{'item': f'C:{self.diesel.pk}', 'preco': '6.40'}])
+        aplicar_vencidos(timezone.now() + timedelta(hours=2))
+        self.diesel.refresh_from_db()
+        self.assertEqual(self.diesel.preco_atual_litro, Decimal('6.40'))
+
+        # Nada alterado: nenhum agendamento novo
+        dados[f'preco-C:{self.diesel.pk}'] = '6.40'
+        self.client.post(reverse('edit_combustiveis'), dados)
+        self.assertEqual(ReajusteAgendado.objects.count(), 1)
+
+
+class CustoCombustivelTests(TestCase):
+    """CMV pelo custo médio ponderado e por PEPS com valores conhecidos."""
+
+    def setUp(self):
+        self.combustivel = EstoqueGasolina.objects.create(
+            tipo='GAS_ADITIVADA', quantidade_litros=Decimal('0'), preco_atual_litro=Decimal('6.00')
+        )
+
+    def test_motor_calcula_custo_medio_e_peps(self):
+        inicio = timezone.now()
+        motor = MotorCusto(self.combustivel, Decimal('0'))
+        motor.entrada(Decimal('100'), Decimal('5.00'), inicio)
+        motor.entrada(Decimal('100'), Decimal('7.00'), inicio + timedelta(minutes=1))
+
+        # Médio: 150 L a R$ 6,00; PEPS: 100 L a R$ 5,00 + 50 L a R$ 7,00
+        self.assertEqual(motor.saida(Decimal('150')), (Decimal('900.00'), Decimal('850.00')))
+        motor.salvar()
+
+        estado = CustoCombustivel.objects.get(combustivel=self.combustivel)
+        self.assertEqual(estado.litros, Decimal('50'))
+        self.assertEqual(estado.custo_medio_litro, Decimal('6.0000'))
+        self.assertEqual(
+            list(CamadaCusto.objects.filter(combustivel=self.combustivel).order_by('data')
+                 .values_list('litros_restantes', 'custo_litro')),
+            [(Decimal('0'), Decimal('5.00')), (Decimal('50'), Decimal('7.00'))]
+        )
+
+        # O estado salvo é retomado por um novo motor
+        motor = MotorCusto(self.combustivel, Decimal('50'))
+        self.assertEqual(motor.saida(Decimal('50')), (Decimal('300.00'), Decimal('350.00')))
+
+    def test_saldo_sem_compra_vira_camada_pelo_preco_atual(self):
+        motor = MotorCusto(self.combustivel, Decimal('20'))
+        motor.entrada(Decimal('10'), Decimal('9.00'))
+
+        # Médio: (20 × 6 + 10 × 9) / 30 = 7,00; PEPS: 20 L a R$ 6,00 + 5 L a R$ 9,00
+        self.assertEqual(motor.saida(Decimal('25')), (Decimal('175.00'), Decimal('165.00')))
+
+    def test_reconstruir_reprocessa_o_ledger_em_ordem(self):
+        inicio = timezone.now() - timedelta(days=1)
+        for minutos, litros, preco in ((0, '100', '5.00'), (10, '100', '7.00')):
+            compra = RegistroCompra.objects.create(
+                combustivel=self.combustivel, quantidade_litros=Decimal(litros),
+                preco_compra_litro=Decimal(preco), total_compra=Decimal(litros) * Decimal(preco)
+            )
+            RegistroCompra.objects.filter(pk=compra.pk).update(data_compra=inicio + timedelta(minutes=minutos))
+        vendas = []
+        for minutos, litros in ((5, '50'), (20, '120')):
+            venda = RegistroVenda.objects.create(
+                combustivel=self.combustivel, quantidade_litros=Decimal(litros),
+                preco_venda_litro=Decimal('8.00'), total_venda=Decimal(litros) * 8
+            )
+            RegistroVenda.objects.filter(pk=venda.pk).update(data_venda=inicio + timedelta(minutes=minutos))
+            vendas.append(venda)
+        EstoqueGasolina.objects.filter(pk=self.combustivel.pk).update(quantidade_litros=Decimal('30'))
+
+        self.assertEqual(custos.reconstruir(), 2)
+
+        for venda in vendas:
+            venda.refresh_from_db()
+        # 1ª venda: só a camada de R$ 5,00. 2ª: médio (50 × 5 + 100 × 7) / 150 = 6,3333;
+        # PEPS: 50 L a R$ 5,00 + 70 L a R$ 7,00
+        self.assertEqual((vendas[0].custo_medio_total, vendas[0].custo_fifo_total), (Decimal('250.00'), Decimal('250.00')))
+        self.assertEqual((vendas[1].custo_medio_total, vendas[1].custo_fifo_total), (Decimal('760.00'), Decimal('740.00')))
+        estado = CustoCombustivel.objects.get(combustivel=self.combustivel)
+        self.assertEqual(estado.litros, Decimal('30'))
+
+    def test_lote_grava_o_cmv_de_cada_venda(self):
+        EstoqueGasolina.objects.filter(pk=self.combustivel.pk).update(quantidade_litros=Decimal('40'))
+
+        resultado = processar_lote([
+            {'combustivel': 'GAS_ADITIVADA', 'movimento': 'SAIDA', 'quantidade': '30'},
+            {'combustivel': 'GAS_ADITIVADA', 'movimento': 'SAIDA', 'quantidade': '30'},
+            {'combustivel': 'GAS_ADITIVADA', 'movimento': 'SAIDA', 'quantidade': '10'},
+        ])
+
+        self.assertEqual(resultado['aplicadas'], 2)
+        self.assertEqual(
+            sorted(RegistroVenda.objects.filter(combustivel=self.combustivel).values_list('custo_medio_total', 'custo_fifo_total')),
+            [(Decimal('60.00'), Decimal('60.00')), (Decimal('180.00'), Decimal('180.00'))]
+        )
+        self.assertEqual(CustoCombustivel.objects.get(combustivel=self.combustivel).litros, Decimal('0'))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CatalogoValidadeTests(TransactionTestCase):
+    """Fora de transação o catálogo vem da memória, mas só por `VALIDADE` segundos e até a versão mudar."""
+
+    def test_copia_expira_sem_troca_de_token(self):
+        servico = Servico.objects.create(nome='Calibragem', preco_unitario=Decimal('5.00'))
+        self.assertEqual(catalogo.servico(servico.pk).preco_unitario, Decimal('5.00'))
+
+        # Alteração que este processo não viu (ex.: feita por outro, com cache local)
+        Servico.objects.filter(pk=servico.pk).update(preco_unitario=Decimal('7.00'))
+        self.assertEqual(catalogo.servico(servico.pk).preco_unitario, Decimal('5.00'))
+
+        with mock.patch.object(catalogo, 'VALIDADE', 0):
+            self.assertEqual(catalogo.servico(servico.pk).preco_unitario, Decimal('7.00'))
+
+    def test_venda_recarrega_so_os_saldos(self):
+        combustivel = EstoqueGasolina.objects.create(
+            tipo='ETANOL', quantidade_litros=Decimal('100.00'), preco_atual_litro=Decimal('4.50')
+        )
+        catalogo.limpar('combustiveis')
+        self.assertEqual(catalogo.combustivel(combustivel.pk).quantidade_litros, Decimal('100.00'))
+        instancia = catalogo._memo['combustiveis'][1][0]
+
+        descartar_trocas_agendadas()
+        with mock.patch.object(versoes, 'AGRUPAMENTO', 0):
+            registrar_movimentacao_combustivel(combustivel.pk, 'SAIDA', Decimal('10'))
+
+        # Uma consulta de saldos; o catálogo (tipos e preços) não é relido
+        with CaptureQueriesContext(connection) as consultas:
+            atual = catalogo.combustivel(combustivel.pk)
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('preco_atual_litro', consultas[0]['sql'])
+        self.assertEqual(atual.quantidade_litros, Decimal('90.00'))
+        self.assertIs(catalogo._memo['combustiveis'][1][0], instancia)
+        self.assertEqual(instancia.quantidade_litros, Decimal('100.00'))
+
+        # Um reajuste troca o catálogo
+        aplicar_reajuste([{'item': f'C:{combustivel.pk}', 'preco': '4.90'}])
+        self.assertEqual(catalogo.combustivel(combustivel.pk).preco_atual_litro, Decimal('4.90'))
+        self.assertEqual(catalogo.combustivel(combustivel.pk).quantidade_litros, Decimal('90.00'))
+
+
+class AtividadeBufferTests(TestCase):
+    """Buffer de últimas transações: adota só as próprias gravações, senão semeia de novo."""
+
+    def _movimento(self, registro_id):
+        return Movimento.objects.create(
+            origem='VENDA', registro_id=registro_id, item='C:1', item_label='Gasolina', tipo='VENDA',
+            data=timezone.now(), quantidade=Decimal('1'), preco_unitario=Decimal('6'), total=Decimal('6')
+        )
+
+    def test_gravacao_propria_mantem_o_buffer_em_dia(self):
+        buffer = Atividade()
+        buffer.semear()
+
+        buffer.registrar_confirmados([self._movimento(1)])
+
+        # Só o MAX(id) que confere se outro processo gravou
+        with self.assertNumQueries(1):
+            self.assertEqual([t.registro_id for t in buffer.ultimas('VENDA')], [1])
+
+    def test_gravacao_de_outro_processo_no_meio_forca_nova_semeadura(self):
+        # Dois processos com o mesmo banco: cada um grava uma venda
+        processo, outro = Atividade(), Atividade()
+        processo.semear()
+        outro.semear()
+
+        outro.registrar_confirmados([self._movimento(1)])
+        processo.registrar_confirmados([self._movimento(2)])
+
+        semeadura = 2 + len(ORIGENS)
+        with self.assertNumQueries(semeadura):
+            self.assertEqual([t.registro_id for t in processo.ultimas('VENDA')], [2, 1])
+        with self.assertNumQueries(semeadura):
+            self.assertEqual([t.registro_id for t in outro.ultimas('VENDA')], [2, 1])
+        with self.assertNumQueries(1):
+            outro.ultimas('VENDA')
+
+    def test_gravacao_nunca_vista_pelo_processo_e_percebida_pelo_banco(self):
+        buffer = Atividade()
+        buffer.semear()
+        self._movimento(1)
+
+        self.assertEqual([t.registro_id for t in buffer.ultimas('VENDA')], [1])
+
+
+@override_settings(METRICAS_TOKEN='segredo-do-coletor')
+class MetricasTests(TestCase):
+    """Middleware de métricas e o endpoint do Prometheus."""
+
+    def _total(self, serie, rotulos):
+        return serie.series[rotulos][2] if rotulos in serie.series else 0
+
+    def test_endpoint_exige_token_ou_superusuario(self):
+        url = reverse('metricas')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer errado').status_code, 403)
+
+        resp = self.client.get(url, HTTP_AUTHORIZATION='Bearer segredo-do-coletor')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE gerenciamento_requisicao_duracao_segundos histogram', resp.content.decode())
+
+        self.client.force_login(User.objects.create_superuser('admin_metricas', 'a@exemplo.com', 'senha'))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_middleware_mede_consultas_e_agrupa_metodos_desconhecidos(self):
+        rotulos = ('metricas', 'GET')
+        antes = self._total(metricas.consultas, rotulos)
+        self.client.force_login(User.objects.create_superuser('admin_metricas', 'a@exemplo.com', 'senha'))
+
+        self.client.get(reverse('metricas'))
+
+        self.assertEqual(self._total(metricas.consultas, rotulos), antes + 1)
+        # Sessão e usuário vêm do banco: a requisição registrou consultas
+        self.assertGreater(metricas.consultas.series[rotulos][1], 0)
+
+        for metodo in ('BREW', 'PROPFIND'):
+            self.client.generic(metodo, reverse('metricas'))
+        self.assertNotIn(('metricas', 'BREW'), metricas.latencia.series)
+        self.assertGreaterEqual(self._total(metricas.latencia, ('metricas', 'OTHER')), 2)
+        self.assertIn('view="metricas",metodo="OTHER"', metricas.texto())
+
+    async def test_consultas_medidas_sob_asgi(self):
+        rotulos = ('metricas', 'GET')
+        antes = self._total(metricas.consultas, rotulos)
+        soma_antes = metricas.consultas.series[rotulos][1] if rotulos in metricas.consultas.series else 0
+        usuario = await sync_to_async(User.objects.create_superuser)('admin_asgi', 'a@exemplo.com', 'senha')
+        await self.async_client.aforce_login(usuario)
+
+        resposta = await self.async_client.get(reverse('metricas'))
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(self._total(metricas.consultas, rotulos), antes + 1)
+        # Sessão e usuário da view síncrona, lidos na thread do `sync_to_async`
+        self.assertGreater(metricas.consultas.series[rotulos][1], soma_antes)
+
+
+class HistoricoPrecosTests(TestCase):
+    """Preço vigente num instante: consulta por índice, `LinhaDoTempo` (bisect) e a view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.inicio = timezone.now() - timedelta(days=10)
+        cls.item = 'C:999'
+        HistoricoPreco.objects.bulk_create([
+            HistoricoPreco(item=cls.item, preco=Decimal(preco), vigente_desde=cls.inicio + timedelta(days=dias))
+            for dias, preco in ((0, '5.00'), (3, '6.00'), (3, '6.10'), (7, '7.00'))
+        ])
+
+    def test_linha_do_tempo_responde_como_a_consulta(self):
+        linha = precos.LinhaDoTempo(self.item)
+        esperados = [
+            (self.inicio - timedelta(seconds=1), None),
+            (self.inicio, Decimal('5.00')),
+            (self.inicio + timedelta(days=2), Decimal('5.00')),
+            # Duas vigências no mesmo instante: vale a registrada por último
+            (self.inicio + timedelta(days=3), Decimal('6.10')),
+            (self.inicio + timedelta(days=7), Decimal('7.00')),
+            (self.inicio + timedelta(days=30), Decimal('7.00')),
+        ]
+        with self.assertNumQueries(0):
+            self.assertEqual([linha.preco_em(instante) for instante, _ in esperados], [p for _, p in esperados])
+        for instante, preco in esperados:
+            self.assertEqual(precos.preco_em(self.item, instante), preco)
+
+    def test_view_rejeita_data_invalida(self):
+        self.client.force_login(User.objects.create_superuser('gerente_precos', 'g@exemplo.com', 'senha'))
+        url = reverse('historico_precos')
+
+        self.assertEqual(self.client.get(url, {'item': self.item, 'em': 'ontem'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'item': self.item, 'inicio': '2024-13-01'}).status_code, 400)
+        resposta = self.client.get(url, {'item': self.item, 'em': (self.inicio + timedelta(days=1)).isoformat()})
+        self.assertEqual(resposta.json()['preco'], '5.00')
+
+    def test_primeira_vigencia_cobre_os_movimentos_anteriores(self):
+        combustivel = EstoqueGasolina.objects.create(
+            tipo='DIESEL', quantidade_litros=Decimal('100'), preco_atual_litro=Decimal('5.50')
+        )
+        item = f'C:{combustivel.pk}'
+        antes = combustivel.data_ultima_atualizacao - timedelta(days=5)
+        Movimento.objects.create(
+            origem='VENDA', registro_id=1, item=item, item_label='Diesel', tipo='VENDA',
+            data=antes, quantidade=Decimal('1'), preco_unitario=Decimal('5.50'), total=Decimal('5.50')
+        )
+        HistoricoPreco.objects.filter(item=item).delete()
+        migracao = import_module('apps.gerenciamento.migrations.0007_historicopreco')
+
+        migracao.registrar_precos_atuais(django_apps, None)
+
+        self.assertEqual(precos.preco_em(item, antes), Decimal('5.50'))
+        self.assertEqual(HistoricoPreco.objects.filter(item=item, vigente_desde=antes).count(), 1)
+
+
+class ResumosIncrementaisTests(TestCase):
+    """Os resumos somados a cada gravação batem com a agregação completa dos ledgers."""
+
+    def test_verificar_confere_os_resumos_incrementais(self):
+        combustivel = EstoqueGasolina.objects.create(
+            tipo='ETANOL', quantidade_litros=Decimal('500'), preco_atual_litro=Decimal('4.20')
+        )
+        servico = Servico.objects.create(nome='Polimento', preco_unitario=Decimal('120.00'))
+        for movimento, litros in (('SAIDA', '12.5'), ('ENTRADA', '100'), ('SAIDA', '30')):
+            registrar_movimentacao_combustivel(combustivel.pk, movimento, Decimal(litros))
+        registrar_transacao_servico(servico.pk, 'VENDA', Decimal('2'))
+        saida = StringIO()
+
+        call_command('reconstruir_resumos', verificar=True, stdout=saida)
+        self.assertIn('Resumos conferem', saida.getvalue())
+        self.assertTrue(ResumoMovimento.objects.filter(item=f'C:{combustivel.pk}', tipo='VENDA', litros=Decimal('42.50')).exists())
+
+        # Um resumo adulterado é apontado; reconstruir o corrige
+        ResumoMovimento.objects.filter(item=f'S:{servico.pk}').update(receita=Decimal('1.00'))
+        with self.assertRaisesMessage(CommandError, 'divergem'):
+            call_command('reconstruir_resumos', verificar=True, stdout=StringIO(), stderr=StringIO())
+        call_command('reconstruir_resumos', stdout=StringIO())
+        call_command('reconstruir_resumos', verificar=True, stdout=StringIO())
+
+
+class ExportacaoTests(TestCase):
+    """A exportação em streaming traz exatamente os registros do histórico filtrado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gasolina = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('1000'), preco_atual_litro=Decimal('6.00')
+        )
+        cls.etanol = EstoqueGasolina.objects.create(
+            tipo='ETANOL', quantidade_litros=Decimal('1000'), preco_atual_litro=Decimal('4.00')
+        )
+        agora = timezone.now()
+        for dias, combustivel in ((0, cls.gasolina), (1, cls.etanol), (2, cls.gasolina), (20, cls.gasolina), (21, cls.etanol)):
+            venda = RegistroVenda.objects.create(
+                combustivel=combustivel, quantidade_litros=Decimal('10'),
+                preco_venda_litro=combustivel.preco_atual_litro, total_venda=combustivel.preco_atual_litro * 10
+            )
+            RegistroVenda.objects.filter(pk=venda.pk).update(data_venda=agora - timedelta(days=dias))
+        cls.usuario = User.objects.create_superuser('gerente_exporta', 'g@exemplo.com', 'senha')
+
+    def _exportar(self, formato, **filtros):
+        resposta = self.client.get(reverse('financeiro_exportar', args=['vendas']), {'formato': formato, **filtros})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        return b''.join(resposta.streaming_content).decode().splitlines()
+
+    def test_csv_e_jsonl_tem_as_linhas_do_historico_filtrado(self):
+        self.client.force_login(self.usuario)
+        desde = timezone.localdate() - timedelta(days=7)
+        casos = [
+            ({}, RegistroVenda.objects.all()),
+            ({'combustivel': self.gasolina.pk}, RegistroVenda.objects.filter(combustivel=self.gasolina)),
+            (
+                {'combustivel': self.gasolina.pk, 'data_inicio': desde.isoformat()},
+                RegistroVenda.objects.filter(combustivel=self.gasolina, data_venda__date__gte=desde),
+            ),
+        ]
+        for filtros, esperado in casos:
+            with self.subTest(filtros=filtros):
+                ids = sorted(esperado.values_list('pk', flat=True))
+                linhas_csv = self._exportar('csv', **filtros)
+                self.assertEqual(linhas_csv[0].split(','), [nome for nome, _ in exportacao.COLUNAS['vendas']])
+                self.assertEqual(sorted(int(linha.split(',')[0]) for linha in linhas_csv[1:]), ids)
+
+                linhas_jsonl = self._exportar('jsonl', **filtros)
+                self.assertEqual(sorted(int(json.loads(linha)['id']) for linha in linhas_jsonl), ids)
+
+
+class EventosEstoqueTests(TestCase):
+    """Formato SSE do canal de preços e estoque."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gasolina = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('250.50'), preco_atual_litro=Decimal('6.19')
+        )
+
+    def _evento(self, mensagem):
+        evento, dados, vazio = mensagem.split('\n', 2)
+        self.assertEqual(evento, 'event: estoque')
+        self.assertEqual(vazio, '\n')
+        self.assertTrue(dados.startswith('data: '))
+        return json.loads(dados[len('data: '):])
+
+    def test_sem_asgi_envia_o_estado_atual_e_pede_reconexao(self):
+        resposta = self.client.get(reverse('estoque_eventos'))
+
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream')
+        self.assertEqual(resposta['Cache-Control'], 'no-cache')
+        corpo = resposta.content.decode()
+        retry, mensagem = corpo.split('\n\n', 1)
+        self.assertEqual(retry, f'retry: {eventos.RETRY_MS}')
+        dados = self._evento(mensagem)
+        combustivel = next(c for c in dados['combustiveis'] if c['id'] == self.gasolina.pk)
+        self.assertEqual(
+            (combustivel['tipo'], combustivel['quantidade_litros'], combustivel['preco_atual_litro']),
+            ('GAS_COMUM', '250.50', '6.19')
+        )
+        self.assertIn('servicos', dados)
+
+    async def test_assinante_recebe_o_estado_e_so_o_mais_recente_quando_lento(self):
+        difusor = eventos.Difusor()
+        fila = await difusor.assinar()
+        difusor.tarefa.cancel()
+
+        fluxo = eventos.fluxo(fila)
+        self.assertEqual(await anext(fluxo), f'retry: {eventos.RETRY_MS}\n\n')
+        dados = self._evento(await anext(fluxo))
+        self.assertEqual([c['tipo'] for c in dados['combustiveis']], ['GAS_COMUM'])
+
+        # Cliente lento: a fila guarda só as `FILA_MAXIMA` mensagens mais novas
+        for numero in range(eventos.FILA_MAXIMA + 2):
+            difusor._publicar(eventos.formatar_evento({'n': numero}))
+        recebidas = [self._evento(fila.get_nowait())['n'] for _ in range(fila.qsize())]
+        self.assertEqual(recebidas, list(range(2, eventos.FILA_MAXIMA + 2)))
+
+        # Conexão fechada: `fluxo` cancela a assinatura no difusor do processo
+        with mock.patch.object(eventos, 'difusor', difusor):
+            await fluxo.aclose()
+        self.assertEqual(difusor.assinantes, set())
+
+
+class PrevisaoEsgotamentoTests(TestCase):
+    """Previsão sobre uma demanda sintética constante de 2 L/h nas últimas duas semanas."""
+
+    def test_demanda_constante_projeta_o_esgotamento(self):
+        # Meia hora: cada venda cai numa hora diferente e todas antes de `agora`
+        agora = timezone.now().replace(minute=30, second=0, microsecond=0)
+        tanques = {
+            'GAS_COMUM': Decimal('101'),     # ~50 h: reposição
+            'ETANOL': Decimal('30'),         # ~15 h: crítico
+            'DIESEL_S10': Decimal('5000'),   # ~104 dias: além do horizonte
+            'GAS_ADITIVADA': Decimal('10'),  # sem vendas: sem previsão
+        }
+        combustiveis = {
+            tipo: EstoqueGasolina.objects.create(tipo=tipo, quantidade_litros=saldo, preco_atual_litro=Decimal('5'))
+            for tipo, saldo in tanques.items()
+        }
+        vendas = RegistroVenda.objects.bulk_create([
+            RegistroVenda(
+                combustivel=combustiveis[tipo], quantidade_litros=Decimal('2'),
+                preco_venda_litro=Decimal('5'), total_venda=Decimal('10')
+            )
+            for tipo in ('GAS_COMUM', 'ETANOL', 'DIESEL_S10')
+            for _ in range(14 * 24)
+        ])
+        for posicao, venda in enumerate(vendas):
+            venda.data_venda = agora - timedelta(minutes=1, hours=posicao % (14 * 24))
+        # bulk_update não passa pelo auto_now_add
+        RegistroVenda.objects.bulk_update(vendas, ['data_venda'], batch_size=500)
+
+        resultado = previsao.calcular(agora)
+        por_tipo = {tipo: resultado[c.pk] for tipo, c in combustiveis.items()}
+
+        for tipo in ('GAS_COMUM', 'ETANOL', 'DIESEL_S10'):
+            self.assertAlmostEqual(por_tipo[tipo]['consumo_diario'], 48.0)
+        # O perfil semanal tem 52 ou 53 ocorrências por hora da semana: ±1 h
+        self.assertAlmostEqual(por_tipo['GAS_COMUM']['horas_ate_vazio'], 50, delta=1)
+        self.assertEqual(por_tipo['GAS_COMUM']['nivel'], 'reposicao')
+        self.assertAlmostEqual(por_tipo['ETANOL']['horas_ate_vazio'], 15, delta=1)
+        self.assertEqual(por_tipo['ETANOL']['nivel'], 'critico')
+        self.assertEqual(
+            por_tipo['ETANOL']['esgota_em'], agora + timedelta(hours=por_tipo['ETANOL']['horas_ate_vazio'])
+        )
+        self.assertEqual((por_tipo['DIESEL_S10']['horas_ate_vazio'], por_tipo['DIESEL_S10']['nivel']), (None, None))
+        self.assertEqual(por_tipo['GAS_ADITIVADA'], {
+            'consumo_diario': 0.0, 'horas_ate_vazio': None, 'esgota_em': None, 'nivel': None,
+        })
+
+
+class BenchmarkEscritasTests(TestCase):
+    """Argumentos do `benchmark_escritas` são validados antes de qualquer processo ser criado."""
+
+    def _executar(self, *args):
+        call_command('benchmark_escritas', *args, stdout=StringIO())
+
+    def test_argumentos_invalidos(self):
+        EstoqueGasolina.objects.create(tipo='GAS_COMUM', quantidade_litros=Decimal('10'), preco_atual_litro=Decimal('5'))
+        casos = [
+            (['--perfis', 'padrao', 'turbo'], "Perfis desconhecidos: turbo."),
+            (['--processos', '0'], "--processos deve ser pelo menos 1."),
+            (['--operacoes', '-5'], "--operacoes deve ser pelo menos 1."),
+        ]
+        for args, mensagem in casos:
+            with self.subTest(args=args), self.assertRaisesMessage(CommandError, mensagem):
+                self._executar(*args)
+        with self.assertRaises(CommandError):
+            self._executar('--processos', 'muitos')
+
+    def test_exige_um_combustivel(self):
+        with self.assertRaisesMessage(CommandError, "Nenhum combustível cadastrado"):
+            self._executar('--processos', '1')
+
+
+class LivroRazaoTests(TestCase):
+    """Cada compra, venda e registro de serviço gera exatamente um `Movimento` correspondente."""
+
+    def test_um_movimento_por_registro(self):
+        combustivel = EstoqueGasolina.objects.create(
+            tipo='ETANOL', quantidade_litros=Decimal('100'), preco_atual_litro=Decimal('4.50')
+        )
+        servico = Servico.objects.create(nome='Calibragem', preco_unitario=Decimal('10.00'))
+        compra = registrar_movimentacao_combustivel(combustivel.pk, 'ENTRADA', Decimal('20'))
+        venda = registrar_movimentacao_combustivel(combustivel.pk, 'SAIDA', Decimal('7.5'))
+        servico_vendido = registrar_transacao_servico(servico.pk, 'VENDA', Decimal('3'))
+        servico_comprado = registrar_transacao_servico(servico.pk, 'COMPRA', Decimal('1'))
+        esperados = {
+            ('COMPRA', compra.pk): (f'C:{combustivel.pk}', 'COMPRA', compra.data_compra, Decimal('20'), Decimal('90')),
+            ('VENDA', venda.pk): (f'C:{combustivel.pk}', 'VENDA', venda.data_venda, Decimal('7.5'), Decimal('33.75')),
+            ('SERVICO', servico_vendido.pk): (f'S:{servico.pk}', 'VENDA', servico_vendido.data, Decimal('3'), Decimal('30')),
+            ('SERVICO', servico_comprado.pk): (f'S:{servico.pk}', 'COMPRA', servico_comprado.data, Decimal('1'), Decimal('10')),
+        }
+
+        gravados = {
+            (m.origem, m.registro_id): (m.item, m.tipo, m.data, m.quantidade, m.total)
+            for m in Movimento.objects.all()
+        }
+        self.assertEqual(gravados, esperados)
+
+        # Uma venda recusada não deixa movimento
+        with self.assertRaises(EstoqueInsuficiente):
+            registrar_movimentacao_combustivel(combustivel.pk, 'SAIDA', Decimal('1000'))
+        self.assertEqual(Movimento.objects.count(), len(esperados))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class EstoqueVisivelTests(TestCase):
+    """Página pública do estoque: ETag pela versão do estoque e HTML em cache para anônimos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.combustivel = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('1000.00'), preco_atual_litro=Decimal('5.00')
+        )
+
+    def setUp(self):
+        cache.clear()
+        catalogo.limpar()
+        self.url = reverse('estoque_visivel')
+
+    def test_etag_igual_responde_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta.content, b'')
+
+    def test_cache_quente_nao_consulta_o_banco(self):
+        primeira = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            segunda = self.client.get(self.url)
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda.content, primeira.content)
+
+    def test_venda_gera_novo_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        # Sem agrupamento a venda troca o token na hora
+        descartar_trocas_agendadas()
+        with mock.patch.object(versoes, 'AGRUPAMENTO', 0), self.captureOnCommitCallbacks(execute=True):
+            registrar_movimentacao_combustivel(self.combustivel.pk, 'SAIDA', Decimal('12'))
+
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+        self.assertContains(resposta, '988')
+
+
+@roteamento.ler_da_replica
+def _sonda_roteamento(request):
+    """View de teste: responde em qual banco cairiam as leituras do estoque e dos usuários."""
+    return HttpResponse(f"{router.db_for_read(EstoqueGasolina)} {router.db_for_read(User)}")
+
+
+class RoteamentoReplicaTests(SimpleTestCase):
+    """
+    Decisão de leitura na réplica. `SimpleTestCase`: dentro da transação do
+    `TestCase` o roteador manda tudo ao primário.
+    """
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(pasta.name, 'replica.sqlite3')}
+        patcher = mock.patch.dict(settings.DATABASES, {roteamento.REPLICA: replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fabrica = RequestFactory()
+
+    def _sincronizada_ha(self, segundos):
+        marcador = roteamento._marcador()
+        with open(marcador, 'w', encoding='utf-8'):
+            pass
+        instante = time.time() - segundos
+        os.utime(marcador, (instante, instante))
+
+    def _destinos(self, requisicao):
+        return _sonda_roteamento(requisicao).content.decode().split()
+
+    def test_get_le_o_estoque_na_replica(self):
+        self._sincronizada_ha(1)
+
+        self.assertEqual(self._destinos(self.fabrica.get('/')), ['replica', 'default'])
+        self.assertEqual(self._destinos(self.fabrica.post('/')), ['default', 'default'])
+        # Fora da view marcada, tudo no primário
+        self.assertEqual(router.db_for_read(EstoqueGasolina), 'default')
+
+    def test_replica_atrasada_ou_nunca_sincronizada_le_do_primario(self):
+        self.assertIsNone(roteamento.atraso_replica())
+        self.assertEqual(self._destinos(self.fabrica.get('/')), ['default', 'default'])
+
+        self._sincronizada_ha(settings.DB_REPLICA_ATRASO_MAXIMO + 5)
+        self.assertEqual(self._destinos(self.fabrica.get('/')), ['default', 'default'])
+
+    def test_post_faz_os_gets_seguintes_lerem_do_primario(self):
+        self._sincronizada_ha(1)
+        middleware = roteamento.LeituraAposEscritaMiddleware(lambda requisicao: HttpResponse())
+
+        resposta = middleware(self.fabrica.post('/'))
+        cookie = resposta.cookies[roteamento.COOKIE_ADERENCIA]
+        self.assertEqual(cookie['max-age'], settings.DB_REPLICA_ADERENCIA)
+        self.assertNotIn(roteamento.COOKIE_ADERENCIA, middleware(self.fabrica.get('/')).cookies)
+
+        seguinte = self.fabrica.get('/')
+        seguinte.COOKIES[roteamento.COOKIE_ADERENCIA] = cookie.value
+        self.assertEqual(self._destinos(seguinte), ['default', 'default'])
+
+
+class LoteMovimentacoesTests(TestCase):
+    """Endpoint de lote: uma transação para todas as linhas, corpo inválido não grava nada."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gasolina = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('100.00'), preco_atual_litro=Decimal('5.00')
+        )
+        cls.diesel = EstoqueGasolina.objects.create(
+            tipo='DIESEL_COMUM', quantidade_litros=Decimal('50.00'), preco_atual_litro=Decimal('6.00')
+        )
+        cls.usuario = User.objects.create_superuser('gerente_lote', 'g@exemplo.com', 'senha')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.url = reverse('movimentacoes_lote')
+
+    def _enviar(self, corpo, content_type='application/json', tudo_ou_nada=False):
+        url = f"{self.url}?tudo_ou_nada=1" if tudo_ou_nada else self.url
+        return self.client.post(url, corpo, content_type=content_type)
+
+    def _saldos(self):
+        return list(EstoqueGasolina.objects.order_by('pk').values_list('quantidade_litros', flat=True))
+
+    def test_lote_valido_aplicado_de_uma_vez(self):
+        corpo = json.dumps({'movimentos': [
+            {'combustivel': 'GAS_COMUM', 'movimento': 'SAIDA', 'quantidade': '30'},
+            {'combustivel': str(self.diesel.pk), 'movimento': 'ENTRADA', 'quantidade': '20'},
+            {'combustivel': 'GAS_COMUM', 'movimento': 'SAIDA', 'quantidade': '70'},
+        ]})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self._enviar(corpo)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['aplicadas'], 3)
+        self.assertEqual(resposta.json()['saldos'], {'GAS_COMUM': '0.00', 'DIESEL_COMUM': '70.00'})
+        self.assertEqual(self._saldos(), [Decimal('0.00'), Decimal('70.00')])
+        self.assertEqual(RegistroVenda.objects.count(), 2)
+        self.assertEqual(RegistroCompra.objects.count(), 1)
+        self.assertEqual(Movimento.objects.count(), 3)
+
+    def test_corpo_malformado_responde_400_sem_gravar(self):
+        casos = [
+            ('{"movimentos": [', 'application/json'),
+            ('{"movimentos": {}}', 'application/json'),
+            ('[]', 'application/json'),
+            ('combustivel;quantidade\nGAS_COMUM;10\n', 'text/csv'),
+        ]
+        for corpo, content_type in casos:
+            with self.subTest(corpo=corpo):
+                resposta = self._enviar(corpo, content_type)
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('erro', resposta.json())
+
+        self.assertEqual(self._saldos(), [Decimal('100.00'), Decimal('50.00')])
+        self.assertFalse(RegistroVenda.objects.exists())
+        self.assertFalse(Movimento.objects.exists())
+
+    def test_estoque_insuficiente_recusa_o_lote_inteiro(self):
+        corpo = json.dumps([
+            {'combustivel': 'GAS_COMUM', 'movimento': 'SAIDA', 'quantidade': '30'},
+            {'combustivel': 'DIESEL_COMUM', 'movimento': 'ENTRADA', 'quantidade': '10'},
+            {'combustivel': 'GAS_COMUM', 'movimento': 'SAIDA', 'quantidade': '80'},
+        ])
+
+        resposta = self._enviar(corpo, tudo_ou_nada=True)
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(resposta.json()['aplicadas'], 0)
+        self.assertEqual(
+            [r['erro'] for r in resposta.json()['resultados']],
+            ["Lote recusado por erro em outra linha."] * 2 + ["Estoque insuficiente para esta saída."]
+        )
+        self.assertEqual(self._saldos(), [Decimal('100.00'), Decimal('50.00')])
+        self.assertFalse(RegistroVenda.objects.exists())
+        self.assertFalse(RegistroCompra.objects.exists())
+        self.assertFalse(Movimento.objects.exists())
+
+        # Sem `tudo_ou_nada` só a linha sem saldo é recusada
+        resposta = self._enviar(corpo)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual([r['status'] for r in resposta.json()['resultados']], ['ok', 'ok', 'erro'])
+        self.assertEqual(self._saldos(), [Decimal('70.00'), Decimal('60.00')])
+
+
+class PaginacaoCursorTests(TestCase):
+    """Paginação por cursor dos ledgers: ordem estável com datas empatadas, cursor adulterado e última página."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gasolina = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('1000'), preco_atual_litro=Decimal('6.00')
+        )
+        cls.instante = timezone.now().replace(microsecond=0) - timedelta(days=1)
+        # Quatro vendas no mesmo instante, entre uma mais nova e uma mais antiga
+        deslocamentos = [timedelta(hours=1)] + [timedelta(0)] * 4 + [-timedelta(hours=1)]
+        for deslocamento in deslocamentos:
+            venda = RegistroVenda.objects.create(
+                combustivel=cls.gasolina, quantidade_litros=Decimal('10'),
+                preco_venda_litro=Decimal('6.00'), total_venda=Decimal('60.00')
+            )
+            RegistroVenda.objects.filter(pk=venda.pk).update(data_venda=cls.instante + deslocamento)
+
+    def _todas(self, tamanho):
+        paginas, cursor = [], None
+        while True:
+            itens, cursor = pagina_particionada(arquivo.consultar('vendas'), 'data_venda', cursor=cursor, tamanho=tamanho)
+            paginas.append([venda.pk for venda in itens])
+            if cursor is None:
+                return paginas
+
+    def test_datas_empatadas_nao_repetem_nem_pulam_linhas(self):
+        esperado = list(RegistroVenda.objects.order_by('-data_venda', '-pk').values_list('pk', flat=True))
+
+        for tamanho in (1, 2, 3, 4, 5):
+            with self.subTest(tamanho=tamanho):
+                paginas = self._todas(tamanho)
+                self.assertEqual([pk for pagina in paginas for pk in pagina], esperado)
+                self.assertTrue(all(len(pagina) == tamanho for pagina in paginas[:-1]))
+
+    def test_ultima_pagina_nao_tem_proximo_cursor(self):
+        # Total múltiplo do tamanho: a última página vem cheia e sem cursor
+        self.assertEqual([len(pagina) for pagina in self._todas(3)], [3, 3])
+        self.assertEqual([len(pagina) for pagina in self._todas(4)], [4, 2])
+        self.assertEqual([len(pagina) for pagina in self._todas(6)], [6])
+
+    def test_cursor_adulterado(self):
+        adulterados = [
+            'não-é-cursor',
+            codificar_cursor(self.instante, 1)[:-3],
+            base64.urlsafe_b64encode(b'ontem|7').decode(),
+            base64.urlsafe_b64encode(f'{self.instante.isoformat()}|sete'.encode()).decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+        ]
+        for cursor in adulterados:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(CursorInvalido):
+                    pagina_particionada(arquivo.consultar('vendas'), 'data_venda', cursor=cursor)
+
+        # Na view, o histórico volta ao início com uma mensagem
+        self.client.force_login(User.objects.create_superuser('gerente_paginas', 'g@exemplo.com', 'senha'))
+        url = reverse('financeiro_historico', args=['vendas'])
+        self.assertRedirects(self.client.get(url, {'cursor': adulterados[2]}), url)
+
+
+class ServicosPadraoTests(TestCase):
+    """Semeadura dos serviços padrão: idempotente e segura no estado histórico das migrações."""
+
+    def test_semear_duas_vezes_nao_cria_nada_na_segunda(self):
+        # O post_migrate do banco de teste já semeou; remove um para recriá-lo
+        Servico.objects.filter(nome='Alinhamento').delete()
+        historico = HistoricoPreco.objects.count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            criados = servicos_padrao.semear()
+        self.assertEqual([s.nome for s in criados], ['Alinhamento'])
+        self.assertEqual(HistoricoPreco.objects.count(), historico + 1)
+
+        total = Servico.objects.count()
+        # Savepoint, a leitura dos nomes e o release: nenhuma escrita
+        with self.assertNumQueries(3):
+            self.assertEqual(servicos_padrao.semear(), [])
+        self.assertEqual(Servico.objects.count(), total)
+        self.assertEqual(HistoricoPreco.objects.count(), historico + 1)
+
+    def test_estado_anterior_a_categoria_e_ignorado(self):
+        estado = MigrationLoader(connection).project_state(('gerenciamento', '0008_custos_combustivel'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(servicos_padrao.semear(apps=estado.apps), [])
+
+
+class ArquivoMensalTests(TransactionTestCase):
+    """Arquivamento cria tabelas (DDL), que o SQLite não permite dentro da transação do `TestCase`."""
+
+    def setUp(self):
+        self.gasolina = EstoqueGasolina.objects.create(
+            tipo='GAS_COMUM', quantidade_litros=Decimal('1000'), preco_atual_litro=Decimal('6.00')
+        )
+        agora = timezone.now()
+        self.datas = [agora - timedelta(days=dias) for dias in (1, 2, 200, 201, 260, 320)]
+        for data in self.datas:
+            venda = RegistroVenda.objects.create(
+                combustivel=self.gasolina, quantidade_litros=Decimal('10'),
+                preco_venda_litro=Decimal('6.00'), total_venda=Decimal('60.00')
+            )
+            RegistroVenda.objects.filter(pk=venda.pk).update(data_venda=data)
+            venda.refresh_from_db()
+            movimentos.registrar([venda])
+
+    def tearDown(self):
+        tabelas = ParticaoArquivo.objects.values_list('tabela', flat=True)
+        with connection.cursor() as cursor:
+            for tabela in tabelas:
+                cursor.execute(f'DROP TABLE IF EXISTS "{tabela}"')
+
+    def test_meses_antigos_saem_da_tabela_principal_sem_sumir_das_consultas(self):
+        movidos = arquivo.arquivar()
+
+        self.assertEqual(sum(linhas for ledger, _, linhas in movidos if ledger == 'vendas'), 4)
+        self.assertEqual(RegistroVenda.objects.count(), 2)
+        self.assertEqual(arquivo.arquivar(), [])
+
+        particoes = arquivo.consultar('vendas')
+        primeira, cursor = pagina_particionada(particoes, 'data_venda', tamanho=3)
+        segunda, fim = pagina_particionada(particoes, 'data_venda', cursor=cursor, tamanho=3)
+        self.assertEqual([v.data_venda for v in primeira + segunda], self.datas)
+        self.assertIsNone(fim)
+
+        exportadas = list(exportacao.registros('vendas'))
+        self.assertEqual(len(exportadas), 6)
+
+        # Um intervalo recente não consulta nenhum mês arquivado
+        recentes = arquivo.consultar('vendas', {'data_inicio': timezone.localdate() - timedelta(days=7)})
+        self.assertEqual(len(recentes), 1)
+
+    def test_movimentos_acompanham_as_linhas_arquivadas(self):
+        resumos_antes = list(ResumoMovimento.objects.order_by('id').values_list('id', 'litros', 'receita'))
+
+        arquivo.arquivar()
+
+        self.assertEqual(
+            sorted(Movimento.objects.values_list('registro_id', flat=True)),
+            sorted(RegistroVenda.objects.values_list('pk', flat=True))
+        )
+        arquivados = [
+            movimento
+            for particao in arquivo.no_intervalo('movimentos')[1:]
+            for movimento in particao.queryset.filter(origem='VENDA')
+        ]
+        self.assertEqual(sorted(m.data for m in arquivados), self.datas[2:][::-1])
+        self.assertEqual(
+            sum(linhas for linhas in ParticaoArquivo.objects.filter(ledger='movimentos').values_list('linhas', flat=True)),
+            4
+        )
+        # Os resumos seguem valendo para o período inteiro
+        self.assertEqual(list(ResumoMovimento.objects.order_by('id').values_list('id', 'litros', 'receita')), resumos_antes)
+        self.assertEqual(resumos.divergencias(), [])
 
-# Arquivo preparado para receber testes do app `gerenciamento`.
@@ -4,7 +4,14 @@ from . import views
 urlpatterns = [
     path('estoque/', views.estoque_gasolina_view, name='estoque_gasolina'),
     path('estoque/visivel/', views.estoque_visivel_view, name='estoque_visivel'),
+    path('estoque/eventos/', views.eventos_estoque_view, name='estoque_eventos'),
     path('estoque/adicionar/', views.adicionar_combustivel_view, name='adicionar_combustivel'),
     path('combustiveis/editar/', views.edit_combustiveis_view, name='edit_combustiveis'), 
+    path('precos/reajuste/', views.reajuste_precos_view, name='reajuste_precos'),
+    path('precos/historico/', views.historico_precos_view, name='historico_precos'),
     path('financeiro/', views.financeiro_view, name='financeiro'),
+    path('financeiro/historico/<str:ledger>/', views.historico_view, name='financeiro_historico'),
+    path('financeiro/exportar/<str:ledger>/', views.exportar_view, name='financeiro_exportar'),
+    path('movimentacoes/lote/', views.movimentacoes_lote_view, name='movimentacoes_lote'),
+    path('metricas/', views.metricas_view, name='metricas'),
 ]
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Tokens de versão dos dados públicos (estoque e serviços).
+
+Cada nome ('estoque', 'servicos') tem no cache um token aleatório e o
+instante da última mudança (ver `apps.core.versoes`, de onde vêm
+`versao`, `trocar` e `invalidar`). Páginas e caches derivados usam o token
+como parte da chave/ETag; quando os dados mudam, `invalidar()` troca o
+token e tudo que dependia da versão anterior deixa de ser usado, sem
+precisar apagar chave por chave.
+
+Mudanças muito frequentes (o saldo a cada venda) usam
+`invalidar_agrupado()`: o token é trocado na hora se a última troca do
+processo tem mais de `AGRUPAMENTO` segundos, e senão uma única troca fica
+agendada para o fim do intervalo. As páginas ficam no máximo `AGRUPAMENTO`
+segundos atrasadas, e o cache recebe uma escrita por intervalo em vez de
+uma por venda.
+
+'catalogo' muda só quando os combustíveis em si mudam (cadastro, preço),
+não a cada venda (ver `catalogo`), e 'arquivo' quando meses dos ledgers
+são arquivados (`arquivo`).
+"""
+
+import threading
+import time
+
+from django.db import transaction
+
+# Reexportados: o resto do app usa `versoes.versao/trocar/invalidar` daqui
+from apps.core.versoes import invalidar, trocar, versao  # noqa: F401
+
+# Intervalo mínimo (s) entre trocas de um token invalidado por `invalidar_agrupado`
+AGRUPAMENTO = 1.0
+
+
+class _Agrupamento:
+    """Trocas de um nome agrupadas por intervalo, dentro de um processo."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.ultima = None
+        self.agendada = None
+        self.trava = threading.Lock()
+
+    def sinalizar(self):
+        with self.trava:
+            if self.agendada is not None:
+                return
+            agora = time.monotonic()
+            espera = 0 if self.ultima is None else self.ultima + AGRUPAMENTO - agora
+            if espera > 0:
+                self.agendada = threading.Timer(espera, self._trocar)
+                self.agendada.daemon = True
+                self.agendada.start()
+                return
+            self.ultima = agora
+        trocar(self.nome)
+
+    def _trocar(self):
+        with self.trava:
+            self.agendada = None
+            self.ultima = time.monotonic()
+        trocar(self.nome)
+
+
+_agrupamentos = {}
+_trava = threading.Lock()
+
+
+def invalidar_agrupado(nome):
+    """Como `invalidar()`, mas com no máximo uma troca por `AGRUPAMENTO` segundos."""
+    agrupamento = _agrupamentos.get(nome)
+    if agrupamento is None:
+        with _trava:
+            agrupamento = _agrupamentos.setdefault(nome, _Agrupamento(nome))
+    transaction.on_commit(agrupamento.sinalizar)
+
@@ -1,62 +1,90 @@
 from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
-from .models import RegistroCompra, RegistroVenda, EstoqueGasolina, Servico, RegistroServico
-from .forms import MovimentacaoEstoqueForm, EstoqueGasolinaCreationForm, SimulacaoForm
-from decimal import Decimal
-from django.views.decorators.http import require_http_methods
+from .models import EstoqueGasolina
+from .forms import MovimentacaoEstoqueForm, EstoqueGasolinaCreationForm, SimulacaoForm, HistoricoFiltroForm
+from copy import copy
+from django.views.decorators.http import require_http_methods, require_POST
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.http import JsonResponse
+from .lote import LoteInvalido, ler_lote, processar_lote
+from .reajuste import ReajusteInvalido, agendar_reajuste, aplicar_reajuste, descartar_inalterados, ler_reajuste, ler_vigencia
+from .reajuste import pendentes as reajustes_pendentes
+from .operacoes import EstoqueInsuficiente, registrar_movimentacao_combustivel, registrar_transacao_servico
+from .paginacao import CursorInvalido, pagina_particionada
+from .roteamento import ler_da_replica
+from apps.core.papeis import papel_exigido
+from .ledgers import LEDGERS
+from .custos import margens
+from .atividade import atividade
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.core.cache import cache
+from django.views.decorators.http import condition
+from . import arquivo, catalogo, eventos, exportacao, metricas, precos, previsao, versoes
+from django.utils.dateparse import parse_datetime
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from secrets import compare_digest
+
+# Reajustes agendados listados na página de edição de preços
+REAJUSTES_EXIBIDOS = 20
 
+
+@login_required
+@papel_exigido('funcionario', login_url='login')
 @require_http_methods(["GET", "POST"])
 def edit_combustiveis_view(request):
     
     if request.method == 'POST':
-        pk_raw = request.POST.get('pk')
-        preco_str = request.POST.get('preco') 
-        
+        # Um campo `preco-<item>` por linha da tabela; campos vazios são ignorados
+        itens = [
+            {'item': campo[len('preco-'):], 'preco': valor.strip()}
+            for campo, valor in request.POST.items()
+            if campo.startswith('preco-') and valor.strip()
+        ]
+        # Os campos vêm preenchidos com os preços atuais: só vale o que mudou
+        atuais = {f"C:{c.pk}": c.preco_atual_litro for c in catalogo.combustiveis()}
+        atuais.update((f"S:{s.pk}", s.preco_unitario) for s in catalogo.servicos())
+        # (sem nenhuma mudança, a lista inteira segue e o reajuste a descarta)
+        itens = descartar_inalterados(itens, atuais) or itens
         try:
-            preco = Decimal(preco_str) 
-            
-            if pk_raw and ':' in pk_raw:
-                prefix, pk_str = pk_raw.split(':', 1)
+            vigente_em = ler_vigencia(request.POST.get('vigente_em'))
+            if vigente_em:
+                agendados = agendar_reajuste(itens, vigente_em)
             else:
-                prefix = 'C'
-                pk_str = pk_raw
-
-            pk = int(pk_str)
+                resultado = aplicar_reajuste(itens)
+        except ReajusteInvalido as e:
+            for erro in e.erros:
+                messages.error(request, f"Erro ao atualizar preços: {erro}")
+        else:
+            if vigente_em and agendados:
+                messages.success(
+                    request,
+                    f"{len(agendados)} preço(s) agendado(s) para {timezone.localtime(vigente_em):%d/%m/%Y %H:%M}."
+                )
+            elif not vigente_em and resultado['alterados']:
+                alterados = resultado['alterados']
+                resumo = ', '.join(f"{a['nome']} R$ {a['preco']:.2f}" for a in alterados)
+                messages.success(request, f"{len(alterados)} preço(s) atualizado(s): {resumo}")
+            else:
+                messages.info(request, "Nenhum preço foi alterado.")
+            return redirect('edit_combustiveis')
 
-            if prefix == 'C':
-                item = EstoqueGasolina.objects.get(pk=pk)
-                item.preco_atual_litro = preco 
-                item.data_ultima_atualizacao = timezone.now() 
-                item.save()
-                messages.success(request, f"Preço de {item.get_tipo_display()} atualizado para R$ {item.preco_atual_litro:.2f}")
-            
-            elif prefix == 'S':
-                serv = Servico.objects.get(pk=pk)
-                serv.preco_unitario = preco 
-                serv.save()
-                messages.success(request, f"Preço do serviço '{serv.nome}' atualizado para R$ {serv.preco_unitario:.2f}")
+    estoques = catalogo.combustiveis()
+    servicos = catalogo.servicos()
 
-            return redirect('edit_combustiveis')
-            
-        except ValueError:
-            messages.error(request, "Erro: Preço inserido é inválido.")
-        except EstoqueGasolina.DoesNotExist:
-            messages.error(request, "Combustível não encontrado.")
-        except Servico.DoesNotExist:
-            messages.error(request, "Serviço não encontrado.")
-        except Exception as e:
-            messages.error(request, f"Erro ao atualizar preço: {e}")
-
-    estoques = EstoqueGasolina.objects.all().order_by('tipo')
-    servicos = Servico.objects.exclude(descricao__startswith='origem:combustivel:').order_by('nome')
+    nomes = {f"C:{c.pk}": c.get_tipo_display() for c in estoques}
+    nomes.update((f"S:{s.pk}", s.nome) for s in servicos)
+    agendados = list(reajustes_pendentes(limite=REAJUSTES_EXIBIDOS))
+    for agendado in agendados:
+        agendado.nome = nomes.get(agendado.item, agendado.item)
     
     context = {
         'estoques': estoques,
         'servicos': servicos,
+        'agendados': agendados,
         'titulo': 'Editar Combustíveis e Serviços'
     }
     return render(request, 'gerenciamento/edit_combustiveis.html', context)
@@ -65,7 +93,7 @@ def edit_combustiveis_view(request):
 def adicionar_combustivel_view(request):
     
     # 1. Obtém a lista dos códigos de tipos já existentes no banco
-    tipos_existentes = list(EstoqueGasolina.objects.values_list('tipo', flat=True))
+    tipos_existentes = [item.tipo for item in catalogo.combustiveis()]
     
     if len(tipos_existentes) >= len(EstoqueGasolina.TIPOS_COMBUSTIVEL):
         messages.info(request, "Todos os tipos de combustível já foram adicionados. Redirecionando para o controle de estoque.")
@@ -111,11 +139,11 @@ def adicionar_combustivel_view(request):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'funcionario'), login_url='login')
+@papel_exigido('funcionario', login_url='login')
 def estoque_gasolina_view(request):
 
     # 1. Verificação de Estoque Inicial
-    if not EstoqueGasolina.objects.exists():
+    if not catalogo.combustiveis():
         messages.info(request, "O estoque está vazio. Por favor, adicione o estoque inicial dos seus combustíveis.")
         return redirect('adicionar_combustivel')
 
@@ -128,43 +156,20 @@ def estoque_gasolina_view(request):
             movimento = form.cleaned_data['movimento'] 
             
             try:
-                with transaction.atomic():
-                    item_estoque = EstoqueGasolina.objects.select_for_update().get(pk=combustivel_pk)
-                    
-                    preco_unitario = item_estoque.preco_atual_litro
-                    
-                    if movimento == 'SAIDA':
-                        estoque_delta = quantidade * -1
-                        if item_estoque.quantidade_litros + estoque_delta < 0:
-                            messages.error(request, "ERRO: Estoque insuficiente para esta saída.")
-                            return redirect('estoque_gasolina') 
-                        
-                        total = (Decimal(preco_unitario) * Decimal(quantidade))
-                        RegistroVenda.objects.create(
-                            combustivel=item_estoque,
-                            quantidade_litros=quantidade,
-                            preco_venda_litro=preco_unitario,
-                            total_venda=total
-                        )
-                        msg_tipo = "Venda (Saída de Estoque)"
-                        
-                    else: 
-                        estoque_delta = quantidade
-
-                        total = (Decimal(preco_unitario) * Decimal(quantidade))
-                        RegistroCompra.objects.create(
-                            combustivel=item_estoque,
-                            quantidade_litros=quantidade,
-                            preco_compra_litro=preco_unitario,
-                            total_compra=total
-                        )
-                        msg_tipo = "Compra (Entrada de Estoque)"
-
-                    item_estoque.quantidade_litros += estoque_delta
-                    item_estoque.save()
-
-                    messages.success(request, f"{msg_tipo} registrada e Estoque de {item_estoque.get_tipo_display()} atualizado! ({'+' if estoque_delta > 0 else ''}{estoque_delta} L)")
+                registro = registrar_movimentacao_combustivel(combustivel_pk, movimento, quantidade)
+                item_estoque = registro.combustivel
+
+                if movimento == 'SAIDA':
+                    estoque_delta = quantidade * -1
+                    msg_tipo = "Venda (Saída de Estoque)"
+                else:
+                    estoque_delta = quantidade
+                    msg_tipo = "Compra (Entrada de Estoque)"
 
+                messages.success(request, f"{msg_tipo} registrada e Estoque de {item_estoque.get_tipo_display()} atualizado! ({'+' if estoque_delta > 0 else ''}{estoque_delta} L)")
+
+            except EstoqueInsuficiente:
+                messages.error(request, "ERRO: Estoque insuficiente para esta saída.")
             except EstoqueGasolina.DoesNotExist:
                 messages.error(request, "Erro: Combustível não encontrado.")
             except Exception as e:
@@ -175,10 +180,16 @@ def estoque_gasolina_view(request):
     else:
         form = MovimentacaoEstoqueForm()
     
-    estoques = EstoqueGasolina.objects.all().order_by('tipo')
-    
+    # Cópias: as instâncias do catálogo são compartilhadas entre requisições
+    estoques = [copy(item) for item in catalogo.combustiveis()]
+    previsoes = previsao.previsoes()
+    for item in estoques:
+        item.previsao = previsoes.get(item.pk)
+    alertas = [item for item in estoques if item.previsao and item.previsao['nivel']]
+
     context = {
         'estoques': estoques,
+        'alertas': alertas,
         'form': form,
         'titulo': 'Estoque de Combustíveis'
     }
@@ -186,24 +197,18 @@ def estoque_gasolina_view(request):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'funcionario'), login_url='login')
+@papel_exigido('funcionario', login_url='login')
+@ler_da_replica
 def financeiro_view(request):
     
-    compras = RegistroCompra.objects.all()[:10]
-    vendas = RegistroVenda.objects.all()[:10]
-    registros_servicos = RegistroServico.objects.all()[:10]
+    recentes = atividade.recentes()
+    compras = recentes['COMPRA']
+    vendas = recentes['VENDA']
+    registros_servicos = recentes['SERVICO']
     
     simulacao_resultado = None 
     
-    # --- Preparação Dinâmica de Choices ---
-    combustiveis = EstoqueGasolina.objects.all().order_by('tipo')
-    servicos = Servico.objects.exclude(descricao__startswith='origem:combustivel:').order_by('nome')
-    choices = []
-    for c in combustiveis:
-        choices.append((f"C:{c.pk}", f"Combustível - {c.get_tipo_display()} (R$ {c.preco_atual_litro})"))
-    for s in servicos:
-        choices.append((f"S:{s.pk}", f"Serviço - {s.nome} (R$ {s.preco_unitario})"))
-    # --- Fim da Preparação de Choices ---
+    choices = catalogo.choices_simulacao()
 
     if request.method == 'POST':
         form = SimulacaoForm(request.POST)
@@ -215,86 +220,59 @@ def financeiro_view(request):
             transacao = form.cleaned_data['transacao'] 
 
             try:
-                with transaction.atomic():
-                    prefix, pk_str = item_raw.split(':', 1)
-                    pk = int(pk_str)
-                    
-                    is_entrada = False 
-
-                    if prefix == 'C':
-                        # --- Fluxo de Combustível ---
-                        item_estoque = EstoqueGasolina.objects.select_for_update().get(pk=pk)
-                        preco_unitario = item_estoque.preco_atual_litro
-
-                        if transacao == 'COMPRA':
-                            estoque_delta = quantidade
-                            is_entrada = False 
-                            total = (Decimal(preco_unitario) * Decimal(quantidade))
-                            RegistroCompra.objects.create(
-                                combustivel=item_estoque,
-                                quantidade_litros=quantidade,
-                                preco_compra_litro=preco_unitario,
-                                total_compra=total
-                            )
-                            msg_tipo = "Compra de Combustível"
-
-                        elif transacao == 'VENDA':
-                            estoque_delta = quantidade * -1
-                            is_entrada = True 
-                            
-                            if item_estoque.quantidade_litros + estoque_delta < 0:
-                                messages.error(request, "ERRO: Estoque insuficiente para registrar esta venda.")
-                                return redirect('financeiro')
-
-                            total = (Decimal(preco_unitario) * Decimal(quantidade))
-                            RegistroVenda.objects.create(
-                                combustivel=item_estoque,
-                                quantidade_litros=quantidade,
-                                preco_venda_litro=preco_unitario,
-                                total_venda=total
-                            )
-                            msg_tipo = "Venda de Combustível"
-
-                        item_estoque.quantidade_litros += estoque_delta
-                        item_estoque.save()
-
-                        simulacao_resultado = {
-                            'item_label': item_estoque.get_tipo_display(),
-                            'quantidade': quantidade,
-                            'preco_unitario': preco_unitario,
-                            'total': total,
-                            'tipo': transacao.lower(),
-                            'is_entrada': is_entrada, 
-                        }
-
-                        messages.success(request, f"{msg_tipo} registrada e estoque atualizado!")
-
-                    elif prefix == 'S':
-                        # --- Fluxo de Serviço ---
-                        servico = Servico.objects.get(pk=pk)
-                        preco_unitario = servico.preco_unitario
-                        total = (Decimal(preco_unitario) * Decimal(quantidade))
-                        
-                        is_entrada = transacao == 'VENDA'
-
-                        RegistroServico.objects.create(
-                            servico=servico,
-                            tipo=transacao, 
-                            quantidade=quantidade,
-                            preco_unitario=preco_unitario,
-                            total=total
-                        )
-
-                        simulacao_resultado = {
-                            'item_label': servico.nome,
-                            'quantidade': quantidade,
-                            'preco_unitario': preco_unitario,
-                            'total': total,
-                            'tipo': transacao.lower(),
-                            'is_entrada': is_entrada, 
-                        }
-
-                        messages.success(request, f"{transacao.title()} de serviço registrada!")
+                prefix, pk_str = item_raw.split(':', 1)
+                pk = int(pk_str)
+                
+                is_entrada = False 
+
+                if prefix == 'C':
+                    # --- Fluxo de Combustível ---
+                    if transacao == 'COMPRA':
+                        registro = registrar_movimentacao_combustivel(pk, 'ENTRADA', quantidade)
+                        preco_unitario = registro.preco_compra_litro
+                        total = registro.total_compra
+                        msg_tipo = "Compra de Combustível"
+
+                    elif transacao == 'VENDA':
+                        is_entrada = True 
+                        try:
+                            registro = registrar_movimentacao_combustivel(pk, 'SAIDA', quantidade)
+                        except EstoqueInsuficiente:
+                            messages.error(request, "ERRO: Estoque insuficiente para registrar esta venda.")
+                            return redirect('financeiro')
+                        preco_unitario = registro.preco_venda_litro
+                        total = registro.total_venda
+                        msg_tipo = "Venda de Combustível"
+
+                    simulacao_resultado = {
+                        'item_label': registro.combustivel.get_tipo_display(),
+                        'quantidade': quantidade,
+                        'preco_unitario': preco_unitario,
+                        'total': total,
+                        'tipo': transacao.lower(),
+                        'is_entrada': is_entrada, 
+                    }
+
+                    messages.success(request, f"{msg_tipo} registrada e estoque atualizado!")
+
+                elif prefix == 'S':
+                    # --- Fluxo de Serviço ---
+                    registro = registrar_transacao_servico(pk, transacao, quantidade)
+                    servico = registro.servico
+                    preco_unitario = registro.preco_unitario
+                    total = registro.total
+                    is_entrada = transacao == 'VENDA'
+
+                    simulacao_resultado = {
+                        'item_label': servico.nome,
+                        'quantidade': quantidade,
+                        'preco_unitario': preco_unitario,
+                        'total': total,
+                        'tipo': transacao.lower(),
+                        'is_entrada': is_entrada, 
+                    }
+
+                    messages.success(request, f"{transacao.title()} de serviço registrada!")
 
             except Exception as e:
                 messages.error(request, f"Erro na transação: {e}")
@@ -311,16 +289,220 @@ def financeiro_view(request):
         'form': form,
         'simulacao_resultado': simulacao_resultado, 
         'registros_servicos': registros_servicos,
+        'margens': margens(inicio=timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)),
         'titulo': 'Gestão Financeira'
     }
     return render(request, 'gerenciamento/financeiro.html', context)
 
 
+@login_required
+@papel_exigido('funcionario', login_url='login')
+@ler_da_replica
+def historico_view(request, ledger):
+    """Histórico completo de um ledger, com filtros e paginação por cursor."""
+    if ledger not in LEDGERS:
+        raise Http404("Histórico não encontrado.")
+
+    _, campo_data, titulo = LEDGERS[ledger]
+    form = HistoricoFiltroForm(request.GET or None)
+    itens, proximo = [], None
+
+    if form.is_bound and not form.is_valid():
+        messages.error(request, "Filtros inválidos.")
+    else:
+        filtros = form.cleaned_data if form.is_bound else {}
+        relacionado = 'servico' if ledger == 'servicos' else 'combustivel'
+        particoes = arquivo.consultar(ledger, filtros, relacionado)
+
+        try:
+            itens, proximo = pagina_particionada(particoes, campo_data, request.GET.get('cursor'))
+        except CursorInvalido:
+            messages.error(request, "Página inválida. Voltando ao início do histórico.")
+            return redirect('financeiro_historico', ledger=ledger)
+
+    parametros = request.GET.copy()
+    parametros.pop('cursor', None)
+
+    context = {
+        'ledger': ledger,
+        'itens': itens,
+        'form': form,
+        'proximo_cursor': proximo,
+        'filtros_query': parametros.urlencode(),
+        'primeira_pagina': not request.GET.get('cursor'),
+        'titulo': titulo
+    }
+    return render(request, 'gerenciamento/historico.html', context)
+
+
+@login_required
+@papel_exigido('funcionario', login_url='login')
+@ler_da_replica
+def exportar_view(request, ledger):
+    """Exporta um ledger inteiro (com os mesmos filtros do histórico) em CSV ou JSONL, via streaming."""
+    formato = request.GET.get('formato', 'csv')
+    if ledger not in LEDGERS or formato not in exportacao.FORMATOS:
+        raise Http404("Exportação não encontrada.")
+
+    form = HistoricoFiltroForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, "Filtros inválidos para exportação.")
+        return redirect('financeiro_historico', ledger=ledger)
+
+    particoes = arquivo.consultar(ledger, form.cleaned_data)
+    response = StreamingHttpResponse(
+        exportacao.gerar(ledger, formato, [particao.queryset for particao in particoes]),
+        content_type=exportacao.FORMATOS[formato]
+    )
+    nome = f"{ledger}_{timezone.localtime():%Y%m%d_%H%M}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return response
+
+
+def _instante(valor):
+    """
+    Converte um parâmetro ISO 8601 em datetime aware (fuso local se vier sem
+    fuso); vazio = None. Levanta ValueError se o valor não for uma data.
+    """
+    if not valor:
+        return None
+    instante = parse_datetime(valor)
+    if instante is None:
+        raise ValueError(valor)
+    if timezone.is_naive(instante):
+        instante = timezone.make_aware(instante)
+    return instante
+
+
+@login_required
+@papel_exigido('funcionario', login_url='login')
+@ler_da_replica
+def historico_precos_view(request):
+    """Preço de um item num instante (`?item=C:1&em=...`) ou sua linha do tempo (`&inicio=...&fim=...`)."""
+    item = request.GET.get('item', '')
+    if not item.startswith(('C:', 'S:')):
+        return JsonResponse({'erro': "Informe o item no formato 'C:<pk>' ou 'S:<pk>'."}, status=400)
+
+    try:
+        em = _instante(request.GET.get('em'))
+        inicio = _instante(request.GET.get('inicio'))
+        fim = _instante(request.GET.get('fim'))
+    except ValueError:
+        return JsonResponse({'erro': "Datas devem estar no formato ISO 8601."}, status=400)
+
+    if inicio or fim:
+        vigencias = precos.linha_do_tempo(item, inicio or fim, fim or timezone.now())
+        return JsonResponse({
+            'item': item,
+            'vigencias': [{'vigente_desde': v, 'preco': p} for v, p in vigencias],
+        })
+
+    return JsonResponse({'item': item, 'em': em or timezone.now(), 'preco': precos.preco_em(item, em)})
+
+
+@login_required
+@papel_exigido('funcionario', login_url='login')
+@require_POST
+def movimentacoes_lote_view(request):
+    """Recebe um lote (JSON ou CSV) de vendas/compras das bombas e aplica de uma vez.
+
+    Com `?tudo_ou_nada=1` qualquer linha recusada recusa o lote inteiro (400).
+    """
+    try:
+        linhas = ler_lote(request.body, request.content_type)
+    except LoteInvalido as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+
+    tudo_ou_nada = request.GET.get('tudo_ou_nada') == '1'
+    resultado = processar_lote(linhas, tudo_ou_nada)
+    return JsonResponse(resultado, status=400 if tudo_ou_nada and resultado['rejeitadas'] else 200)
+
+
+@login_required
+@papel_exigido('funcionario', login_url='login')
+@require_POST
+def reajuste_precos_view(request):
+    """
+    Recebe vários preços 'C:<pk>'/'S:<pk>' em JSON e aplica todos numa única
+    transação; com 'vigente_em' os preços são agendados em vez de aplicados.
+    """
+    try:
+        itens, vigente_em = ler_reajuste(request.body)
+        if vigente_em:
+            agendados = agendar_reajuste(itens, vigente_em)
+            return JsonResponse({'agendados': len(agendados), 'vigente_em': vigente_em}, status=201)
+        resultado = aplicar_reajuste(itens)
+    except ReajusteInvalido as e:
+        return JsonResponse({'erros': e.erros}, status=400)
+    return JsonResponse(resultado)
+
+
+# Tempo máximo que uma renderização fica no cache (a versão já invalida antes disso)
+ESTOQUE_VISIVEL_TTL = 60 * 60
+
+
+def _estoque_visivel_etag(request):
+    token, _ = versoes.versao('estoque')
+    usuario = request.user.pk if request.user.is_authenticated else 'anon'
+    return f"{token}-{usuario}"
+
+
+def _estoque_visivel_last_modified(request):
+    return versoes.versao('estoque')[1]
+
+
+@ler_da_replica
+@condition(etag_func=_estoque_visivel_etag, last_modified_func=_estoque_visivel_last_modified)
 def estoque_visivel_view(request):
-    """Página pública que mostra o estoque de combustíveis aos clientes."""
-    estoques = EstoqueGasolina.objects.all().order_by('tipo')
+    """Página pública que mostra o estoque de combustíveis aos clientes.
+
+    Para visitantes anônimos (clientes e totens) o HTML fica em cache por
+    versão do estoque, então, enquanto nada muda, a página não consulta o banco.
+    """
+    pode_usar_cache = not request.user.is_authenticated and 'messages' not in request.COOKIES
+    chave = f"gerenciamento:estoque_visivel:{versoes.versao('estoque')[0]}"
+
+    if pode_usar_cache:
+        html = cache.get(chave)
+        if html is not None:
+            return HttpResponse(html)
+
     context = {
-        'estoques': estoques,
+        'estoques': catalogo.combustiveis(),
         'titulo': 'Estoque de Combustíveis'
     }
-    return render(request, 'gerenciamento/estoque_visivel.html', context)
\ No newline at end of file
+    response = render(request, 'gerenciamento/estoque_visivel.html', context)
+
+    if pode_usar_cache:
+        cache.set(chave, response.content, ESTOQUE_VISIVEL_TTL)
+    return response
+
+
+async def eventos_estoque_view(request):
+    """Canal SSE com preços e estoque de combustíveis e serviços.
+
+    Sob ASGI a conexão fica aberta e recebe um evento a cada mudança. Sob
+    WSGI (ex.: `runserver` sem ASGI) segurar a conexão prenderia uma thread,
+    então é enviado só o estado atual e o navegador reconecta após `retry`.
+    """
+    if not isinstance(request, ASGIRequest):
+        dados = await sync_to_async(eventos.snapshot)()
+        corpo = f"retry: {eventos.RETRY_MS}\n\n" + eventos.formatar_evento(dados)
+        response = HttpResponse(corpo, content_type='text/event-stream')
+    else:
+        fila = await eventos.difusor.assinar()
+        response = StreamingHttpResponse(eventos.fluxo(fila), content_type='text/event-stream')
+        response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def metricas_view(request):
+    """Métricas do processo no formato do Prometheus (superusuário ou token do coletor)."""
+    autorizacao = request.headers.get('Authorization', '')
+    token_valido = bool(settings.METRICAS_TOKEN) and autorizacao.startswith('Bearer ') and compare_digest(
+        autorizacao[len('Bearer '):], settings.METRICAS_TOKEN
+    )
+    if not (token_valido or request.user.is_superuser):
+        return HttpResponseForbidden("Acesso restrito.")
+    return HttpResponse(metricas.texto(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -4,6 +4,14 @@ ASGI config para o projeto `config`.
 Este arquivo expõe o objeto WSGI/ASGI `application` que servidores
 compatíveis (uvicorn, daphne, etc.) usam para servir a aplicação.
 
+O canal de eventos em tempo real (`/gerenciamento/estoque/eventos/`, SSE)
+só mantém conexões abertas quando servido por aqui, por exemplo:
+
+    uvicorn config.asgi:application --workers 1
+
+Sob ASGI cada cliente conectado é apenas uma corrotina aguardando, então
+um único processo atende milhares de telas sem uma thread por cliente.
+
 Traduzido/explicado em português para facilitar a leitura do projeto.
 """
 
@@ -26,11 +26,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.gerenciamento.metricas.MetricasMiddleware',
+    'apps.gerenciamento.roteamento.LeituraAposEscritaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.papeis.PapeisMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -47,6 +50,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.core.papeis.contexto',
             ],
         },
     },
@@ -54,13 +58,90 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Perfis de conexão do SQLite, escolhidos por SQLITE_PERFIL (padrão: 'concorrente').
+#   'padrao':      configuração de fábrica (journal DELETE, uma conexão por requisição).
+#   'concorrente': WAL (leitores não bloqueiam o escritor), synchronous=NORMAL
+#                  (seguro com WAL), transações IMMEDIATE (o escritor espera o
+#                  lock no início, respeitando o timeout, em vez de falhar com
+#                  "database is locked" ao promover a leitura), mmap e cache de
+#                  páginas maiores e conexões persistentes com health check.
+# Compare os dois com `python manage.py benchmark_escritas`.
+SQLITE_PERFIS = {
+    'padrao': {
+        'OPTIONS': {},
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+    },
+    'concorrente': {
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            # Espera máxima (s) pelo lock de escrita (busy timeout)
+            'timeout': float(os.getenv('SQLITE_TIMEOUT', '20')),
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_BYTES', 256 * 1024 * 1024))};"
+                # Negativo = em KiB (64 MiB por conexão)
+                f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KIB', 64 * 1024))};"
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+SQLITE_PERFIL = os.getenv('SQLITE_PERFIL', 'concorrente')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **SQLITE_PERFIS[SQLITE_PERFIL],
+        # Banco de teste em arquivo: o padrão em memória (cache compartilhado)
+        # falha com "database table is locked" sem respeitar o timeout, e os
+        # testes de concorrência devem exercitar o WAL/IMMEDIATE de produção
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+# Réplica somente leitura (opcional) para páginas públicas e relatórios, mantida
+# pelo comando `sincronizar_replica` (ver apps/gerenciamento/roteamento.py).
+#   DB_REPLICA_NAME: caminho do arquivo da réplica (sem ele, tudo vai ao primário)
+#   DB_REPLICA_ATRASO_MAXIMO: segundos de atraso tolerados antes de voltar ao primário
+#   DB_REPLICA_ADERENCIA: segundos lendo do primário após um POST do mesmo navegador
+DB_REPLICA_NAME = os.getenv('DB_REPLICA_NAME')
+DB_REPLICA_ATRASO_MAXIMO = float(os.getenv('DB_REPLICA_ATRASO_MAXIMO', '10'))
+DB_REPLICA_ADERENCIA = int(os.getenv('DB_REPLICA_ADERENCIA', '15'))
+if DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DB_REPLICA_NAME,
+        'OPTIONS': {
+            'timeout': DB_REPLICA_ATRASO_MAXIMO,
+            'init_command': 'PRAGMA query_only=ON;',
+        },
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['apps.gerenciamento.roteamento.LeituraNaReplica']
+
+# Cache usado pelas páginas públicas e tokens de versão. Precisa ser
+# compartilhado entre os processos (workers, comandos): com um cache local
+# cada processo teria seus próprios tokens e serviria páginas e ETags antigas.
+# O padrão é em arquivos; memcached/redis via CACHE_BACKEND/CACHE_LOCATION.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
     }
 }
 
+# Token aceito em `Authorization: Bearer <token>` por /gerenciamento/metricas/
+# (para o coletor do Prometheus); sem ele, apenas superusuários logados acessam.
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -79,10 +160,16 @@ LOGIN_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
 LOGOUT_REDIRECT_URL = '/'
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+# Os e-mails vão para a caixa de saída local (`apps.core.correio`) e o
+# comando `enviar_emails` os entrega com CORREIO_BACKEND_ENVIO. Para testar
+# com um servidor SMTP local (ex.: `python -m aiosmtpd -n -l localhost:8025`):
+#   EMAIL_HOST=localhost EMAIL_PORT=8025 EMAIL_USE_TLS=0
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'apps.core.correio.FilaEmailBackend')
+CORREIO_BACKEND_ENVIO = os.getenv('CORREIO_BACKEND_ENVIO', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', '1') == '1'
+EMAIL_TIMEOUT = float(os.getenv('EMAIL_TIMEOUT', '30'))
 EMAIL_HOST_USER = os.getenv('GMAIL_API_KEY')
 EMAIL_HOST_PASSWORD = os.getenv('SENHA')
 DEFAULT_FROM_EMAIL = os.getenv('GMAIL_API_KEY')
@@ -91,6 +178,11 @@ AUTHENTICATION_BACKENDS = [
     'apps.core.backends.EmailOrUsernameModelBackend',
 ]
 
+# Segundos que `get_user` guarda o usuário em memória por processo (0 desativa);
+# salvar ou apagar o usuário limpa o cache na hora (ver `core/signals.py`), e
+# senha/ativo são conferidos no banco a cada requisição (ver `core/backends.py`)
+AUTH_USUARIO_TTL = float(os.getenv('AUTH_USUARIO_TTL', '30'))
+
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')